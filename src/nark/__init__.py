@@ -19,6 +19,7 @@
 
 """nark provides generic time tracking functionality."""
 
+import os
 import time
 
 from easy_as_pypi_getver import get_version as _get_version
@@ -34,7 +35,8 @@ __all__ = (
 
 __PROFILING__ = True
 # DEVS: Comment this out to see load times summary.
-__PROFILING__ = False
+# - Or set NARK_PROFILING=1, e.g., see nark.helpers.dev.startup.
+__PROFILING__ = bool(os.environ.get("NARK_PROFILING"))
 __time_0__ = time.time()
 
 # (lb): Seems a little redundant (see setup.cfg:[metadata]name)
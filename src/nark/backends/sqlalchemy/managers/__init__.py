@@ -19,13 +19,21 @@
 
 """Shared storage object manager utility functions."""
 
+import base64
+import binascii
+import json
+from datetime import datetime
+
 from sqlalchemy import asc, desc
 
 __all__ = (
     "query_apply_limit_offset",
+    "query_decode_cursor",
+    "query_encode_cursor",
     "query_apply_true_or_not",
     "query_prepare_datetime",
     "query_sort_order_at_index",
+    "query_split_search_terms",
 )
 
 
@@ -68,14 +76,92 @@ def query_sort_order_at_index(sort_orders, idx):
 
 
 def query_prepare_datetime(datetm):
-    # Be explicit with the format used by the SQL engine, otherwise,
-    #   e.g., and_(AlchemyFact.start > start) might match where
-    #   AlchemyFact.start == start. In the case of SQLite, the stored
-    #   date will be translated with the seconds, even if 0, e.g.,
-    #   "2018-06-29 16:32:00", but the datetime we use for the compare
-    #   gets translated without, e.g., "2018-06-29 16:32". And we
-    #   all know that "2018-06-29 16:32:00" > "2018-06-29 16:32".
-    # See also: func.datetime(AlchemyFact.start/end).
-    cmp_fmt = "%Y-%m-%d %H:%M:%S"
-    text = datetm.strftime(cmp_fmt)
-    return text
+    # Compare against the raw start_time/end_time columns (and not, say,
+    # func.datetime(AlchemyFact.start), which defeats the table indexes).
+    # - The column type (objects.FactDateTime) formats the bound value using
+    #   the same canonical, lexically sortable format that it uses to store
+    #   values, "YYYY-MM-DD HH:MM:SS". So all we need to do here is drop any
+    #   microseconds, lest "2018-06-29 16:32:00.5" compare differently than
+    #   the "2018-06-29 16:32:00" that would be stored for the same datetime.
+    return datetm.replace(microsecond=0)
+
+
+def query_split_search_terms(search_terms):
+    """
+    Split the search terms into those to match, and those to exclude.
+
+    A term that follows a ``not`` term is excluded, e.g., the terms
+    ``["foo", "not", "bar"]`` match ``foo`` but exclude ``bar``.
+
+    Returns:
+        tuple: The (included, excluded) lists of terms.
+    """
+    included = []
+    excluded = []
+    negate = False
+    for term in search_terms or []:
+        if not negate and term.lower() == "not":
+            negate = True
+            continue
+        (excluded if negate else included).append(term)
+        negate = False
+    return included, excluded
+
+
+# The same format that objects.FactDateTime stores.
+CURSOR_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def query_encode_cursor(seek_key, values):
+    """
+    Encodes the sort key values of a result as an opaque paging cursor.
+
+    Args:
+        seek_key (str): Identifies the sort, so that a cursor cannot be
+            used with a different sort (or item type) than it came from.
+
+        values (list): The result's sort key values, e.g., (start, end, pk).
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+
+    def _encode_value(value):
+        if isinstance(value, datetime):
+            return {"datetime": value.strftime(CURSOR_DATETIME_FORMAT)}
+        return value
+
+    payload = {"key": seek_key, "values": [_encode_value(val) for val in values]}
+    encoded = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(encoded).decode("ascii")
+
+
+def query_decode_cursor(seek_key, cursor):
+    """
+    Decodes a cursor made by ``query_encode_cursor``.
+
+    Returns:
+        list: The sort key values, or None if the cursor is not valid,
+        or if it was made for a different sort.
+    """
+
+    def _decode_value(obj):
+        if set(obj) == {"datetime"}:
+            return datetime.strptime(obj["datetime"], CURSOR_DATETIME_FORMAT)
+        return obj
+
+    try:
+        decoded = base64.urlsafe_b64decode(cursor.encode("ascii"))
+        payload = json.loads(decoded.decode("utf-8"), object_hook=_decode_value)
+        if payload["key"] != seek_key:
+            return None
+        return payload["values"]
+    except (
+        AttributeError,
+        binascii.Error,
+        KeyError,
+        TypeError,
+        UnicodeError,
+        ValueError,
+    ):
+        return None
@@ -25,6 +25,8 @@ from sqlalchemy.orm.exc import NoResultFound
 from ....managers.activity import BaseActivityManager
 from ..objects import AlchemyActivity, AlchemyCategory, AlchemyFact
 from . import query_apply_true_or_not
+from .category import category_identity
+from .identity_cache import IdentityCache
 from .manager_base import BaseAlchemyManager
 
 __all__ = ("ActivityManager",)
@@ -35,6 +37,11 @@ class ActivityManager(BaseAlchemyManager, BaseActivityManager):
 
     def __init__(self, *args, **kwargs):
         super(ActivityManager, self).__init__(*args, **kwargs)
+        self.identity_cache = IdentityCache(
+            state=activity_identity,
+            natural_key=activity_natural_key,
+            maxsize=self.IDENTITY_CACHE_SIZE,
+        )
 
     # ***
 
@@ -165,6 +172,7 @@ class ActivityManager(BaseAlchemyManager, BaseActivityManager):
             message = _("No Activity with PK ‘{}’ was found.").format(activity.pk)
             self.store.logger.error(message)
             raise KeyError(message)
+        self.identity_cache.forget(activity.pk)
         alchemy_activity.name = activity.name
         alchemy_activity.category = self.store.categories.get_or_create(
             activity.category,
@@ -172,7 +180,7 @@ class ActivityManager(BaseAlchemyManager, BaseActivityManager):
         )
         alchemy_activity.deleted = bool(activity.deleted)
         try:
-            self.store.session.commit()
+            self.store.commit()
         except IntegrityError as err:
             # (lb): I think this path unreachable, because get_by_composite should
             # find it first. Or is it something else?
@@ -217,6 +225,7 @@ class ActivityManager(BaseAlchemyManager, BaseActivityManager):
             self.store.logger.error(message)
             raise KeyError(message)
 
+        self.identity_cache.forget(activity.pk)
         if alchemy_activity.facts:
             # FIXME: Untested. (lb): Also, this is how deleted is meant to be used...
             #        Not quite sure I see how it'd work... better workflow should
@@ -227,7 +236,7 @@ class ActivityManager(BaseAlchemyManager, BaseActivityManager):
             self.store.activities._update(alchemy_activity)
         else:
             self.store.session.delete(alchemy_activity)
-        self.store.session.commit()
+        self.store.commit()
         self.store.logger.debug("Deleted: {!r}".format(activity))
 
     # ***
@@ -249,6 +258,11 @@ class ActivityManager(BaseAlchemyManager, BaseActivityManager):
 
         self.store.logger.debug("Received PK: ‘{}’ / raw: {}.".format(pk, raw))
 
+        if deleted is None and not raw:
+            cached = self.identity_cache.get(pk)
+            if cached is not None:
+                return cached
+
         if deleted is None:
             result = self.store.session.query(AlchemyActivity).get(pk)
         else:
@@ -301,6 +315,14 @@ class ActivityManager(BaseAlchemyManager, BaseActivityManager):
             "Received: {!r} / name: ‘{}’ / raw: {}".format(category, name, raw)
         )
 
+        # EXPLAIN: (lb): Is name ever not a string here?
+        name = str(name)
+
+        natural_key = (name, category.name if category else None)
+        cached = self.identity_cache_lookup(natural_key, raw=raw)
+        if cached is not None:
+            return cached
+
         if category:
             category = category.name
             try:
@@ -316,8 +338,6 @@ class ActivityManager(BaseAlchemyManager, BaseActivityManager):
         else:
             alchemy_category = None
 
-        # EXPLAIN: (lb): Is name ever not a string here?
-        name = str(name)
         try:
             query = self.store.session.query(AlchemyActivity)
             # Note that if alchemy_category is None -- because caller passed None --
@@ -332,6 +352,8 @@ class ActivityManager(BaseAlchemyManager, BaseActivityManager):
             raise KeyError(message)
         if not raw:
             result = result.as_hamster(self.store)
+        else:
+            self.identity_cache.remember(result)
         self.store.logger.debug("Returning: {!r}.".format(result))
         return result
 
@@ -362,6 +384,16 @@ class ActivityManager(BaseAlchemyManager, BaseActivityManager):
         query = self._gather_query_join_category(qt, query)
         return query
 
+    def _gather_query_start_rollup(self, qt, agg_cols, rollup_rows):
+        query = self.store.session.query(AlchemyActivity, *agg_cols)
+        query = query.select_from(rollup_rows)
+        query = query.outerjoin(
+            AlchemyActivity,
+            AlchemyActivity.pk == rollup_rows.c.activity_id,
+        )
+        query = self._gather_query_join_category(qt, query)
+        return query
+
     def _gather_query_join_category(self, qt, query):
         # We'll usually join the Category table now, so that we can get all
         # the data we need in one query, to avoid SQLAlchemy lazy-loading
@@ -383,3 +415,23 @@ class ActivityManager(BaseAlchemyManager, BaseActivityManager):
         return query
 
     # ***
+
+
+# ***
+
+
+def activity_identity(activity):
+    """Returns the values that a hydrated Activity must match to be reused."""
+    category = activity.category
+    return (
+        activity.pk,
+        activity.name,
+        bool(activity.deleted),
+        bool(activity.hidden),
+        category_identity(category) if category else None,
+    )
+
+
+def activity_natural_key(activity):
+    category = activity.category
+    return (activity.name, category.name if category else None)
@@ -23,8 +23,9 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
 
 from ....managers.category import BaseCategoryManager
-from ..objects import AlchemyCategory, AlchemyFact
+from ..objects import AlchemyActivity, AlchemyCategory, AlchemyFact
 from . import query_apply_true_or_not
+from .identity_cache import IdentityCache
 from .manager_base import BaseAlchemyManager
 
 __all__ = ("CategoryManager",)
@@ -35,6 +36,11 @@ class CategoryManager(BaseAlchemyManager, BaseCategoryManager):
 
     def __init__(self, *args, **kwargs):
         super(CategoryManager, self).__init__(*args, **kwargs)
+        self.identity_cache = IdentityCache(
+            state=category_identity,
+            natural_key=lambda category: category.name,
+            maxsize=self.IDENTITY_CACHE_SIZE,
+        )
 
     # ***
 
@@ -131,9 +137,10 @@ class CategoryManager(BaseAlchemyManager, BaseCategoryManager):
             self.store.logger.error(message)
             raise KeyError(message)
         alchemy_category.name = category.name
+        self.identity_cache_forget(category.pk)
 
         try:
-            self.store.session.commit()
+            self.store.commit()
         except IntegrityError as err:
             message = _(
                 "An error occured! Is category.name already present in the database?"
@@ -176,8 +183,9 @@ class CategoryManager(BaseAlchemyManager, BaseCategoryManager):
             self.store.logger.error(message)
             raise KeyError(message)
 
+        self.identity_cache_forget(category.pk)
         self.store.session.delete(alchemy_category)
-        self.store.session.commit()
+        self.store.commit()
         self.store.logger.debug("Deleted: {!r}".format(category))
 
     # ***
@@ -202,6 +210,9 @@ class CategoryManager(BaseAlchemyManager, BaseCategoryManager):
         self.store.logger.debug("Received PK: ‘{}’".format(pk))
 
         if deleted is None:
+            cached = self.identity_cache.get(pk)
+            if cached is not None:
+                return cached
             result = self.store.session.query(AlchemyCategory).get(pk)
         else:
             query = self.store.session.query(AlchemyCategory)
@@ -237,6 +248,10 @@ class CategoryManager(BaseAlchemyManager, BaseCategoryManager):
         """
         self.store.logger.debug("Received name: ‘{}’ / raw: {}".format(name, raw))
 
+        cached = self.identity_cache_lookup(name, raw=raw)
+        if cached is not None:
+            return cached
+
         try:
             result = (
                 self.store.session.query(AlchemyCategory).filter_by(name=name).one()
@@ -249,8 +264,17 @@ class CategoryManager(BaseAlchemyManager, BaseCategoryManager):
         if not raw:
             result = result.as_hamster(self.store)
             self.store.logger.debug("Returning: {!r}.".format(result))
+        else:
+            self.identity_cache.remember(result)
         return result
 
+    # ***
+
+    def identity_cache_forget(self, pk):
+        # Each cached Activity references its Category, so evict them all, too.
+        self.identity_cache.forget(pk)
+        self.store.activities.identity_cache.clear()
+
     # ***
     # *** gather() call-outs (used by get_all/get_all_by_usage).
     # ***
@@ -285,4 +309,22 @@ class CategoryManager(BaseAlchemyManager, BaseCategoryManager):
         query = query.outerjoin(AlchemyCategory)
         return query
 
+    def _gather_query_start_rollup(self, qt, agg_cols, rollup_rows):
+        query = self.store.session.query(AlchemyCategory, *agg_cols)
+        query = query.select_from(rollup_rows)
+        query = query.outerjoin(
+            AlchemyActivity,
+            AlchemyActivity.pk == rollup_rows.c.activity_id,
+        )
+        query = query.outerjoin(AlchemyCategory)
+        return query
+
     # ***
+
+
+# ***
+
+
+def category_identity(category):
+    """Returns the values that a hydrated Category must match to be reused."""
+    return (category.pk, category.name, bool(category.deleted), bool(category.hidden))
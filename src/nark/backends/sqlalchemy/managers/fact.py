@@ -17,24 +17,69 @@
 # You can find the GNU General Public License reprinted in the file titled 'LICENSE',
 # or visit <http://www.gnu.org/licenses/>.
 
+import bisect
+from collections import defaultdict
 from datetime import datetime
 from gettext import gettext as _
 
-from sqlalchemy import asc, desc, func
+from sqlalchemy import (
+    asc,
+    case,
+    desc,
+    event,
+    func,
+    inspect,
+    literal,
+    select,
+    union_all,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.sql.expression import and_, or_
 
-from ..objects import AlchemyFact
+from ..objects import (
+    AlchemyActivity,
+    AlchemyCategory,
+    AlchemyFact,
+    AlchemyTag,
+    fact_tags,
+    fact_tags_archive,
+    facts,
+    facts_and_archive,
+    facts_archive,
+)
 from . import query_apply_true_or_not, query_prepare_datetime
-from .gather_fact import GatherFactManager
+from .interval_index import IntervalIndex
+from .rollup_fact import RollupFactManager
 
 __all__ = ("FactManager",)
 
+# The number of names to look up per query when bulk-adding Facts.
+ADD_MANY_CHUNK_SIZE = 500
 
-class FactManager(GatherFactManager):
+# The AlchemyFact attributes that get() needs loaded to skip the query.
+SESSION_LOADED_ATTRS = ("start", "end", "description", "activity", "tags")
+
+# The number of archived Facts whose Tags to look up per query.
+ARCHIVE_TAGS_CHUNK_SIZE = 500
+
+# The tables that histories() walks, each using its own recursive step.
+HISTORY_CHAIN_TABLES = (facts, facts_archive)
+
+
+class FactManager(RollupFactManager):
     """ """
 
     def __init__(self, *args, **kwargs):
         super(FactManager, self).__init__(*args, **kwargs)
+        # The IntervalIndex, loaded on first use (if db.interval_index).
+        self._interval_index = None
+        self._interval_index_session = None
+        # The savepoint the index was loaded in, if any (see interval_index_get).
+        self._interval_index_savepoint = None
+        # The (savepoint, pk, span-before) of each index change in a savepoint.
+        self._interval_index_undo = []
 
     # ***
 
@@ -80,6 +125,13 @@ class FactManager(GatherFactManager):
         ]
         alchemy_fact.tags = tags
 
+        # Flush to assign PKs to any new Activity and Tags, which the rollups
+        # need; and update the rollups in the same transaction as the Fact.
+        self.store.session.add(alchemy_fact)
+        self.store.session.flush()
+        self.rollups_update([alchemy_fact], 1)
+        self.interval_index_update([alchemy_fact])
+
         result = self.add_and_commit(
             alchemy_fact,
             raw=raw,
@@ -90,6 +142,307 @@ class FactManager(GatherFactManager):
 
     # ***
 
+    def add_many(self, facts, raw=False):
+        """
+        Add many new Facts to the database at once, e.g., when importing.
+
+        Calling ``_add`` for each Fact runs a handful of queries per Fact --
+        to find (or create) its Activity, Category, and each of its Tags, and
+        to check that its time window is available. Instead, ``add_many``
+        resolves the items for the whole batch using a few set-based queries,
+        validates every time window in memory against one sorted range query,
+        and inserts the Facts (and their Tags) using executemany, all in a
+        single transaction.
+
+        A Fact that fails validation -- it has a PK, its time range is invalid,
+        or its time window is occupied, either by a Fact already in the store,
+        or by an earlier Fact in the batch -- is skipped, and its error is
+        reported, but it does not abort the rest of the batch.
+
+        Args:
+            facts (list of nark.Fact): New Facts to be added.
+            raw (bool): If ``True`` return ``AlchemyFact`` instances instead.
+
+        Returns:
+            list: One ``(fact, err)`` tuple per input Fact, in the same order,
+            where ``fact`` is the Fact as stored in the database (or None if it
+            was skipped), and ``err`` is the error message (or None if added).
+
+        Raises:
+            ValueError: If the transaction fails to commit, in which case no
+                Facts were added.
+        """
+
+        def _add_many():
+            results = [(None, None)] * len(facts)
+            valid_idxs = must_validate_facts(results)
+            if not valid_idxs:
+                return results
+            occupied = fetch_occupied(valid_idxs)
+            added_idxs = must_validate_windows(valid_idxs, occupied, results)
+            if not added_idxs:
+                return results
+            added_facts = [facts[idx] for idx in added_idxs]
+            activities = resolve_activities(added_facts)
+            tags = resolve_tags(added_facts)
+            # Flush the new items, so they get their PKs.
+            self.store.session.flush()
+            alchemy_facts = prepare_alchemy_facts(added_facts, activities, tags)
+            self.store.session.add_all(alchemy_facts)
+            self.store.session.flush()
+            self.rollups_update(alchemy_facts, 1)
+            self.interval_index_update(alchemy_facts)
+            # Prepare the results before committing, otherwise each object
+            # expires, and each as_hamster would re-fetch its Fact.
+            for idx, alchemy_fact in zip(added_idxs, alchemy_facts):
+                results[idx] = (prepare_result(alchemy_fact), None)
+            session_commit()
+            self.store.logger.debug(
+                "Added {} of {} Facts".format(len(added_idxs), len(facts))
+            )
+            return results
+
+        # ***
+
+        def must_validate_facts(results):
+            # Skip adding_item_must_not_have_pk, which formats
+            # each Fact for a debug message, which adds up when importing.
+            valid_idxs = []
+            for idx, fact in enumerate(facts):
+                if fact.pk:
+                    results[idx] = (None, _("New Fact has PK: ‘{}’.").format(fact.pk))
+                    continue
+                try:
+                    self.must_validate_time_range(fact)
+                except (TypeError, ValueError) as err:
+                    results[idx] = (None, str(err))
+                else:
+                    valid_idxs.append(idx)
+            return valid_idxs
+
+        # ***
+
+        def fetch_occupied(valid_idxs):
+            # Fetch the time windows of all stored Facts that might conflict
+            # with any Fact in the batch, sorted by start time.
+            min_start = min(facts[idx].start for idx in valid_idxs)
+            ends = [facts[idx].end for idx in valid_idxs]
+            max_end = None if None in ends else max(ends)
+
+            query = self.store.session.query(
+                AlchemyFact.start,
+                AlchemyFact.end,
+                AlchemyFact.pk,
+            )
+            condition = or_(
+                AlchemyFact.end == None,  # noqa: E711
+                AlchemyFact.end > query_prepare_datetime(min_start),
+            )
+            if max_end is not None:
+                condition = and_(
+                    condition, AlchemyFact.start < query_prepare_datetime(max_end)
+                )
+            condition = and_(condition, AlchemyFact.deleted == False)  # noqa: E712
+            query = query.filter(condition)
+            query = query.order_by(asc(AlchemyFact.start))
+
+            occupied = query.all()
+            return occupied
+
+        # ***
+
+        def must_validate_windows(valid_idxs, occupied, results):
+            # Keep the time windows sorted by start time, and add each valid
+            # Fact's window as we go, so Facts in the batch cannot overlap.
+            starts = [span[0] for span in occupied]
+            spans = [tuple(span) for span in occupied]
+            added_idxs = []
+            for idx in valid_idxs:
+                fact = facts[idx]
+                start = query_prepare_datetime(fact.start)
+                end = fact.end and query_prepare_datetime(fact.end)
+                ignore_pk = fact.split_from and fact.split_from.pk
+                if window_occupied(starts, spans, start, end, ignore_pk):
+                    msg = _(
+                        "One or more Facts already exist "
+                        "between the indicated start and end times. "
+                    )
+                    results[idx] = (None, msg)
+                    continue
+                pos = bisect.bisect_right(starts, start)
+                starts.insert(pos, start)
+                spans.insert(pos, (start, end, None))
+                added_idxs.append(idx)
+            return added_idxs
+
+        def window_occupied(starts, spans, start, end, ignore_pk):
+            # Mirror _timeframe_available_for_fact: A Fact conflicts if it ends
+            # after this Fact starts and it starts before this Fact ends; or,
+            # if this Fact is ongoing, if the other Fact is ongoing, too.
+            if end is None:
+                pos = len(starts)
+            else:
+                pos = bisect.bisect_left(starts, end)
+            # Walk backwards over the Facts that start before this Fact ends.
+            # Because Facts do not overlap, as soon as one ends before this
+            # Fact starts, so does every Fact that starts before it.
+            for other_pos in range(pos - 1, -1, -1):
+                other_start, other_end, other_pk = spans[other_pos]
+                if ignore_pk and other_pk == ignore_pk:
+                    continue
+                if other_end is None:
+                    if end is None:
+                        return True
+                    continue
+                if other_end > start:
+                    return True
+                break
+            return False
+
+        # ***
+
+        def resolve_activities(added_facts):
+            cat_names = set(
+                fact.activity.category.name
+                for fact in added_facts
+                if fact.activity and fact.activity.category
+            )
+            categories = {
+                category.name: category
+                for category in query_names_in(AlchemyCategory, cat_names)
+            }
+
+            act_names = set(fact.activity.name for fact in added_facts if fact.activity)
+            activities = {}
+            for activity in query_names_in(AlchemyActivity, act_names):
+                cat_name = activity.category and activity.category.name
+                activities[(activity.name, cat_name)] = activity
+
+            for fact in added_facts:
+                if not fact.activity:
+                    continue
+                category = fact.activity.category
+                key = (fact.activity.name, category and category.name)
+                if key in activities:
+                    continue
+                alchemy_category = None
+                if category:
+                    alchemy_category = categories.get(category.name)
+                    if alchemy_category is None:
+                        alchemy_category = AlchemyCategory(
+                            pk=None,
+                            name=category.name,
+                            deleted=bool(category.deleted),
+                            hidden=bool(category.hidden),
+                        )
+                        categories[category.name] = alchemy_category
+                        self.store.session.add(alchemy_category)
+                alchemy_activity = AlchemyActivity(
+                    pk=None,
+                    name=fact.activity.name,
+                    category=alchemy_category,
+                    deleted=bool(fact.activity.deleted),
+                    hidden=bool(fact.activity.hidden),
+                )
+                activities[key] = alchemy_activity
+                self.store.session.add(alchemy_activity)
+
+            return activities
+
+        def resolve_tags(added_facts):
+            tag_names = set(tag.name for fact in added_facts for tag in fact.tags)
+            tags = {tag.name: tag for tag in query_names_in(AlchemyTag, tag_names)}
+
+            for fact in added_facts:
+                for tag in fact.tags:
+                    if tag.name in tags:
+                        continue
+                    alchemy_tag = AlchemyTag(
+                        pk=None,
+                        name=tag.name,
+                        deleted=bool(tag.deleted),
+                        hidden=bool(tag.hidden),
+                    )
+                    tags[tag.name] = alchemy_tag
+                    self.store.session.add(alchemy_tag)
+
+            return tags
+
+        def query_names_in(alchemy_cls, names):
+            # Chunk the names, to stay well under SQLite's max variable number.
+            names = sorted(names)
+            for offset in range(0, len(names), ADD_MANY_CHUNK_SIZE):
+                chunk = names[offset : offset + ADD_MANY_CHUNK_SIZE]
+                query = self.store.session.query(alchemy_cls)
+                query = query.filter(alchemy_cls.name.in_(chunk))
+                for item in query.all():
+                    yield item
+
+        # ***
+
+        def prepare_alchemy_facts(added_facts, activities, tags):
+            # Assign PKs ourselves, so that SQLAlchemy can insert the Facts (and
+            # their Tags) using executemany, rather than using one INSERT per
+            # Fact to learn each new ID. Note that we just flushed any new items,
+            # so the transaction already holds the write lock (unless there were
+            # no new items, in which case, a concurrent writer might race us,
+            # and the commit would fail, as opposed to adding duplicate IDs).
+            # - Skip past the archived Facts' IDs, too (see archive).
+            max_pks = self.store.session.execute(
+                select(
+                    select(func.max(AlchemyFact.pk)).scalar_subquery(),
+                    select(func.max(facts_archive.c.id)).scalar_subquery(),
+                )
+            ).one()
+            next_pk = max(max_pk or 0 for max_pk in max_pks) + 1
+
+            alchemy_facts = []
+            for fact in added_facts:
+                activity = None
+                if fact.activity:
+                    category = fact.activity.category
+                    key = (fact.activity.name, category and category.name)
+                    activity = activities[key]
+                alchemy_fact = AlchemyFact(
+                    pk=next_pk,
+                    activity=activity,
+                    start=fact.start,
+                    end=fact.end,
+                    description=fact.description,
+                    deleted=bool(fact.deleted),
+                    split_from=fact.split_from,
+                )
+                alchemy_fact.tags = [tags[tag.name] for tag in fact.tags]
+                alchemy_facts.append(alchemy_fact)
+                next_pk += 1
+            return alchemy_facts
+
+        def prepare_result(alchemy_fact):
+            if raw:
+                return alchemy_fact
+            return alchemy_fact.as_hamster(
+                self.store,
+                tags=set(tag.as_hamster(self.store) for tag in alchemy_fact.tags),
+            )
+
+        def session_commit():
+            try:
+                self.store.commit()
+            except IntegrityError as err:
+                # Roll back (and forget any new items that were hydrated before
+                # the rollback), unless in a transaction, which rolls back (or
+                # whose savepoint rolls back) when the error reaches it.
+                self.store.rollback()
+                message = _(
+                    "Failed to add Facts, none were added. Error: '{0}'."
+                ).format(err)
+                self.store.logger.error(message)
+                raise ValueError(message)
+
+        return _add_many()
+
+    # ***
+
     def _update(self, fact, raw=False, ignore_pks=[]):
         """
         Update and existing fact with new values.
@@ -138,8 +491,13 @@ class FactManager(GatherFactManager):
             # Don't bother with split_from entry.
             # MAYBE: (lb): Go full wiki and store edit times? Ug...
             new_fact = alchemy_fact
+            deltas = defaultdict(lambda: [0, 0])
+            self.rollups_tally(deltas, alchemy_fact, -1)
             alchemy_fact.deleted = fact.deleted
             alchemy_fact.end = fact.end
+            self.rollups_tally(deltas, alchemy_fact, 1)
+            self.rollups_apply(deltas)
+            self.interval_index_update([alchemy_fact])
         else:
             assert alchemy_fact.pk == fact.pk
             was_split_from = fact.split_from
@@ -150,10 +508,15 @@ class FactManager(GatherFactManager):
                 fact, raw=True, skip_commit=True, ignore_pks=ignore_pks
             )
             # NOTE: _add() calls:
-            #       self.store.session.commit()
+            #       self.store.commit()
             # The fact being split from is deleted/historic.
+            # (And _add() already tallied the new Fact in the rollups.)
+            self.rollups_update([alchemy_fact], -1)
             alchemy_fact.deleted = True
+            self.interval_index_update([alchemy_fact])
             assert new_fact.pk > alchemy_fact.pk
+            if self.store.config["db.archive_deleted"]:
+                self.archive([alchemy_fact.pk], skip_commit=True)
             # Restore the ID to not confuse the caller!
             # The caller will still have a handle on Fact. Rather than
             # change its pk to new_fact's, have it reflect its new
@@ -164,7 +527,7 @@ class FactManager(GatherFactManager):
             # is what the caller passed us, so update it, too.
             fact.deleted = True
 
-        self.store.session.commit()
+        self.store.commit()
 
         self.store.logger.debug("Updated: {!r}".format(fact))
 
@@ -176,6 +539,17 @@ class FactManager(GatherFactManager):
     # ***
 
     def must_validate_datetimes(self, fact, ignore_pks=[]):
+        self.must_validate_time_range(fact)
+
+        if not self._timeframe_available_for_fact(fact, ignore_pks):
+            msg = _(
+                "One or more Facts already exist "
+                "between the indicated start and end times. "
+            )
+            self.store.logger.error(msg)
+            raise ValueError(msg)
+
+    def must_validate_time_range(self, fact):
         if not isinstance(fact.start, datetime):
             raise TypeError(_("Missing start time for ‘{!r}’.").format(fact))
 
@@ -200,13 +574,100 @@ class FactManager(GatherFactManager):
             self.store.logger.error(message)
             raise ValueError(message)
 
-        if not self._timeframe_available_for_fact(fact, ignore_pks):
-            msg = _(
-                "One or more Facts already exist "
-                "between the indicated start and end times. "
+    # ***
+
+    def interval_index_get(self):
+        """
+        Returns the IntervalIndex of the Facts' time windows, or None if disabled.
+
+        The index is loaded on first use, and then kept current as Facts are
+        added, updated, and removed through the FactManager. Because it reflects
+        uncommitted changes, it is discarded whenever the session rolls back,
+        and it is reloaded on next use. But when just a savepoint rolls back,
+        the index changes made within the savepoint are undone instead (unless
+        the index was loaded within the savepoint, then it's discarded). (If
+        another app edits the Facts, you'll want to call
+        ``interval_index_forget``, or disable ``db.interval_index``.)
+        """
+        if not self.store.config["db.interval_index"]:
+            return None
+
+        session = self.store.session
+        if self._interval_index is None or self._interval_index_session is not session:
+            for event_name, listener in (
+                ("after_commit", self.interval_index_on_commit),
+                ("after_soft_rollback", self.interval_index_on_rollback),
+            ):
+                if not event.contains(session, event_name, listener):
+                    event.listen(session, event_name, listener)
+            query = session.query(AlchemyFact.pk, AlchemyFact.start, AlchemyFact.end)
+            query = query.filter(AlchemyFact.deleted == False)  # noqa: E712
+            self._interval_index = IntervalIndex(query.all())
+            self._interval_index_session = session
+            self._interval_index_savepoint = session.get_nested_transaction()
+            self._interval_index_undo = []
+            self.store.logger.debug(
+                "Loaded interval index: {} Facts".format(len(self._interval_index))
             )
-            self.store.logger.error(msg)
-            raise ValueError(msg)
+        return self._interval_index
+
+    def interval_index_update(self, alchemy_facts):
+        """Re-indexes each Fact's time window, or drops it if deleted."""
+        if self._interval_index is None:
+            return
+        savepoint = self.store.session.get_nested_transaction()
+        if savepoint is not None:
+            self._interval_index_undo.extend(
+                (
+                    savepoint,
+                    alchemy_fact.pk,
+                    self._interval_index.spans.get(alchemy_fact.pk),
+                )
+                for alchemy_fact in alchemy_facts
+            )
+        for alchemy_fact in alchemy_facts:
+            if alchemy_fact.deleted:
+                self._interval_index.discard(alchemy_fact.pk)
+        self._interval_index.add_many(
+            (alchemy_fact.pk, alchemy_fact.start, alchemy_fact.end)
+            for alchemy_fact in alchemy_facts
+            if not alchemy_fact.deleted
+        )
+
+    def interval_index_forget(self):
+        """Discards the IntervalIndex, which is reloaded on next use."""
+        self._interval_index = None
+        self._interval_index_undo = []
+
+    def interval_index_on_commit(self, session):
+        self._interval_index_savepoint = None
+        self._interval_index_undo = []
+
+    def interval_index_on_rollback(self, session, previous_transaction):
+        def _interval_index_on_rollback():
+            if not previous_transaction.nested or within_savepoint(
+                self._interval_index_savepoint
+            ):
+                self.interval_index_forget()
+                return
+            undo = self._interval_index_undo
+            while undo and within_savepoint(undo[-1][0]):
+                _savepoint, pk, span = undo.pop()
+                if span is None:
+                    self._interval_index.discard(pk)
+                else:
+                    self._interval_index.add(pk, *span)
+
+        def within_savepoint(transaction):
+            # True if the transaction is the rolled back savepoint, or a
+            # savepoint within it.
+            while transaction is not None:
+                if transaction is previous_transaction:
+                    return True
+                transaction = transaction.parent
+            return False
+
+        _interval_index_on_rollback()
 
     # ***
 
@@ -229,27 +690,30 @@ class FactManager(GatherFactManager):
             If the given fact is the only fact instance within the given timeframe
             the timeframe is considered available (for this fact)!
         """
-        # Use func.datetime and query_prepare_datetime to normalize time comparisons,
-        # so that equivalent times that are expressed differently are evaluated
-        # as equal, e.g., "2018-01-01 10:00" should match "2018-01-01 10:00:00".
-        # FIXME: func.datetime is SQLite-specific: need to abstract for other DBMSes.
+        # Compare the raw start_time and end_time columns, so that SQLite can
+        # use the (deleted, start_time) and (deleted, end_time) indexes.
+        # - (lb): We used to wrap each column in func.datetime() to normalize
+        #   whatever format happened to be stored (with or without seconds,
+        #   or with microseconds), but that forced a full table scan. Now the
+        #   column type stores one canonical format (see FactDateTime), and
+        #   migration 002 rewrote any legacy values to match.
+
+        interval_index = self.interval_index_get()
+        if interval_index is not None:
+            ignore_pks = list(ignore_pks)
+            if fact.pk:
+                ignore_pks.append(fact.pk)
+            if fact.split_from:
+                ignore_pks.append(fact.split_from.pk)
+            return not interval_index.overlaps(fact.start, fact.end, ignore_pks)
 
         start = query_prepare_datetime(fact.start)
         query = self.store.session.query(AlchemyFact)
 
-        # FIXME: Only use func.datetime on SQLite store.
-        #
-        #   (lb): SQLite stores datetimes as strings, so what's in the store
-        #   might vary depending on, say, changes to this code. As such, some
-        #   start and end times might include seconds, and some times might not.
-        #   Here we use func.datetime and query_prepare_datetime to normalize the
-        #   comparison. But this is SQLite-specific, so we should abstract
-        #   the operation for other DBMSes (and probably do nothing, since most
-        #   other databases have an actual datetime data type).
-        condition = and_(func.datetime(AlchemyFact.end) > start)
+        condition = and_(AlchemyFact.end > start)
         if fact.end is not None:
             end = query_prepare_datetime(fact.end)
-            condition = and_(condition, func.datetime(AlchemyFact.start) < end)
+            condition = and_(condition, AlchemyFact.start < end)
         else:
             # The fact is ongoing, so match the ongoing (active) Fact in the store.
             # E711: `is None` breaks Alchemy, so use `== None`.
@@ -308,10 +772,14 @@ class FactManager(GatherFactManager):
             self.store.logger.error(message)
             # FIXME/2018-06-08: (lb): I think we need custom Exceptions...
             raise Exception(message)
+        self.rollups_update([alchemy_fact], -1)
         alchemy_fact.deleted = True
+        self.interval_index_update([alchemy_fact])
         if purge:
             self.store.session.delete(alchemy_fact)
-        self.store.session.commit()
+        elif self.store.config["db.archive_deleted"]:
+            self.archive([alchemy_fact.pk], skip_commit=True)
+        self.store.commit()
         self.store.logger.debug("Deleted: {!r}".format(fact))
 
     # ***
@@ -338,15 +806,18 @@ class FactManager(GatherFactManager):
         """
         self.store.logger.debug("Received PK: ‘{}’ / raw: {}.".format(pk, raw))
 
+        result = None
         if deleted is None:
-            query = self.store.session.query(AlchemyFact)
-            result = query.get(pk)
-        else:
-            query = self.store.session.query(AlchemyFact)
+            result = self.session_loaded_fact(pk)
+        if result is None:
+            query = self.query_load_related(self.store.session.query(AlchemyFact))
+            if deleted is not False:
+                query = self.query_load_archive(query)
             query = query.filter(AlchemyFact.pk == pk)
             query = query_apply_true_or_not(query, AlchemyFact.deleted, deleted)
             results = query.all()
             assert len(results) <= 1
+            self.archive_load_tags(results)
             result = results[0] if results else None
 
         if not result:
@@ -382,6 +853,130 @@ class FactManager(GatherFactManager):
             query = query.filter(AlchemyFact.pk != fact.pk)
         return query
 
+    def query_load_related(self, query):
+        """
+        Loads each Fact's Activity, Category, and Tags with the Facts.
+
+        Otherwise, as each AlchemyFact is hydrated, SQLAlchemy lazy-loads its
+        Tags (and its Activity and Category, unless already in the Session),
+        running a few queries per Fact. Instead, join the Activity and Category,
+        and load the Tags of all the Facts using one more query (selectin).
+        """
+        return query.options(
+            joinedload(AlchemyFact.activity).joinedload(AlchemyActivity.category),
+            selectinload(AlchemyFact.tags),
+        )
+
+    def session_loaded_fact(self, pk):
+        """Returns the AlchemyFact from the Session, if loaded (with its Tags)."""
+        identity_key = self.store.session.identity_key(AlchemyFact, pk)
+        alchemy_fact = self.store.session.identity_map.get(identity_key)
+        if alchemy_fact is None:
+            return None
+        if not inspect(alchemy_fact).unloaded.isdisjoint(SESSION_LOADED_ATTRS):
+            return None
+        return alchemy_fact
+
+    def query_load_facts(self, query):
+        """Returns the query results as Facts, loaded using query_load_related."""
+        query = self.query_load_related(query)
+        return [alchemy_fact.as_hamster(self.store) for alchemy_fact in query]
+
+    def archive_load_tags(self, alchemy_facts):
+        """
+        Loads the archived Facts' Tags, which query_load_related does not find.
+
+        The ``tags`` relationship only reads the live fact_tags table, so each
+        archived Fact loads without any Tags. Look up the Tags of the deleted
+        Facts that loaded without any, from fact_tags_archive (see archive).
+        """
+        tagless = {
+            alchemy_fact.pk: alchemy_fact
+            for alchemy_fact in alchemy_facts
+            if alchemy_fact.deleted and not alchemy_fact.tags
+        }
+        pks = list(tagless.keys())
+        archived_tags = defaultdict(list)
+        for offset in range(0, len(pks), ARCHIVE_TAGS_CHUNK_SIZE):
+            chunk = pks[offset : offset + ARCHIVE_TAGS_CHUNK_SIZE]
+            query = self.store.session.query(fact_tags_archive.c.fact_id, AlchemyTag)
+            query = query.join(AlchemyTag, AlchemyTag.pk == fact_tags_archive.c.tag_id)
+            query = query.filter(fact_tags_archive.c.fact_id.in_(chunk))
+            for fact_id, alchemy_tag in query:
+                archived_tags[fact_id].append(alchemy_tag)
+        for fact_id, alchemy_tags in archived_tags.items():
+            set_committed_value(tagless[fact_id], "tags", alchemy_tags)
+
+    # ***
+
+    def archive(self, pks=None, skip_commit=False):
+        """
+        Move deleted Facts, and their Tag links, to the archive tables.
+
+        Each edit leaves the Fact it replaces behind, marked deleted, and
+        every live query has to skip over those rows. Archiving moves them
+        to facts_archive and fact_tags_archive, where only the queries that
+        ask for deleted Facts look for them (see get, histories, and gather
+        with ``deleted`` not False). To archive each Fact as it's deleted,
+        enable ``db.archive_deleted``.
+
+        An archived Fact's PK is never assigned to a new Fact, because the
+        facts table is AUTOINCREMENT (see objects), and add_many assigns PKs
+        after the highest PK in either table.
+
+        Args:
+            pks (list of int, optional): The PKs of the deleted Facts
+                to archive, or None to archive all deleted Facts.
+
+            skip_commit (bool): If True, do not commit (the caller will).
+
+        Returns:
+            int: The number of Facts archived.
+        """
+        session = self.store.session
+        session.flush()
+
+        condition = facts.c.deleted == True  # noqa: E712
+        if pks is not None:
+            condition = and_(condition, facts.c.id.in_(pks))
+        archiving = select(facts.c.id).where(condition)
+        archived_pks = session.execute(archiving).scalars().all()
+        if not archived_pks:
+            return 0
+
+        session.execute(
+            facts_archive.insert().from_select(
+                [col.name for col in facts.c], select(facts).where(condition)
+            )
+        )
+        session.execute(
+            fact_tags_archive.insert().from_select(
+                [col.name for col in fact_tags.c],
+                select(fact_tags).where(fact_tags.c.fact_id.in_(archiving)),
+            )
+        )
+        # Delete the Facts before their Tag links, so that the facts_fts
+        # fact_tags trigger does not reindex each Fact as it loses each Tag.
+        session.execute(facts.delete().where(condition))
+        for offset in range(0, len(archived_pks), ARCHIVE_TAGS_CHUNK_SIZE):
+            chunk = archived_pks[offset : offset + ARCHIVE_TAGS_CHUNK_SIZE]
+            session.execute(fact_tags.delete().where(fact_tags.c.fact_id.in_(chunk)))
+
+        # Forget the archived Facts, whose rows are no longer in facts.
+        for pk in archived_pks:
+            alchemy_fact = session.identity_map.get(
+                session.identity_key(AlchemyFact, pk)
+            )
+            if alchemy_fact is not None:
+                session.expunge(alchemy_fact)
+
+        if not skip_commit:
+            self.store.commit()
+
+        self.store.logger.debug("Archived: {} Facts".format(len(archived_pks)))
+
+        return len(archived_pks)
+
     # ***
 
     def starting_at(self, fact):
@@ -404,7 +999,7 @@ class FactManager(GatherFactManager):
             raise ValueError("No `start` for starting_at(fact).")
 
         start_at = query_prepare_datetime(fact.start)
-        condition = and_(func.datetime(AlchemyFact.start) == start_at)
+        condition = and_(AlchemyFact.start == start_at)
 
         # Excluded 'deleted' Facts.
         condition = and_(condition, AlchemyFact.deleted == False)  # noqa: E712
@@ -416,18 +1011,16 @@ class FactManager(GatherFactManager):
 
         self.store.logger.debug("fact: {} / query: {}".format(fact, str(query)))
 
-        n_facts = query.count()
-        if n_facts > 1:
+        found_facts = self.query_load_facts(query)
+        if len(found_facts) > 1:
             message = (
                 'More than one fact found starting at "{}": {} facts found'.format(
-                    fact.start, n_facts
+                    fact.start, len(found_facts)
                 )
             )
             raise ValueError(message)
 
-        found = query.one_or_none()
-        found_fact = found.as_hamster(self.store) if found else None
-        return found_fact
+        return found_facts[0] if found_facts else None
 
     # ***
 
@@ -451,7 +1044,7 @@ class FactManager(GatherFactManager):
             raise ValueError("No `end` for ending_at(fact).")
 
         end_at = query_prepare_datetime(fact.end)
-        condition = and_(func.datetime(AlchemyFact.end) == end_at)
+        condition = and_(AlchemyFact.end == end_at)
 
         # Excluded 'deleted' Facts.
         condition = and_(condition, AlchemyFact.deleted == False)  # noqa: E712
@@ -463,17 +1056,15 @@ class FactManager(GatherFactManager):
 
         self.store.logger.debug("fact: {} / query: {}".format(fact, str(query)))
 
-        n_facts = query.count()
-        if n_facts > 1:
+        found_facts = self.query_load_facts(query)
+        if len(found_facts) > 1:
             message = 'More than one fact found ending at "{}": {} facts found'.format(
                 fact.end,
-                n_facts,
+                len(found_facts),
             )
             raise ValueError(message)
 
-        found = query.one_or_none()
-        found_fact = found.as_hamster(self.store) if found else None
-        return found_fact
+        return found_facts[0] if found_facts else None
 
     # ***
 
@@ -494,8 +1085,32 @@ class FactManager(GatherFactManager):
         Raises:
             ValueError: If neither ``start`` nor ``end`` is set on fact.
         """
+        ref_time = self.antecedent_ref_time(fact, ref_time)
+
+        interval_index = self.interval_index_get()
+        if interval_index is not None:
+            found_pk = interval_index.antecedent(
+                ref_time, **self.interval_index_fact_pks(fact)
+            )
+            return self.get(found_pk) if found_pk is not None else None
+
         query = self.store.session.query(AlchemyFact)
+        query = query.filter(self.criteria_antecedent(fact, ref_time))
+        # Exclude fact.pk from results.
+        query = self.query_exclude_fact(query, fact)
+        # Order by (start time, end time, fact ID), descending.
+        query = self.query_order_by_start(query, desc)
+
+        query = query.limit(1)
 
+        self.store.logger.debug(
+            "fact: {} / ref_time: {} / query: {}".format(fact, ref_time, str(query))
+        )
+
+        found_facts = self.query_load_facts(query)
+        return found_facts[0] if found_facts else None
+
+    def antecedent_ref_time(self, fact, ref_time):
         if fact is not None:
             if fact.end and isinstance(fact.end, datetime):
                 # A Closed Fact.
@@ -509,8 +1124,10 @@ class FactManager(GatherFactManager):
             #   raw_fact: '2015-12-12 13:00 foo@bar', time_hint: 'verify_both'
             raise ValueError(_("No reference time for antecedent(fact)."))
 
-        ref_time = query_prepare_datetime(ref_time)
+        return query_prepare_datetime(ref_time)
 
+    def criteria_antecedent(self, fact, ref_time):
+        """Returns the criteria that match the Facts that precede the reference."""
         before_active_fact_start = and_(
             AlchemyFact.end == None,  # noqa: E711
             # Except rather than <=, use less than, otherwise
@@ -525,7 +1142,7 @@ class FactManager(GatherFactManager):
             #   not <= otherwise antecedent of fact -2 would be fact -1.
             #   (The subsequent function will see it, though, as it
             #   looks for AlchemyFact.start >= ref_time.)
-            func.datetime(AlchemyFact.start) < ref_time,
+            AlchemyFact.start < ref_time,
         )
 
         # (lb): This intricate query is meant to handle momentaneous Facts. If
@@ -559,14 +1176,14 @@ class FactManager(GatherFactManager):
         # should return the momentaneous Fact. If antecedent is called
         # again on the momentaneous Fact, return the one that starts at 11a.
         # Start by including any Fact that ends *before*, but not at, ref_time.
-        or_criteria.append(func.datetime(AlchemyFact.end) < ref_time)
+        or_criteria.append(AlchemyFact.end < ref_time)
         # Next, include any Fact that ends at ref_time but is not momentaneous.
         # Given the previous example of three Facts, given the momentaneous
         # Fact at 12:00:00, this will find the earlier Fact from 11a to 12p.
         or_criteria.append(
             and_(
-                func.datetime(AlchemyFact.end) == ref_time,
-                func.datetime(AlchemyFact.start) < ref_time,
+                AlchemyFact.end == ref_time,
+                AlchemyFact.start < ref_time,
             )
         )
         # Finally, include any momentaneous Fact that occupies the moment at
@@ -581,8 +1198,8 @@ class FactManager(GatherFactManager):
             # we call query_order_by_start to ensure the order is correct.)
             or_criteria.append(
                 and_(
-                    func.datetime(AlchemyFact.end) == ref_time,
-                    func.datetime(AlchemyFact.start) == ref_time,
+                    AlchemyFact.end == ref_time,
+                    AlchemyFact.start == ref_time,
                     AlchemyFact.pk < fact.pk,
                 )
             )
@@ -598,21 +1215,14 @@ class FactManager(GatherFactManager):
 
         # Excluded 'deleted' Facts.
         condition = and_(condition, AlchemyFact.deleted == False)  # noqa: E712
-        query = query.filter(condition)
-        # Exclude fact.pk from results.
-        query = self.query_exclude_fact(query, fact)
-        # Order by (start time, end time, fact ID), descending.
-        query = self.query_order_by_start(query, desc)
-
-        query = query.limit(1)
+        return condition
 
-        self.store.logger.debug(
-            "fact: {} / ref_time: {} / query: {}".format(fact, ref_time, str(query))
-        )
-
-        found = query.one_or_none()
-        found_fact = found.as_hamster(self.store) if found else None
-        return found_fact
+    def interval_index_fact_pks(self, fact):
+        # Mimic the queries: The PK breaks ties between momentaneous Facts, and
+        # the reference Fact itself is excluded (unless it's not stored).
+        pk = fact.pk if fact is not None else None
+        exclude_pk = pk if fact is not None and not fact.unstored else None
+        return {"pk": pk, "exclude_pk": exclude_pk}
 
     # ***
 
@@ -633,8 +1243,32 @@ class FactManager(GatherFactManager):
         Raises:
             ValueError: If neither ``start`` nor ``end`` is set on fact.
         """
+        ref_time = self.subsequent_ref_time(fact, ref_time)
+
+        interval_index = self.interval_index_get()
+        if interval_index is not None:
+            found_pk = interval_index.subsequent(
+                ref_time, **self.interval_index_fact_pks(fact)
+            )
+            return self.get(found_pk) if found_pk is not None else None
+
         query = self.store.session.query(AlchemyFact)
+        query = query.filter(self.criteria_subsequent(fact, ref_time))
+        # Exclude fact.pk from results.
+        query = self.query_exclude_fact(query, fact)
+        # Order by (start time, end time, fact ID), ascending.
+        query = self.query_order_by_start(query, asc)
+
+        query = query.limit(1)
 
+        self.store.logger.debug(
+            "fact: {} / ref_time: {} / query: {}".format(fact, ref_time, str(query))
+        )
+
+        found_facts = self.query_load_facts(query)
+        return found_facts[0] if found_facts else None
+
+    def subsequent_ref_time(self, fact, ref_time):
         if fact is not None:
             if fact.start and isinstance(fact.start, datetime):
                 ref_time = fact.start
@@ -648,23 +1282,25 @@ class FactManager(GatherFactManager):
         if ref_time is None:
             raise ValueError(_("No reference time for subsequent(fact)."))
 
-        ref_time = query_prepare_datetime(ref_time)
+        return query_prepare_datetime(ref_time)
 
+    def criteria_subsequent(self, fact, ref_time):
+        """Returns the criteria that match the Facts that follow the reference."""
         # See comments in antecedent that explain the logic here (albeit
         # the complementary logic, for searching backwards, not forward).
         or_criteria = []
-        or_criteria.append(func.datetime(AlchemyFact.start) > ref_time)
+        or_criteria.append(AlchemyFact.start > ref_time)
         or_criteria.append(
             and_(
-                func.datetime(AlchemyFact.start) == ref_time,
-                func.datetime(AlchemyFact.end) > ref_time,
+                AlchemyFact.start == ref_time,
+                AlchemyFact.end > ref_time,
             )
         )
         if fact is not None and fact.pk is not None:
             or_criteria.append(
                 and_(
-                    func.datetime(AlchemyFact.start) == ref_time,
-                    func.datetime(AlchemyFact.end) == ref_time,
+                    AlchemyFact.start == ref_time,
+                    AlchemyFact.end == ref_time,
                     AlchemyFact.pk > fact.pk,
                 )
             )
@@ -678,21 +1314,262 @@ class FactManager(GatherFactManager):
 
         # Excluded 'deleted' Facts.
         condition = and_(condition, AlchemyFact.deleted == False)  # noqa: E712
-        query = query.filter(condition)
-        # Exclude fact.pk from results.
-        query = self.query_exclude_fact(query, fact)
-        # Order by (start time, end time, fact ID), ascending.
-        query = self.query_order_by_start(query, asc)
+        return condition
 
-        query = query.limit(1)
+    # ***
 
-        self.store.logger.debug(
-            "fact: {} / ref_time: {} / query: {}".format(fact, ref_time, str(query))
-        )
+    def window(self, ref, before=1, after=1):
+        """
+        Return the Facts surrounding the indicated Fact or time, using one query.
+
+        Args:
+            ref (nark.Fact or datetime.datetime): The Fact or time to reference.
+
+            before (int): The number of preceding Facts to find.
+
+            after (int): The number of following Facts to find.
 
-        found = query.one_or_none()
-        found_fact = found.as_hamster(self.store) if found else None
-        return found_fact
+        Returns:
+            list: The preceding Facts, then the reference Fact (if it's stored,
+            and not deleted), then the following Facts, ordered by start time
+            (then end, then PK).
+            The preceding Facts are those that calling antecedent ``before``
+            times finds (and likewise for the following Facts, and subsequent),
+            but the query fetches each Fact's Activity, Category, and Tags, too.
+
+        Raises:
+            ValueError: If the reference Fact has neither ``start`` nor ``end``.
+        """
+        if isinstance(ref, datetime):
+            fact, ref_time = None, ref
+        else:
+            fact, ref_time = ref, None
+        stored_pk = fact.pk if fact is not None and not fact.unstored else None
+
+        def _window():
+            query = self.store.session.query(AlchemyFact)
+            query = query.filter(AlchemyFact.pk.in_(window_pks()))
+            # The neighbors are never deleted, but the reference Fact might be.
+            query = query.filter(AlchemyFact.deleted == False)  # noqa: E712
+            query = query.options(
+                joinedload(AlchemyFact.activity).joinedload(AlchemyActivity.category),
+                joinedload(AlchemyFact.tags),
+            )
+            query = self.query_order_by_start(query, asc)
+
+            self.store.logger.debug("ref: {} / query: {}".format(ref, str(query)))
+
+            return [alchemy_fact.as_hamster(self.store) for alchemy_fact in query]
+
+        def window_pks():
+            interval_index = self.interval_index_get()
+            if interval_index is not None:
+                return window_pks_indexed(interval_index)
+            return window_pks_select()
+
+        # ***
+
+        def window_pks_indexed(interval_index):
+            # Maps each PK to its (start, end).
+            spans = interval_index.spans
+            pks = []
+            if before > 0:
+                pks.extend(
+                    window_pks_indexed_chain(
+                        interval_index.antecedent,
+                        self.antecedent_ref_time(fact, ref_time),
+                        before,
+                        lambda start, end: end or start,
+                        spans,
+                    )
+                )
+            if stored_pk is not None:
+                pks.append(stored_pk)
+            if after > 0:
+                pks.extend(
+                    window_pks_indexed_chain(
+                        interval_index.subsequent,
+                        self.subsequent_ref_time(fact, ref_time),
+                        after,
+                        lambda start, end: start or end,
+                        spans,
+                    )
+                )
+            return pks
+
+        def window_pks_indexed_chain(find_pk, step_time, count, next_ref_time, spans):
+            # Mimic calling antecedent (or subsequent) on each Fact found.
+            pks = []
+            fact_pks = self.interval_index_fact_pks(fact)
+            found_pk = find_pk(step_time, **fact_pks)
+            while found_pk is not None:
+                pks.append(found_pk)
+                if len(pks) == count:
+                    break
+                step_time = next_ref_time(*spans[found_pk])
+                found_pk = find_pk(step_time, pk=found_pk, exclude_pk=found_pk)
+            return pks
+
+        # ***
+
+        def window_pks_select():
+            selects = []
+            if before > 0:
+                selects.append(
+                    window_pks_select_neighbors(
+                        self.criteria_antecedent(
+                            fact, self.antecedent_ref_time(fact, ref_time)
+                        ),
+                        desc,
+                        before,
+                    )
+                )
+            if stored_pk is not None:
+                selects.append(select(literal(stored_pk)))
+            if after > 0:
+                selects.append(
+                    window_pks_select_neighbors(
+                        self.criteria_subsequent(
+                            fact, self.subsequent_ref_time(fact, ref_time)
+                        ),
+                        asc,
+                        after,
+                    )
+                )
+            if not selects:
+                return []
+            return union_all(*selects)
+
+        def window_pks_select_neighbors(criteria, direction, count):
+            neighbors = select(AlchemyFact.pk.label("pk")).where(criteria)
+            if stored_pk is not None:
+                neighbors = neighbors.where(AlchemyFact.pk != stored_pk)
+            neighbors = neighbors.order_by(
+                *[direction(col) for col in self.cols_order_by_start(None)]
+            )
+            # SQLite only allows LIMIT on a compound SELECT's members
+            # if they're subqueries.
+            neighbors = neighbors.limit(count).subquery()
+            return select(neighbors.c.pk)
+
+        return _window()
+
+    # ***
+
+    def history(self, fact):
+        """
+        Return the edit history of a Fact, from its original to its latest edit.
+
+        Args:
+            fact (nark.Fact): The Fact, or any of its edits, with its PK set.
+
+        Returns:
+            list: The Facts that the Fact was split from (each edit's
+            ``split_from``), and the Fact, and the Facts split from it,
+            ordered by PK (i.e., by when each was saved). Earlier edits
+            are marked deleted.
+
+        Raises:
+            ValueError: If the Fact does not have a PK.
+        """
+        return self.histories([fact])[0]
+
+    def histories(self, facts):
+        """
+        Return the edit history of each Fact, using one query.
+
+        Rather than walking each ``split_from`` (or ``sub_facts``) one query at
+        a time, one recursive CTE walks every chain, from each Fact back to its
+        original, and from each Fact forward to its latest edit, through the
+        live and the archived Facts (see archive). The Facts are loaded with
+        their Activity, Category, and Tags (see query_load_related).
+
+        Args:
+            facts (list of nark.Fact): The Facts, each with its PK set.
+
+        Returns:
+            list: One history list per input Fact, in the same order (see history).
+
+        Raises:
+            ValueError: If a Fact does not have a PK.
+        """
+
+        def _histories():
+            pks = [must_have_pk(fact) for fact in facts]
+            if not pks:
+                return []
+            chains = query_chains(pks)
+            query = self.store.session.query(AlchemyFact, chains.c.root_pk)
+            query = self.query_load_archive(query)
+            query = query.join(chains, AlchemyFact.pk == chains.c.pk)
+            query = query.order_by(chains.c.root_pk, AlchemyFact.pk)
+            query = self.query_load_related(query)
+
+            self.store.logger.debug("query: {}".format(str(query)))
+
+            records = query.all()
+            self.archive_load_tags([alchemy_fact for alchemy_fact, _root_pk in records])
+            histories = {pk: [] for pk in pks}
+            for alchemy_fact, root_pk in records:
+                histories[root_pk].append(alchemy_fact.as_hamster(self.store))
+            return [histories[pk] for pk in pks]
+
+        def must_have_pk(fact):
+            if not fact.pk:
+                message = _(
+                    "The Fact passed ('{!r}') does not have a PK."
+                    " We do not know which history to find."
+                ).format(fact)
+                self.store.logger.error(message)
+                raise ValueError(message)
+            return fact.pk
+
+        def query_chains(pks):
+            # Each row is a Fact in the chain of the root (input) Fact, and the
+            # direction it was found: 0 for the root, -1 walking to the Facts
+            # it was split from, and 1 walking to the Facts split from it. (The
+            # direction keeps each walk going the one way, and it's UNION, not
+            # UNION ALL, so a (corrupt) cycle of split_from does not loop.)
+            root_facts = select(
+                facts_and_archive.c.id.label("root_pk"),
+                facts_and_archive.c.id.label("pk"),
+                facts_and_archive.c.split_from_id.label("split_from_id"),
+                literal(0).label("direction"),
+            ).where(facts_and_archive.c.id.in_(pks))
+            chains = root_facts.cte("chains", recursive=True)
+            chain_facts = [
+                query_chain_facts(chains, chain_table) for chain_table in chain_tables()
+            ]
+            return chains.union(*chain_facts)
+
+        def query_chain_facts(chains, chain_table):
+            split_from = and_(
+                chains.c.direction <= 0,
+                chain_table.c.id == chains.c.split_from_id,
+            )
+            split_into = and_(
+                chains.c.direction >= 0,
+                chain_table.c.split_from_id == chains.c.pk,
+            )
+            return select(
+                chains.c.root_pk,
+                chain_table.c.id,
+                chain_table.c.split_from_id,
+                case((chain_table.c.id == chains.c.split_from_id, -1), else_=1),
+            ).join_from(chains, chain_table, or_(split_from, split_into))
+
+        def chain_tables():
+            # Walk the facts and facts_archive tables each with its own
+            # recursive step, so that each step searches their indexes.
+            # (Joining the facts_and_archive union instead materializes
+            # the whole union on every step.) But SQLite only supports
+            # more than one recursive step as of 3.34.0.
+            dialect = self.store.session.get_bind().dialect
+            if dialect.name == "sqlite" and dialect.server_version_info >= (3, 34):
+                return HISTORY_CHAIN_TABLES
+            return (facts_and_archive,)
+
+        return _histories()
 
     # ***
 
@@ -716,15 +1593,15 @@ class FactManager(GatherFactManager):
         query = self.store.session.query(AlchemyFact)
 
         condition = and_(
-            func.datetime(AlchemyFact.start) >= query_prepare_datetime(since),
+            AlchemyFact.start >= query_prepare_datetime(since),
             or_(
                 and_(
                     AlchemyFact.end != None,  # noqa: E711
-                    func.datetime(AlchemyFact.end) <= query_prepare_datetime(until),
+                    AlchemyFact.end <= query_prepare_datetime(until),
                 ),
                 and_(
                     AlchemyFact.end == None,  # noqa: E711
-                    func.datetime(AlchemyFact.start) <= query_prepare_datetime(until),
+                    AlchemyFact.start <= query_prepare_datetime(until),
                 ),
             ),
         )
@@ -739,23 +1616,23 @@ class FactManager(GatherFactManager):
             "since: {} / until: {} / query: {}".format(since, until, str(query))
         )
 
+        found_facts = self.query_load_facts(query)
+
         # LATER: (lb): We'll let the client ask for as many records as they
         # want. But we might want to offer ways to deal more gracefully with
         # it, like via pagination; or a fetch_one callback, so that only item
         # gets loaded in memory at a time, rather than everything. For now, we
         # can at least warn, I suppose.
-        during_count = query.count()
+        during_count = len(found_facts)
         if during_count > result_limit:
             # (lb): hamster-lib would `raise OverflowError`,
             # but that seems drastic.
             message = _(
                 "This is your alert that lots of Facts were found between "
-                "the two dates specified: found {}.".factor(during_count)
-            )
+                "the two dates specified: found {}."
+            ).format(during_count)
             self.store.logger.warning(message)
 
-        facts = query.all()
-        found_facts = [fact.as_hamster(self.store) for fact in facts]
         return found_facts
 
     # ***
@@ -776,26 +1653,43 @@ class FactManager(GatherFactManager):
         Raises:
             ValueError: If more than one Fact found at given time.
         """
+        interval_index = self.interval_index_get()
+        if interval_index is not None:
+            found_pks = interval_index.surrounding(
+                query_prepare_datetime(fact_time), inclusive=inclusive
+            )
+            if not inclusive and len(found_pks) > 1:
+                message = 'Broken time frame found at "{}": {} facts found'.format(
+                    fact_time, len(found_pks)
+                )
+                raise ValueError(message)
+            if not found_pks:
+                return []
+            query = self.store.session.query(AlchemyFact)
+            query = query.filter(AlchemyFact.pk.in_(found_pks))
+            query = self.query_order_by_start(query, asc)
+            return self.query_load_facts(query)
+
         query = self.store.session.query(AlchemyFact)
 
         cmp_time = query_prepare_datetime(fact_time)
 
         if not inclusive:
             condition = and_(
-                func.datetime(AlchemyFact.start) < cmp_time,
+                AlchemyFact.start < cmp_time,
                 # Find surrounding complete facts, or the ongoing fact.
                 or_(
                     AlchemyFact.end == None,  # noqa: E711
-                    func.datetime(AlchemyFact.end) > cmp_time,
+                    AlchemyFact.end > cmp_time,
                 ),
             )
         else:
             condition = and_(
-                func.datetime(AlchemyFact.start) <= cmp_time,
+                AlchemyFact.start <= cmp_time,
                 # Find surrounding complete facts, or the ongoing fact.
                 or_(
                     AlchemyFact.end == None,  # noqa: E711
-                    func.datetime(AlchemyFact.end) >= cmp_time,
+                    AlchemyFact.end >= cmp_time,
                 ),
             )
 
@@ -809,16 +1703,13 @@ class FactManager(GatherFactManager):
             "fact_time: {} / query: {}".format(fact_time, str(query))
         )
 
-        if not inclusive:
-            n_facts = query.count()
-            if n_facts > 1:
-                message = 'Broken time frame found at "{}": {} facts found'.format(
-                    fact_time, n_facts
-                )
-                raise ValueError(message)
+        found_facts = self.query_load_facts(query)
+        if not inclusive and len(found_facts) > 1:
+            message = 'Broken time frame found at "{}": {} facts found'.format(
+                fact_time, len(found_facts)
+            )
+            raise ValueError(message)
 
-        facts = query.all()
-        found_facts = [fact.as_hamster(self.store) for fact in facts]
         return found_facts
 
     # ***
@@ -847,9 +1738,7 @@ class FactManager(GatherFactManager):
 
         self.store.logger.debug("query: {}".format(str(query)))
 
-        facts = query.all()
-        found_facts = [fact.as_hamster(self.store) for fact in facts]
-        return found_facts
+        return self.query_load_facts(query)
 
     # ***
 
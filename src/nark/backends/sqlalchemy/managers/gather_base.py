@@ -17,14 +17,28 @@
 
 """Base aggregate item fetch implementation."""
 
-from sqlalchemy import func
+from gettext import gettext as _
+
+from sqlalchemy import asc, desc, false, func, literal, null, select, union_all
 from sqlalchemy.sql.expression import and_, or_
 
-from ..objects import AlchemyActivity, AlchemyCategory, AlchemyFact, AlchemyTag
+from ..objects import (
+    AlchemyActivity,
+    AlchemyCategory,
+    AlchemyFact,
+    AlchemyTag,
+    fact_daily_rollups,
+    fact_tags,
+    facts,
+)
 from . import (
     query_apply_limit_offset,
+    query_apply_true_or_not,
+    query_decode_cursor,
+    query_encode_cursor,
     query_prepare_datetime,
     query_sort_order_at_index,
+    query_split_search_terms,
 )
 
 __all__ = ("GatherBaseAlchemyManager",)
@@ -77,10 +91,14 @@ class GatherBaseAlchemyManager(object):
         )
         # If user is requesting filtering or sorting according to time, join Fact.
         requires_fact_table = self._gather_query_requires_fact(qt, compute_usage)
+        # If the aggregates can be computed from the daily rollups, skip Fact.
+        use_rollups = requires_fact_table and self._gather_query_allows_rollups(qt)
 
         def _gather_items():
             self.store.logger.debug(qt)
 
+            self.store.session_release_maybe()
+
             query, agg_cols = _gather_query_start()
 
             query = self.query_filter_by_fact_times(
@@ -91,6 +109,8 @@ class GatherBaseAlchemyManager(object):
                 qt.partial,
             )
 
+            query = query_filter_by_fact_deleted(query)
+
             query = self.query_filter_by_activities(query, qt)
 
             query = self.query_filter_by_categories(query, qt)
@@ -104,6 +124,8 @@ class GatherBaseAlchemyManager(object):
 
             query = self.query_filter_by_item_pk(query, alchemy_cls, qt.key)
 
+            query, seek_cols, seek_direction = self.query_filter_by_cursor(query, qt)
+
             # FIXME/2020-06-03: Activity.deleted should not be used/useful.
             # (lb): And I've got some deleted = 0 and some deleted = 1 in my
             # database, but mostly deleted IS NULL, so skip deleted in WHERE
@@ -113,10 +135,14 @@ class GatherBaseAlchemyManager(object):
 
             query = query_group_by_aggregate(query, agg_cols)
 
-            has_facts = requires_fact_table
-            query = self.query_order_by_sort_cols(query, qt, has_facts, *agg_cols)
+            if seek_cols is not None:
+                query = self.query_order_by_cols(query, seek_direction, seek_cols)
+            else:
+                has_facts = requires_fact_table
+                query = self.query_order_by_sort_cols(query, qt, has_facts, *agg_cols)
 
-            query = query_apply_limit_offset(query, qt.limit, qt.offset)
+            limit = self.query_seek_limit(qt, seek_cols)
+            query = query_apply_limit_offset(query, limit, qt.offset)
 
             query = query_select_with_entities(query, agg_cols)
 
@@ -126,6 +152,8 @@ class GatherBaseAlchemyManager(object):
                 results = query.count()
             else:
                 results = query.all()
+                if seek_cols is not None:
+                    results = self.query_seek_results(results, qt, seek_cols)
                 results = _gather_process_results(results)
 
             return results
@@ -137,6 +165,16 @@ class GatherBaseAlchemyManager(object):
 
             if not requires_fact_table:
                 query = self._gather_query_start_timeless(qt, alchemy_cls)
+            elif use_rollups:
+                rollup_rows = self._gather_query_rollup_rows(qt)
+                if qt.include_stats or qt.sort_cols_has_any("usage"):
+                    count_col = func.sum(rollup_rows.c.count).label("uses")
+                    agg_cols.append(count_col)
+                if qt.include_stats or qt.sort_cols_has_any("time"):
+                    # Same as the julianday difference, the span is in days.
+                    time_col = (func.sum(rollup_rows.c.seconds) / 86400.0).label("span")
+                    agg_cols.append(time_col)
+                query = self._gather_query_start_rollup(qt, agg_cols, rollup_rows)
             else:
                 if qt.include_stats or qt.sort_cols_has_any("usage"):
                     # (lb): I tried the COUNT() on the pk, e.g.,
@@ -161,14 +199,30 @@ class GatherBaseAlchemyManager(object):
 
         # ***
 
+        def query_filter_by_fact_deleted(query):
+            # The rollups only tally non-deleted Facts, so no need to filter.
+            if not requires_fact_table or use_rollups:
+                return query
+            return query_apply_true_or_not(query, AlchemyFact.deleted, qt.deleted)
+
+        # ***
+
         def query_filter_by_search_term(query):
             if not qt.search_terms:
                 return query
 
-            filters = []
-            for term in qt.search_terms:
-                filters.append(alchemy_cls.name.ilike("%{}%".format(term)))
-            query = query.filter(or_(*filters))
+            included, excluded = query_split_search_terms(qt.search_terms)
+            if included:
+                query = query.filter(
+                    or_(
+                        *[
+                            alchemy_cls.name.ilike("%{}%".format(term))
+                            for term in included
+                        ]
+                    )
+                )
+            for term in excluded:
+                query = query.filter(~alchemy_cls.name.ilike("%{}%".format(term)))
 
             return query
 
@@ -220,6 +274,57 @@ class GatherBaseAlchemyManager(object):
     def _gather_query_start_aggregate(self, qt, agg_cols):
         raise NotImplementedError
 
+    def _gather_query_start_rollup(self, qt, agg_cols, rollup_rows):
+        raise NotImplementedError
+
+    def _gather_query_rollup_rows(self, qt, tagged=False):
+        # The daily rollups tally the closed Facts, so add a row for the active
+        # Fact, if any. Its span is NULL, as is julianday(NULL) in the Fact
+        # query, so that both queries compute the same aggregates.
+        if not tagged:
+            tallied_condition = fact_daily_rollups.c.tag_id == 0
+            ongoing_tag_col = literal(0)
+            ongoing_from = facts
+        else:
+            tallied_condition = fact_daily_rollups.c.tag_id != 0
+            ongoing_tag_col = fact_tags.c.tag_id
+            ongoing_from = facts.join(fact_tags, fact_tags.c.fact_id == facts.c.id)
+        tallied = select(
+            fact_daily_rollups.c.activity_id,
+            fact_daily_rollups.c.tag_id,
+            fact_daily_rollups.c.seconds,
+            fact_daily_rollups.c.count,
+        ).where(tallied_condition)
+        ongoing = (
+            select(
+                func.coalesce(facts.c.activity_id, 0),
+                ongoing_tag_col,
+                null(),
+                literal(1),
+            )
+            .select_from(ongoing_from)
+            .where(
+                and_(
+                    facts.c.end_time == None,  # noqa: E711
+                    facts.c.deleted == False,  # noqa: E712
+                )
+            )
+        )
+        return union_all(tallied, ongoing).subquery("rollup_rows")
+
+    # ***
+
+    def _gather_query_allows_rollups(self, qt):
+        # The rollups tally whole days of non-deleted Facts, so they cannot
+        # answer queries on time, or on deleted Facts, or sorted by Fact.
+        allows_rollups = (
+            self.store.config["db.rollups"]
+            and not (qt.since or qt.until or qt.endless)
+            and qt.deleted is False
+            and not qt.sort_cols_has_any("start")
+        )
+        return allows_rollups
+
     # ***
 
     def _gather_query_requires_fact(self, qt, compute_usage):
@@ -259,8 +364,8 @@ class GatherBaseAlchemyManager(object):
                 # because AlchemyFact.start >= since should guarantee that.
                 query = query.filter(
                     or_(
-                        func.datetime(AlchemyFact.start) >= since,
-                        func.datetime(AlchemyFact.end) >= since,
+                        AlchemyFact.start >= since,
+                        AlchemyFact.end >= since,
                     ),
                 )
             elif not since and until:
@@ -269,20 +374,20 @@ class GatherBaseAlchemyManager(object):
                 # - Except maybe for an Active Fact?
                 query = query.filter(
                     or_(
-                        func.datetime(AlchemyFact.start) <= until,
-                        func.datetime(AlchemyFact.end) <= until,
+                        AlchemyFact.start <= until,
+                        AlchemyFact.end <= until,
                     ),
                 )
             elif since and until:
                 query = query.filter(
                     or_(
                         and_(
-                            func.datetime(AlchemyFact.start) >= since,
-                            func.datetime(AlchemyFact.start) <= until,
+                            AlchemyFact.start >= since,
+                            AlchemyFact.start <= until,
                         ),
                         and_(
-                            func.datetime(AlchemyFact.end) >= since,
-                            func.datetime(AlchemyFact.end) <= until,
+                            AlchemyFact.end >= since,
+                            AlchemyFact.end <= until,
                         ),
                     )
                 )
@@ -293,9 +398,9 @@ class GatherBaseAlchemyManager(object):
         def _get_complete_overlaps(query, since, until, endless=False):
             """Return all facts with start and end within the timeframe."""
             if since:
-                query = query.filter(func.datetime(AlchemyFact.start) >= since)
+                query = query.filter(AlchemyFact.start >= since)
             if until:
-                query = query.filter(func.datetime(AlchemyFact.end) <= until)
+                query = query.filter(AlchemyFact.end <= until)
             elif endless:
                 query = query.filter(AlchemyFact.end == None)  # noqa: E711
             return query
@@ -530,6 +635,154 @@ class GatherBaseAlchemyManager(object):
 
     # ***
 
+    def query_seek_cols(self, query_terms):
+        """
+        Returns the columns a paging cursor seeks on, or None if the sort cannot.
+
+        Items page by name (and by PK, to order items with the same name).
+        """
+        name_col = self._gather_query_order_by_name_col
+        sort_cols = list(query_terms.sort_cols or [])
+        if sort_cols and sort_cols not in (["name"], [name_col]):
+            return None
+        alchemy_cls = self._gather_query_alchemy_cls
+        return [alchemy_cls.name, alchemy_cls.pk]
+
+    def query_filter_by_cursor(self, query, query_terms):
+        """
+        Applies the QueryTerms ``after`` or ``before`` cursor, if any.
+
+        Returns:
+            tuple: The (query, seek_cols, direction), where seek_cols is None
+            unless the query is paged (i.e., uses limit, after, or before)
+            and sorts on columns that a cursor can seek.
+        """
+        qt = query_terms
+
+        def _query_filter_by_cursor():
+            cursor = qt.after or qt.before
+            if not cursor and not (qt.limit and qt.limit > 0):
+                return query, None, None
+
+            if qt.after and qt.before:
+                must_fail(_("Cannot page using both ‘after’ and ‘before’."))
+
+            seek_cols = self.query_seek_cols(qt)
+            if seek_cols is None:
+                if cursor:
+                    must_fail(_("Cannot page by cursor using the requested sort."))
+                return query, None, None
+
+            direction = query_sort_order_at_index(qt.sort_orders, 0)
+            if qt.before:
+                # Seek backwards, and reverse the results after.
+                direction = asc if direction is desc else desc
+
+            if not cursor:
+                return query, seek_cols, direction
+
+            values = query_decode_cursor(self.query_seek_key(seek_cols), cursor)
+            if values is None or len(values) != len(seek_cols):
+                must_fail(_("Unrecognized paging cursor: “{}”.").format(cursor))
+
+            criteria = self.query_seek_criteria(seek_cols, values, direction)
+            return query.filter(criteria), seek_cols, direction
+
+        def must_fail(message):
+            self.store.logger.error(message)
+            raise ValueError(message)
+
+        return _query_filter_by_cursor()
+
+    def query_seek_criteria(self, seek_cols, values, direction):
+        """Returns the criteria that matches rows that sort after the values."""
+
+        # Note that SQLite sorts NULL before all other values.
+        def _sorts_after(col, value):
+            if direction is asc:
+                return col.isnot(None) if value is None else col > value
+            return false() if value is None else or_(col < value, col.is_(None))
+
+        def _sorts_even(col, value):
+            return col.is_(None) if value is None else col == value
+
+        def _sorts_from(col, value):
+            # Bound the leading column by itself, too, so that the
+            # DBMS can seek its index, rather than scan all rows.
+            if value is None:
+                return col.is_(None) if direction is desc else None
+            if direction is asc:
+                return col >= value
+            return or_(col <= value, col.is_(None))
+
+        alternatives = []
+        for idx, (col, value) in enumerate(zip(seek_cols, values)):
+            evens = [
+                _sorts_even(even_col, even_value)
+                for even_col, even_value in zip(seek_cols[:idx], values[:idx])
+            ]
+            alternatives.append(and_(*evens, _sorts_after(col, value)))
+        criteria = or_(*alternatives)
+
+        lead_criteria = _sorts_from(seek_cols[0], values[0])
+        if lead_criteria is not None:
+            criteria = and_(lead_criteria, criteria)
+        return criteria
+
+    def query_seek_key(self, seek_cols):
+        # E.g., "AlchemyFact.start,AlchemyFact.end,AlchemyFact.pk".
+        return ",".join(str(col) for col in seek_cols)
+
+    def query_seek_limit(self, query_terms, seek_cols):
+        # Fetch one more row than requested, to know if there's another page.
+        limit = query_terms.limit
+        if seek_cols is not None and limit and not query_terms.count_results:
+            limit += 1
+        return limit
+
+    def query_seek_results(self, records, query_terms, seek_cols):
+        """
+        Trims the extra row from a paged query, and sets the paging cursors.
+
+        Returns:
+            list: The records, in the requested sort order.
+        """
+        qt = query_terms
+
+        has_more = bool(qt.limit) and len(records) > qt.limit
+        if has_more:
+            records = records[: qt.limit]
+        if qt.before:
+            records = list(reversed(records))
+
+        seek_key = self.query_seek_key(seek_cols)
+        alchemy_cls = seek_cols[0].class_
+
+        def _cursor_for(record):
+            item = record if isinstance(record, alchemy_cls) else record[0]
+            if item is None:
+                values = [None] * len(seek_cols)
+            else:
+                values = [getattr(item, col.key) for col in seek_cols]
+            return query_encode_cursor(seek_key, values)
+
+        qt.cursor_next = None
+        qt.cursor_prev = None
+        if records:
+            if qt.before:
+                qt.cursor_next = _cursor_for(records[-1])
+                if has_more:
+                    qt.cursor_prev = _cursor_for(records[0])
+            else:
+                if has_more:
+                    qt.cursor_next = _cursor_for(records[-1])
+                if qt.after or (qt.offset and qt.offset > 0):
+                    qt.cursor_prev = _cursor_for(records[0])
+
+        return records
+
+    # ***
+
     def cols_order_by_start(self, query):
         # Include end so that momentaneous Facts are sorted properly.
         # - And add PK, too, so momentaneous Facts are sorted predictably.
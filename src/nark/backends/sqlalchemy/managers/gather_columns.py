@@ -0,0 +1,380 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma. All rights reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+
+"""In-process, columnar Fact aggregation, an alternative to GROUP BY."""
+
+import datetime
+from array import array
+from gettext import gettext as _
+from operator import itemgetter, sub
+
+from ..objects import AlchemyActivity, AlchemyCategory, AlchemyFact
+from . import query_prepare_datetime
+
+__all__ = ("FactColumns",)
+
+# The number of PKs to look up per query when loading grouped Facts.
+LOAD_FACTS_CHUNK_SIZE = 500
+
+# Fact times are stored as seconds since this (arbitrary) naive epoch.
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# The time periods that FactColumns.aggregate can group by.
+GROUP_PERIODS = ("day", "week", "month")
+
+
+class FactColumns(object):
+    """
+    Matching Facts, stored in compact columns, ready for in-process aggregation.
+
+    Each Fact is represented by one entry in each column (array): its PK; its
+    start and end times (as seconds since EPOCH, and with ``now`` used for the
+    end of the active Fact); its Activity ID; and an ID that indexes its set
+    of Tag names. The Activity and Category names are looked up from the
+    activities and categories tables, which are fetched separately, once.
+
+    Call ``aggregate`` to compute the same results that ``gather`` produces
+    when grouping, e.g., FactStatsTuple rows, but without the GROUP BY.
+    """
+
+    def __init__(self, manager, records, magic_tag_sep):
+        self.manager = manager
+        self.store = manager.store
+        self.magic_tag_sep = magic_tag_sep
+
+        self.pks = array("q")
+        self.starts = array("d")
+        self.ends = array("d")
+        # The ends, but with 'now' used for the ongoing Fact, to compute spans.
+        self.ends_or_now = array("d")
+        # Activity IDs, using 0 for no Activity.
+        self.activity_ids = array("q")
+        # Indexes into self.tag_sets.
+        self.tag_set_ids = array("q")
+
+        # Each unique, sorted tuple of Tag names, indexed by tag_set_ids.
+        self.tag_sets = []
+        # Activity ID → (Activity name, Category ID), and Category ID → name.
+        self.activities = {}
+        self.categories = {}
+        # Hydrated Facts, loaded as needed, to represent each group.
+        self.facts = {}
+
+        self.setup_columns(records)
+        self.setup_lookups()
+
+    def __len__(self):
+        return len(self.pks)
+
+    # ***
+
+    def setup_columns(self, records):
+        now = query_prepare_datetime(self.store.now)
+        now_secs = (now - EPOCH).total_seconds()
+        tag_set_lookup = {}
+        for pk, start, end, activity_id, facts_tags in records:
+            self.pks.append(pk)
+            self.starts.append((start - EPOCH).total_seconds())
+            if end is None:
+                # Use NaN, because array("d") cannot store None.
+                self.ends.append(float("nan"))
+                self.ends_or_now.append(now_secs)
+            else:
+                end_secs = (end - EPOCH).total_seconds()
+                self.ends.append(end_secs)
+                self.ends_or_now.append(end_secs)
+            self.activity_ids.append(activity_id or 0)
+            tag_names = facts_tags.split(self.magic_tag_sep) if facts_tags else []
+            tag_set = tuple(sorted(tag_names))
+            try:
+                tag_set_id = tag_set_lookup[tag_set]
+            except KeyError:
+                tag_set_id = len(self.tag_sets)
+                tag_set_lookup[tag_set] = tag_set_id
+                self.tag_sets.append(tag_set)
+            self.tag_set_ids.append(tag_set_id)
+
+    def setup_lookups(self):
+        # There are far fewer Activities and Categories than Facts, so rather
+        # than fetching names with each Fact, fetch the lookups separately.
+        session = self.store.session
+        query = session.query(
+            AlchemyActivity.pk,
+            AlchemyActivity.name,
+            AlchemyCategory.pk,
+            AlchemyCategory.name,
+        )
+        query = query.outerjoin(AlchemyActivity.category)
+        for act_pk, act_name, cat_pk, cat_name in query.all():
+            self.activities[act_pk] = (act_name, cat_pk or 0)
+            if cat_pk:
+                self.categories[cat_pk] = cat_name
+
+    # ***
+
+    def aggregate(self, query_terms, group_period=None):
+        """
+        Return the grouped results, computed in-process from the columns.
+
+        The results are the same as ``gather`` would return given the same
+        ``query_terms``, e.g., a list of FactStatsTuple (or list) rows if
+        ``include_stats``, otherwise a list of Facts, one for each group.
+        (Note that the Fact in each result represents its group, and it's
+        the group's latest Fact, which is what SQLite happens to use, too.)
+
+        Args:
+            query_terms (nark.managers.query_terms.QueryTerms, required):
+                The group-by (group_activity, group_category, group_tags, and
+                group_days), sorting, limit and offset, and results settings.
+
+            group_period (str, optional): Group by time period: "day" (the
+                same as setting ``group_days``), "week" (starting Monday),
+                or "month". The ``start_date`` result column is set to the
+                date that starts the period, e.g., "2020-01-01".
+
+        Returns:
+            list: A list of Facts, or of (Fact, *statistics) tuples.
+        """
+        qt = query_terms
+
+        if group_period is None and qt.group_days:
+            group_period = "day"
+        if group_period is not None and group_period not in GROUP_PERIODS:
+            msg = _("Unknown group_period: ‘{}’").format(group_period)
+            self.store.logger.error(msg)
+            raise ValueError(msg)
+
+        group_actg = qt.group_activity or qt.group_category
+
+        def _aggregate():
+            groups = group_facts()
+            rows = [make_row(group) for group in groups.values()]
+            rows = sort_rows(rows)
+            rows = apply_limit_offset(rows)
+            load_facts(rows)
+            return [make_result(row) for row in rows]
+
+        # ***
+
+        def group_facts():
+            # Compute the spans all at once, i.e., end (or now) minus start.
+            spans = array("d", map(sub, self.ends_or_now, self.starts))
+            keys = zip(*group_key_columns())
+            groups = {}
+            for idx, key in enumerate(keys):
+                try:
+                    group = groups[key]
+                except KeyError:
+                    groups[key] = [idx, [idx], spans[idx]]
+                else:
+                    # Like SQLite, which (in practice) uses the last row's values
+                    # for the bare (non-aggregate) columns, i.e., the Fact cols.
+                    group[0] = idx
+                    group[1].append(idx)
+                    group[2] += spans[idx]
+            return groups
+
+        def group_key_columns():
+            # Return a column for each group-by setting, which are zipped to
+            # form each row's group key. If not grouping, group by Fact PK.
+            key_cols = []
+            if qt.group_activity and qt.group_category:
+                key_cols.append(self.activity_ids)
+            elif qt.group_activity:
+                key_cols.append(map(self.activity_name, self.activity_ids))
+            elif qt.group_category:
+                key_cols.append(map(self.category_id, self.activity_ids))
+            if qt.group_tags:
+                key_cols.append(self.tag_set_ids)
+            if group_period:
+                key_cols.append(map(period_start_date, self.starts))
+            if not key_cols:
+                key_cols.append(self.pks)
+            return key_cols
+
+        def period_start_date(start_secs, period=group_period):
+            date = (EPOCH + datetime.timedelta(seconds=start_secs)).date()
+            if period == "week":
+                date -= datetime.timedelta(days=date.weekday())
+            elif period == "month":
+                date = date.replace(day=1)
+            return date.isoformat()
+
+        # ***
+
+        def make_row(group):
+            last_idx, idxs, span_secs = group
+
+            # Skip the active Fact's end (NaN, which is not equal to itself),
+            # like how SQL MAX() skips NULL.
+            final_ends = [
+                self.ends[idx] for idx in idxs if self.ends[idx] == self.ends[idx]
+            ]
+            first_start = min(self.starts[idx] for idx in idxs)
+
+            activity_id = self.activity_ids[last_idx]
+            # Like gather, use the group's date, or the last Fact's date.
+            start_date = period_start_date(
+                self.starts[last_idx], period=group_period or "day"
+            )
+
+            row = {
+                "pk": self.pks[last_idx],
+                "duration": span_secs / 86400.0,
+                "group_count": len(idxs),
+                "first_start": EPOCH + datetime.timedelta(seconds=first_start),
+                "final_end": (
+                    EPOCH + datetime.timedelta(seconds=max(final_ends))
+                    if final_ends
+                    else None
+                ),
+                "activities": 0,
+                "actegories": 0,
+                "categories": 0,
+                "start_date": start_date,
+                "activity": self.activity_name(activity_id),
+                "category": self.category_name(activity_id),
+                "tags": [
+                    name
+                    for idx in idxs
+                    for name in self.tag_sets[self.tag_set_ids[idx]]
+                ],
+            }
+            make_row_actg_cols(row, idxs)
+            return row
+
+        def make_row_actg_cols(row, idxs):
+            # Mirror gather's group_concat'enated Activity and Category names.
+            if qt.group_activity and qt.group_category:
+                return
+            act_ids = set(self.activity_ids[idx] for idx in idxs)
+            if qt.group_activity:
+                names = set(self.category_name(act_id) for act_id in act_ids)
+                row["categories"] = unique_names(names)
+            elif qt.group_category:
+                names = set(self.activity_name(act_id) for act_id in act_ids)
+                row["activities"] = unique_names(names)
+            elif qt.group_tags or group_period:
+                names = set(
+                    "{}@{}".format(
+                        self.activity_name(act_id), self.category_name(act_id)
+                    )
+                    for act_id in act_ids
+                    # Like SQL, where `name || '@' || NULL` is NULL.
+                    if act_id and self.category_id(act_id)
+                )
+                row["actegories"] = unique_names(names)
+
+        def unique_names(names):
+            names.discard(None)
+            # Like gather, which returns "" if all values were NULL.
+            return names or ""
+
+        # ***
+
+        def sort_rows(rows):
+            # Apply the sorts in reverse, relying on sort stability, so that
+            # the first sort_cols entry is the primary sort.
+            sort_cols = qt.sort_cols or ["start"]
+            sort_orders = qt.sort_orders or []
+            for idx in reversed(range(len(sort_cols))):
+                sort_key = sort_col_key(sort_cols[idx])
+                if sort_key is None:
+                    continue
+                reverse = idx < len(sort_orders) and sort_orders[idx] == "desc"
+                rows.sort(key=sort_key, reverse=reverse)
+            return rows
+
+        def sort_col_key(sort_col):
+            if sort_col == "start" or not sort_col:
+                return itemgetter("first_start", "pk")
+            elif sort_col == "time":
+                return itemgetter("duration")
+            elif sort_col == "day":
+                return itemgetter("start_date")
+            elif sort_col == "activity" and not (
+                qt.group_category and not qt.group_activity
+            ):
+                return lambda row: row["activity"] or ""
+            elif sort_col == "category" and not (
+                qt.group_activity and not qt.group_category
+            ):
+                return lambda row: row["category"] or ""
+            elif sort_col == "tag" and not group_actg:
+                return lambda row: sorted(set(row["tags"]))
+            elif sort_col == "usage":
+                return itemgetter("group_count")
+            elif sort_col == "fact":
+                return itemgetter("pk")
+            # Note that 'name' (description) sorting is not supported, because
+            # the description is not fetched.
+            return None
+
+        def apply_limit_offset(rows):
+            offset = qt.offset or 0
+            if qt.limit:
+                return rows[offset : offset + qt.limit]
+            return rows[offset:]
+
+        # ***
+
+        def load_facts(rows):
+            # Load the Facts that represent each group (that were not loaded
+            # for a previous aggregate), in chunks, using one query per chunk.
+            pks = sorted(set(row["pk"] for row in rows) - set(self.facts))
+            session = self.store.session
+            for offset in range(0, len(pks), LOAD_FACTS_CHUNK_SIZE):
+                chunk = pks[offset : offset + LOAD_FACTS_CHUNK_SIZE]
+                query = session.query(AlchemyFact).filter(AlchemyFact.pk.in_(chunk))
+                for alchemy_fact in query.all():
+                    self.facts[alchemy_fact.pk] = alchemy_fact
+
+        def make_result(row):
+            fact = self.facts[row["pk"]].as_hamster(
+                self.store,
+                row["tags"],
+                set_freqs=qt.is_grouped or bool(group_period),
+            )
+            if not qt.include_stats:
+                return fact
+            cols = [
+                row["duration"],
+                row["group_count"],
+                row["first_start"],
+                row["final_end"],
+                row["activities"],
+                row["actegories"],
+                row["categories"],
+                row["start_date"],
+            ]
+            if not qt.named_tuples:
+                return [fact] + cols
+            return self.manager.FactStatsTuple(fact, *cols)
+
+        return _aggregate()
+
+    # ***
+
+    def activity_name(self, activity_id):
+        return self.activities[activity_id][0] if activity_id else None
+
+    def category_id(self, activity_id):
+        return self.activities[activity_id][1] if activity_id else 0
+
+    def category_name(self, activity_id):
+        return self.categories.get(self.category_id(activity_id))
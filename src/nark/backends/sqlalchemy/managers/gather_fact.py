@@ -15,25 +15,40 @@
 # You can find the GNU General Public License reprinted in the file titled 'LICENSE',
 # or visit <http://www.gnu.org/licenses/>.
 
+import itertools
 from collections import namedtuple
 from gettext import gettext as _
 
-from sqlalchemy import case, distinct, func, literal_column
+from sqlalchemy import case, distinct, func, literal_column, select
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.sql.expression import or_
 
 from ....managers.fact import BaseFactManager
+from ....managers.query_terms import QueryTerms
 from ..objects import (
     AlchemyActivity,
     AlchemyCategory,
     AlchemyFact,
     AlchemyTag,
     fact_tags,
+    fact_tags_and_archive,
+    facts_and_archive,
+    facts_fts,
 )
-from . import query_apply_limit_offset, query_apply_true_or_not, query_prepare_datetime
+from . import (
+    query_apply_limit_offset,
+    query_apply_true_or_not,
+    query_prepare_datetime,
+    query_split_search_terms,
+)
+from .gather_columns import FactColumns
 from .manager_base import BaseAlchemyManager
 
 __all__ = ("GatherFactManager",)
 
+# The separator used to group_concat names, which are split apart after.
+MAGIC_TAG_SEP = "%%%%,%%%%"
+
 
 class GatherFactManager(BaseAlchemyManager, BaseFactManager):
     """Fact class aggregate query implementation for FactManager."""
@@ -58,6 +73,9 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
         ),
     )
 
+    # The default number of records to fetch at once when streaming results.
+    ITER_GATHER_CHUNK_SIZE = 1000
+
     RESULT_GRP_INDEX = {
         "duration": 0,
         "group_count": 1,
@@ -98,6 +116,12 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
         #     SQLAlchemy will lazy-load the Tag item when you access a Fact's
         #     fact.tags attribute).
         lazy_tags=False,
+        # - The chunk_size switch makes gather return a generator, rather
+        #   than a list. See iter_gather.
+        chunk_size=None,
+        # - The columnar switch is an internal control used by gather_columns,
+        #   which fetches just the few columns it needs to aggregate in-process.
+        columnar=False,
     ):
         """
         Return matching facts, maybe each with stats, given some search criteria.
@@ -114,12 +138,19 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
                 but to instead have the actual Tag items lazy-loaded upon
                 accessing each fact.tags in the results.
 
+            chunk_size (int, optional): Set to stream the results, fetching
+                and hydrating this many records at a time. See iter_gather.
+
         Returns:
             list: A list of matching item instances or (item, *statistics) tuples.
+            Or, if ``chunk_size`` is set, a generator of the same.
         """
         qt = query_terms
 
-        magic_tag_sep = "%%%%,%%%%"
+        magic_tag_sep = MAGIC_TAG_SEP
+
+        # Only the queries that find deleted Facts need to read the archive.
+        reads_archive = qt.deleted is not False
 
         add_aggregates = qt.include_stats or qt.is_grouped or qt.sorts_cols_has_stat
         # Cannot request lazy_tags when grouping, just not how it works.
@@ -131,13 +162,23 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
         if add_aggregates and lazy_tags:
             errmsg = _("Cannot request lazy_tags when grouping results.")
             raise Exception(errmsg)
+        # Similarly, columnar fetches the ungrouped Facts that it aggregates.
+        assert not columnar or not (add_aggregates or lazy_tags)
+        # A stream cannot be reversed, which paging backwards requires.
+        if chunk_size and qt.before:
+            errmsg = _("Cannot stream results when paging using ‘before’.")
+            raise ValueError(errmsg)
 
         def _get_all_facts():
             self.store.logger.debug(qt)
 
+            self.store.session_release_maybe()
+
             must_support_db_engine_funcs()
 
             query = self.store.session.query(AlchemyFact)
+            if reads_archive:
+                query = self.query_load_archive(query)
 
             query, tags_subquery = _get_all_prepare_tags_subquery(query)
 
@@ -161,7 +202,7 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
 
             query = self.query_filter_by_categories(query, qt)
 
-            query = query_filter_by_search_term(query)
+            query, rank_col = query_filter_by_search_term(query)
 
             query = self.query_filter_by_item_pk(query, AlchemyFact, qt.key)
 
@@ -169,19 +210,28 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
 
             query = _get_all_filter_by_ongoing(query)
 
+            query, seek_cols, seek_direction = self.query_filter_by_cursor(query, qt)
+
             query = query_group_by_aggregate(query, tags_subquery)
 
-            has_facts = True
-            query = self.query_order_by_sort_cols(
-                query,
-                qt,
-                has_facts,
-                span_cols,
-                start_date,
-                tags_subquery,
-            )
+            if seek_cols is not None:
+                query = self.query_order_by_cols(query, seek_direction, seek_cols)
+            else:
+                has_facts = True
+                query = self.query_order_by_sort_cols(
+                    query,
+                    qt,
+                    has_facts,
+                    span_cols,
+                    start_date,
+                    tags_subquery,
+                    rank_col,
+                )
 
-            query = query_apply_limit_offset(query, qt.limit, qt.offset)
+            limit = qt.limit
+            if not chunk_size:
+                limit = self.query_seek_limit(qt, seek_cols)
+            query = query_apply_limit_offset(query, limit, qt.offset)
 
             query = query_select_with_entities(
                 query,
@@ -195,9 +245,13 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
 
             if qt.count_results:
                 results = query.count()
+            elif chunk_size:
+                results = _gather_stream_results(query)
             else:
                 # Profiling: 2018-07-15: (lb): ~ 0.120 s. to fetch latest of 20K Facts.
                 records = query.all()
+                if seek_cols is not None:
+                    records = self.query_seek_results(records, qt, seek_cols)
                 results = _gather_process_results(records)
 
             return results
@@ -219,8 +273,24 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
 
         # ***
 
+        def _gather_stream_results(query):
+            # yield_per tells SQLAlchemy to use a server-side cursor (for DBMSes
+            # that support it; SQLite cursors fetch lazily regardless), and to
+            # buffer just chunk_size rows at a time, rather than all the rows.
+            # Then hydrate each chunk before fetching the next, so that at most
+            # one chunk of AlchemyFact and Fact objects is in memory at once.
+            records_iter = iter(query.yield_per(chunk_size))
+            while True:
+                records = list(itertools.islice(records_iter, chunk_size))
+                if not records:
+                    break
+                for result in _gather_process_results(records):
+                    yield result
+
+        # ***
+
         def _gather_process_results(records):
-            if not records:
+            if not records or columnar:
                 return records
             elif not qt.include_stats and not add_aggregates and lazy_tags:
                 return _gather_process_facts_only(records)
@@ -305,7 +375,10 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
                     AlchemyTag(pk=None, name=name, deleted=False, hidden=False)
                     for name in new_tags
                 ]
-                fact.tags = pkless_tags
+                # Set the tags as if loaded, not as a change to the Fact. Else
+                # the Session would flush (INSERT) the PK-less Tags, and it'd
+                # hold each (dirty) Fact, rather than letting them be collected.
+                set_committed_value(fact, "tags", pkless_tags)
 
             return fact
 
@@ -381,11 +454,15 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
             #   and following is (obviously) the new code. Note that this was
             #   the only place I found code that needed fixing, but I would not
             #   be surprised to find more. Hence this note-to-self, for later.
+            tags_source = fact_tags_and_archive if reads_archive else fact_tags
+            tags_subquery = tags_subquery.outerjoin(
+                tags_source,
+                AlchemyFact.pk == tags_source.columns.fact_id,
+            )
             tags_subquery = tags_subquery.outerjoin(
-                fact_tags,
-                AlchemyFact.pk == fact_tags.columns.fact_id,
+                AlchemyTag,
+                AlchemyTag.pk == tags_source.columns.tag_id,
             )
-            tags_subquery = tags_subquery.outerjoin(AlchemyTag)
 
             if qt.match_tags:
                 tags_subquery = self.query_filter_by_tags(tags_subquery, qt)
@@ -400,7 +477,11 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
             #   from sqlalchemy.orm import joinedload
             #   # 2019-01-22: Either did not need, or did not work, !remember which!
             #   tags_subquery = tags_subquery.options(joinedload(AlchemyFact.tags))
-            tags_subquery = tags_subquery.with_entities(AlchemyFact.pk, tags_col)
+            # (Label the PK, which would otherwise be named "id" when reading
+            # the archive, i.e., after query_load_archive.)
+            tags_subquery = tags_subquery.with_entities(
+                AlchemyFact.pk.label("pk"), tags_col
+            )
             tags_subquery = tags_subquery.subquery("tag_names")
             query = query.join(tags_subquery, AlchemyFact.pk == tags_subquery.c.pk)
 
@@ -631,22 +712,88 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
             """
             Limit query to facts that match the search terms.
 
-            Terms are matched against ``Category.name`` and ``Activity.name``.
-            The matching is not case-sensitive.
+            Terms are matched against the Fact description, and also, if
+            ``broad_match``, against the Activity, Category, and Tag names.
+            The matching is not case-sensitive. A term that follows ``not``
+            excludes the Facts that it matches.
+
+            Returns the query, and the search rank column, if ranked.
             """
             if not qt.search_terms:
-                return query
+                return query, None
 
-            filters = []
-            for term in qt.search_terms:
-                filters.append(AlchemyFact.description.ilike("%{}%".format(term)))
+            included, excluded = query_split_search_terms(qt.search_terms)
+            # The archived Facts are not in the FTS index, so match substrings.
+            if self.store.config["db.fts"] and not reads_archive:
+                return query_filter_by_search_fts(query, included, excluded)
+
+            if included:
+                filters = []
+                for term in included:
+                    filters.append(AlchemyFact.description.ilike("%{}%".format(term)))
+                    if qt.broad_match:
+                        filters.append(AlchemyActivity.name.ilike("%{}%".format(term)))
+                        filters.append(AlchemyCategory.name.ilike("%{}%".format(term)))
+                        filters.append(
+                            AlchemyFact.tags.any(
+                                AlchemyTag.name.ilike("%{}%".format(term))
+                            )
+                        )
+                query = query.filter(or_(*filters))
+
+            for term in excluded:
+                pattern = "%{}%".format(term)
+                filters = [func.coalesce(AlchemyFact.description, "").ilike(pattern)]
                 if qt.broad_match:
-                    filters.append(AlchemyActivity.name.ilike("%{}%".format(term)))
-                    filters.append(AlchemyCategory.name.ilike("%{}%".format(term)))
-                    filters.append(AlchemyTag.name.ilike("%{}%".format(term)))
-            query = query.filter(or_(*filters))
-
-            return query
+                    filters.append(
+                        func.coalesce(AlchemyActivity.name, "").ilike(pattern)
+                    )
+                    filters.append(
+                        func.coalesce(AlchemyCategory.name, "").ilike(pattern)
+                    )
+                    filters.append(AlchemyFact.tags.any(AlchemyTag.name.ilike(pattern)))
+                query = query.filter(~or_(*filters))
+
+            return query, None
+
+        def query_filter_by_search_fts(query, included, excluded):
+            # Match each term as a word prefix (or, if it has spaces, as a
+            # phrase whose last word is a prefix), using the FTS index.
+            # - Filter using IN, rather than joining the FTS table, so that
+            #   SQLite runs each MATCH once (and not once per Fact scanned).
+            rank_col = None
+            match_included = search_fts_match(included)
+            if match_included is not None:
+                query = query.filter(
+                    AlchemyFact.pk.in_(select(facts_fts.c.rowid).where(match_included))
+                )
+                if qt.sort_cols_has_any("rank"):
+                    # Look up the rank of each matching Fact, by its rowid.
+                    rank_col = (
+                        select(facts_fts.c.rank)
+                        .where(match_included)
+                        .where(facts_fts.c.rowid == AlchemyFact.pk)
+                        .scalar_subquery()
+                    )
+            match_excluded = search_fts_match(excluded)
+            if match_excluded is not None:
+                query = query.filter(
+                    ~AlchemyFact.pk.in_(select(facts_fts.c.rowid).where(match_excluded))
+                )
+            return query, rank_col
+
+        def search_fts_match(terms):
+            phrases = [
+                '"{}"*'.format(term.strip().replace('"', '""'))
+                for term in terms
+                if term.strip()
+            ]
+            if not phrases:
+                return None
+            expression = " OR ".join(phrases)
+            if not qt.broad_match:
+                expression = "description : ({})".format(expression)
+            return facts_fts.c.facts_fts.op("MATCH")(expression)
 
         # ***
 
@@ -661,6 +808,11 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
 
         def query_group_by_aggregate(query, tags_subquery):
             if not qt.is_grouped:
+                if not add_aggregates:
+                    # Each Fact is already just one row (the tags subquery
+                    # concatenates its Tags), so skip the GROUP BY, which
+                    # would otherwise sort every Fact, even when limited.
+                    return query
                 # Need to group by Fact.pk because some aggregates, e.g.,
                 # COUNT(), will want to collapse all rows.
                 return query_group_by_pk(query)
@@ -731,6 +883,14 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
             # AlchemyFact.pk so that SQLAlchemy uses `FROM facts`, and not,
             # e.g., `FROM category`. So use all Fact cols to start the select.
             columns = [AlchemyFact]
+            if columnar:
+                # Except for gather_columns, which only wants what it aggregates.
+                columns = [
+                    AlchemyFact.pk,
+                    AlchemyFact.start,
+                    AlchemyFact.end,
+                    AlchemyFact.activity_id,
+                ]
 
             # The order of the columns added here is reflected by RESULT_GRP_INDEX.
             # - Note also if `add_aggregates` is True, then both span_cols and
@@ -747,10 +907,13 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
             # _process_record_tags expects (pops) it.
             if tags_subquery is not None:
                 assert not lazy_tags
-                outer_tags_col = func.group_concat(
-                    tags_subquery.c.facts_tags,
-                    magic_tag_sep,
-                ).label("facts_tags")
+                if qt.is_grouped or add_aggregates:
+                    outer_tags_col = func.group_concat(
+                        tags_subquery.c.facts_tags,
+                        magic_tag_sep,
+                    ).label("facts_tags")
+                else:
+                    outer_tags_col = tags_subquery.c.facts_tags
                 columns.append(outer_tags_col)
 
             query = query.with_entities(*columns)
@@ -763,6 +926,94 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
 
     # ***
 
+    def iter_gather(self, query_terms, chunk_size=None, **kwargs):
+        """
+        Like gather, but returns a generator that streams the results.
+
+        Rather than fetching every record and hydrating every Fact before
+        returning, iter_gather fetches and processes ``chunk_size`` records at
+        a time, so memory use stays flat, regardless of the number of results.
+        This is useful for exporting, e.g., pass the generator to a ReportWriter.
+
+        Args:
+            query_terms (nark.managers.query_terms.QueryTerms, required):
+                The query settings. See gather. Note that ``count_results``
+                is not a stream, so gather returns the count, as usual.
+
+            chunk_size (int, optional): The number of records to fetch and to
+                process at a time. Defaults to ``ITER_GATHER_CHUNK_SIZE``.
+
+        Returns:
+            generator: Yields matching item instances or (item, *stats) tuples.
+        """
+        chunk_size = chunk_size or GatherFactManager.ITER_GATHER_CHUNK_SIZE
+        return self.gather(query_terms, chunk_size=chunk_size, **kwargs)
+
+    # ***
+
+    def gather_columns(self, query_terms):
+        """
+        Fetch matching Facts as compact columns, for aggregating in-process.
+
+        Rather than having SQLite GROUP BY (which is slow for large stores,
+        especially when grouping by the concatenated tag names subquery), this
+        fetches just the start and end times, and the Activity and Tags, of
+        each matching Fact, and returns a FactColumns object, which computes
+        the same aggregate results as ``gather``, but in memory. And because
+        the group-by settings are only applied by FactColumns.aggregate, the
+        same columns can be used to make any number of grouped reports.
+
+        Args:
+            query_terms (nark.managers.query_terms.QueryTerms, required):
+                The query settings used to find matching Facts. The group-by,
+                sort, limit, and results settings are ignored (and are instead
+                used by ``FactColumns.aggregate``).
+
+        Returns:
+            FactColumns: The matching Facts' columns.
+        """
+        fetch_qt = QueryTerms(**query_terms.as_tuple()._asdict())
+        fetch_qt.raw = False
+        fetch_qt.include_stats = False
+        fetch_qt.count_results = False
+        fetch_qt.group_activity = False
+        fetch_qt.group_category = False
+        fetch_qt.group_tags = False
+        fetch_qt.group_days = False
+        fetch_qt.sort_cols = None
+        fetch_qt.sort_orders = None
+        fetch_qt.limit = None
+        fetch_qt.offset = None
+        fetch_qt.after = None
+        fetch_qt.before = None
+        records = self.gather(fetch_qt, columnar=True)
+        return FactColumns(self, records, magic_tag_sep=MAGIC_TAG_SEP)
+
+    # ***
+
+    def query_load_archive(self, query):
+        """
+        Reads the Facts from the live and the archived Facts (see archive).
+
+        The query's AlchemyFact criteria are adapted to the facts_and_archive
+        union, so a query that finds deleted Facts finds those archived, too.
+        """
+        return query.select_entity_from(facts_and_archive)
+
+    # ***
+
+    def query_seek_cols(self, query_terms):
+        # Facts page by start (and by end and PK, like query_order_by_start),
+        # but not when grouped, because the aggregates span the page boundary.
+        if query_terms.is_grouped:
+            return None
+        sort_cols = list(query_terms.sort_cols or [])
+        if sort_cols and sort_cols != ["start"]:
+            return None
+        return self.cols_order_by_start(None)
+
+    # ***
+
     def query_order_by_sort_col(
         self,
         query,
@@ -774,6 +1025,7 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
         span_cols,
         start_date,
         tags_subquery,
+        rank_col=None,
     ):
         qt = query_terms
 
@@ -841,6 +1093,13 @@ class GatherFactManager(BaseAlchemyManager, BaseFactManager):
             # maybe to group Facts without a description. So we might as well wire
             # sorting by name to sorting be description, rather than ignoring it.
             query = query.order_by(direction(AlchemyFact.description))
+        elif sort_col == "rank":
+            # The full-text search rank (see db.fts), best matches first.
+            # Without search terms to rank, sort as usual.
+            if rank_col is not None:
+                query = query.order_by(direction(rank_col))
+            else:
+                query = self.query_order_by_start(query, direction)
         elif sort_col == "fact":
             # (lb): There is (or at least should be) no meaning with Fact IDs,
             # i.e., you should think of them as UUID values, and not having any
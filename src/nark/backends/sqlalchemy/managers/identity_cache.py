@@ -0,0 +1,137 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma. All rights reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""Bounded identity cache of hydrated Activity, Category, and Tag items."""
+
+from collections import OrderedDict
+
+__all__ = ("IdentityCache",)
+
+
+class IdentityCache(object):
+    """
+    A bounded, least-recently-used cache of hydrated items, by PK and natural key.
+
+    Each attribute manager (Activity, Category, and Tag) keeps an IdentityCache,
+    so that the same ``nark`` item instance is shared by every Fact (and every
+    lookup) that references it, rather than hydrating a new one each time.
+
+    Each cached item is stored with its ``state``, i.e., the values it was
+    hydrated from. An item is only reused if its source values still match,
+    and if the item itself still matches (in case a caller edited the shared
+    instance). So a stale item is replaced, rather than returned. But the
+    natural key lookups (e.g., by name) skip the database altogether, so the
+    managers must ``forget`` the items they write.
+    """
+
+    def __init__(self, state, natural_key, maxsize):
+        """
+        Args:
+            state (callable): Returns the hashable values that identify an
+                item's current state, given a ``nark`` item or its Alchemy
+                counterpart (which share the same attributes).
+
+            natural_key (callable): Returns an item's natural key (e.g., its name).
+
+            maxsize (int): The most items to keep before evicting the least
+                recently used.
+        """
+        self.state = state
+        self.natural_key = natural_key
+        self.maxsize = maxsize
+        # Maps PK → (state, item).
+        self.items = OrderedDict()
+        # Maps natural key → PK.
+        self.pks = OrderedDict()
+
+    def __len__(self):
+        return len(self.items)
+
+    # ***
+
+    def hydrate(self, alchemy_item, create):
+        """Return the cached item for ``alchemy_item``, or ``create()`` and cache it."""
+        state = self.state(alchemy_item)
+        try:
+            cached_state, item = self.items[alchemy_item.pk]
+        except KeyError:
+            pass
+        else:
+            if cached_state == state and self.state(item) == state:
+                self.items.move_to_end(alchemy_item.pk)
+                return item
+        item = create()
+        if alchemy_item.pk is not None:
+            self.remember(alchemy_item, (state, item))
+        return item
+
+    def remember(self, alchemy_item, entry=None):
+        """Record the natural key of ``alchemy_item`` (and its item, if hydrated)."""
+        pk = alchemy_item.pk
+        if entry is not None:
+            self.items[pk] = entry
+            self.items.move_to_end(pk)
+            if len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+        natural_key = self.natural_key(alchemy_item)
+        self.pks[natural_key] = pk
+        self.pks.move_to_end(natural_key)
+        if len(self.pks) > self.maxsize:
+            self.pks.popitem(last=False)
+
+    # ***
+
+    def get(self, pk):
+        """Return the cached item with the given PK, or None."""
+        try:
+            state, item = self.items[pk]
+        except KeyError:
+            return None
+        if self.state(item) != state:
+            # The caller edited the shared item, so stop sharing it.
+            del self.items[pk]
+            return None
+        self.items.move_to_end(pk)
+        return item
+
+    def get_pk(self, natural_key):
+        """Return the PK last seen for the given natural key, or None."""
+        return self.pks.get(natural_key)
+
+    def get_by_natural_key(self, natural_key):
+        """Return the cached item with the given natural key, or None."""
+        pk = self.get_pk(natural_key)
+        if pk is None:
+            return None
+        item = self.get(pk)
+        if item is None or self.natural_key(item) != natural_key:
+            return None
+        return item
+
+    # ***
+
+    def forget(self, pk):
+        """Evict the item with the given PK, e.g., after it's updated or removed."""
+        self.items.pop(pk, None)
+        stale_keys = [key for key, key_pk in self.pks.items() if key_pk == pk]
+        for natural_key in stale_keys:
+            del self.pks[natural_key]
+
+    def clear(self):
+        """Evict all items."""
+        self.items.clear()
+        self.pks.clear()
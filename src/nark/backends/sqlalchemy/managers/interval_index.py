@@ -0,0 +1,253 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma. All rights reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""In-memory index of Fact time windows, for overlap checks and neighbor lookups."""
+
+import bisect
+import heapq
+from collections import Counter
+from datetime import datetime, timedelta
+
+__all__ = ("IntervalIndex",)
+
+# Sorts after any PK, for bisecting to the right of all keys at a given time.
+_PK_MAX = float("inf")
+
+
+class IntervalIndex(object):
+    """
+    A sorted array of the non-deleted Facts' ``(start, end, pk)`` time windows.
+
+    The FactManager keeps an IntervalIndex (if ``db.interval_index`` is enabled),
+    so that it can check if a time window is available, and find a Fact's
+    ``antecedent``, ``subsequent``, and ``surrounding`` Facts, using a binary
+    search, rather than running a query each time.
+
+    Each method answers exactly what the corresponding FactManager query would,
+    including its ordering, which is by start time, then end time, then PK.
+    As in SQLite, an active Fact's NULL end sorts before any other end time.
+
+    Facts without a start time are not indexed.
+    """
+
+    def __init__(self, spans=()):
+        """
+        Args:
+            spans (iterable): The ``(pk, start, end)`` of each non-deleted Fact.
+        """
+        # The sorted (start, end-or-datetime.min, pk) keys.
+        self.keys = []
+        # Maps PK → (start, end).
+        self.spans = {}
+        # The PKs of the active Facts (whose end is None).
+        self.active = set()
+        # The length of the longest closed Fact, which bounds how far back a
+        # Fact can start and still reach a given time. To keep it as short as
+        # the Facts allow, count the Facts of each length, and keep a max-heap
+        # of the lengths (lazily, so a length is only popped once it's uncounted).
+        self.max_span = timedelta(0)
+        self.span_counts = Counter()
+        self.span_heap = []
+        self.add_many(spans)
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __contains__(self, pk):
+        return pk in self.spans
+
+    # ***
+
+    def add(self, pk, start, end):
+        """Index (or re-index) the Fact with the given PK and time window."""
+        self.discard(pk)
+        key = self.index_span(pk, start, end)
+        if key is not None:
+            bisect.insort(self.keys, key)
+
+    def add_many(self, spans):
+        """
+        Index (or re-index) each ``(pk, start, end)``, sorting the keys just once.
+
+        (Calling ``add`` for each span would shift the keys for each insert.)
+        """
+        keys = []
+        for pk, start, end in spans:
+            self.discard(pk)
+            key = self.index_span(pk, start, end)
+            if key is not None:
+                keys.append(key)
+        if len(keys) == 1:
+            bisect.insort(self.keys, keys[0])
+        elif keys:
+            # Timsort merges the (already sorted) keys and the new (sorted) run.
+            keys.sort()
+            self.keys.extend(keys)
+            self.keys.sort()
+
+    def index_span(self, pk, start, end):
+        # Index the span (other than its key), and return its key (to be
+        # inserted into keys), or None if it has no start.
+        if start is None:
+            return None
+        start = start.replace(microsecond=0)
+        if end is not None:
+            end = end.replace(microsecond=0)
+            self.span_counted(end - start, 1)
+        else:
+            self.active.add(pk)
+        self.spans[pk] = (start, end)
+        return self.sort_key(pk, start, end)
+
+    def discard(self, pk):
+        """Remove the Fact with the given PK, if indexed."""
+        try:
+            start, end = self.spans.pop(pk)
+        except KeyError:
+            return
+        if end is not None:
+            self.span_counted(end - start, -1)
+        else:
+            self.active.discard(pk)
+        key = self.sort_key(pk, start, end)
+        idx = bisect.bisect_left(self.keys, key)
+        assert self.keys[idx] == key
+        del self.keys[idx]
+
+    def span_counted(self, length, count):
+        # Count (or uncount) a closed Fact of the given length, and update
+        # max_span to the longest length still counted.
+        self.span_counts[length] += count
+        if count > 0 and self.span_counts[length] == 1:
+            heapq.heappush(self.span_heap, -length)
+        elif not self.span_counts[length]:
+            del self.span_counts[length]
+            # Pop the uncounted lengths (this one, and any left below it).
+            while self.span_heap and -self.span_heap[0] not in self.span_counts:
+                heapq.heappop(self.span_heap)
+        self.max_span = -self.span_heap[0] if self.span_heap else timedelta(0)
+
+    @staticmethod
+    def sort_key(pk, start, end):
+        return (start, end if end is not None else datetime.min, pk)
+
+    def entry(self, idx):
+        start, _end_key, pk = self.keys[idx]
+        return pk, start, self.spans[pk][1]
+
+    # ***
+
+    def overlaps(self, start, end, ignore_pks=()):
+        """
+        Return True if any Fact occupies some of the given time window.
+
+        As with ``_timeframe_available_for_fact``, the active Fact only
+        conflicts with another active Fact (i.e., when ``end`` is None).
+        """
+        ignore_pks = set(ignore_pks)
+        start = start.replace(microsecond=0)
+        if end is None:
+            if self.active - ignore_pks:
+                return True
+            hi = len(self.keys)
+        else:
+            end = end.replace(microsecond=0)
+            # Any Fact that starts before the end time.
+            hi = bisect.bisect_left(self.keys, (end,))
+        for pk, _fact_start, fact_end in self.scan_back(hi, start):
+            if pk in ignore_pks or fact_end is None:
+                continue
+            if fact_end > start:
+                return True
+        return False
+
+    def scan_back(self, hi, reach):
+        """
+        Yield each entry before index ``hi``, latest first, that might reach ``reach``.
+
+        Stops at the first closed entry that starts too early to end after
+        ``reach``. An active Fact that starts earlier than that is not found.
+        """
+        floor = reach - self.max_span
+        for idx in range(hi - 1, -1, -1):
+            entry = self.entry(idx)
+            if entry[1] < floor:
+                break
+            yield entry
+
+    # ***
+
+    def antecedent(self, ref_time, pk=None, exclude_pk=None):
+        """Return the PK of the Fact that precedes ``ref_time``, or None."""
+        ref_time = ref_time.replace(microsecond=0)
+        hi = bisect.bisect_right(self.keys, (ref_time, datetime.max, _PK_MAX))
+        for idx in range(hi - 1, -1, -1):
+            fact_pk, start, end = self.entry(idx)
+            if fact_pk == exclude_pk:
+                continue
+            if end is None:
+                if start < ref_time:
+                    return fact_pk
+            elif (
+                end < ref_time
+                or (end == ref_time and start < ref_time)
+                or (
+                    pk is not None
+                    and end == ref_time
+                    and start == ref_time
+                    and fact_pk < pk
+                )
+            ):
+                return fact_pk
+        return None
+
+    def subsequent(self, ref_time, pk=None, exclude_pk=None):
+        """Return the PK of the Fact that follows ``ref_time``, or None."""
+        ref_time = ref_time.replace(microsecond=0)
+        lo = bisect.bisect_left(self.keys, (ref_time,))
+        for idx in range(lo, len(self.keys)):
+            fact_pk, start, end = self.entry(idx)
+            if fact_pk == exclude_pk:
+                continue
+            if (
+                start > ref_time
+                or (end is not None and end > ref_time)
+                or (pk is not None and end == ref_time and fact_pk > pk)
+            ):
+                return fact_pk
+        return None
+
+    def surrounding(self, fact_time, inclusive=False):
+        """Return the PKs of the Facts at ``fact_time``, ordered by start time."""
+        fact_time = fact_time.replace(microsecond=0)
+        if not inclusive:
+            hi = bisect.bisect_left(self.keys, (fact_time,))
+        else:
+            hi = bisect.bisect_right(self.keys, (fact_time, datetime.max, _PK_MAX))
+        found = []
+        for pk, start, end in self.scan_back(hi, fact_time):
+            if end is None:
+                continue
+            if end > fact_time or (inclusive and end == fact_time):
+                found.append(pk)
+        # The active Fact(s), which scan_back might not reach.
+        for pk in self.active:
+            start = self.spans[pk][0]
+            if start < fact_time or (inclusive and start == fact_time):
+                found.append(pk)
+        found.sort(key=lambda pk: self.sort_key(pk, *self.spans[pk]))
+        return found
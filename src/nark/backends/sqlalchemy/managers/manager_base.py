@@ -31,11 +31,43 @@ __all__ = ("BaseAlchemyManager",)
 class BaseAlchemyManager(GatherBaseAlchemyManager):
     """Base class for sqlalchemy managers."""
 
+    # The most items each Activity, Category, and Tag IdentityCache keeps.
+    IDENTITY_CACHE_SIZE = 10000
+
     def __init__(self, *args, **kwargs):
         super(BaseAlchemyManager, self).__init__(*args, **kwargs)
 
     # ***
 
+    def identity_cache_lookup(self, natural_key, raw=False):
+        """
+        Returns the cached item with the given natural key, or None if not cached.
+
+        If raw, looks up the Alchemy item by its cached PK, which SQLAlchemy
+        finds in the Session identity map, if loaded, before querying the PK.
+        """
+        if not raw:
+            return self.identity_cache.get_by_natural_key(natural_key)
+
+        pk = self.identity_cache.get_pk(natural_key)
+        if pk is None:
+            return None
+        alchemy_cls = self._gather_query_alchemy_cls
+        alchemy_item = self.store.session.query(alchemy_cls).get(pk)
+        if alchemy_item is None:
+            return None
+        if self.identity_cache.natural_key(alchemy_item) != natural_key:
+            return None
+        return alchemy_item
+
+    def identity_caches_clear(self):
+        """Evicts all cached Activities, Categories, and Tags, e.g., on rollback."""
+        self.store.activities.identity_cache.clear()
+        self.store.categories.identity_cache.clear()
+        self.store.tags.identity_cache.clear()
+
+    # ***
+
     def add_and_commit(self, alchemy_item, raw=False, skip_commit=False):
         """
         Adds the item to the data store, and perhaps calls commit.
@@ -61,7 +93,7 @@ class BaseAlchemyManager(GatherBaseAlchemyManager):
             if skip_commit:
                 return
             try:
-                self.store.session.commit()
+                self.store.commit()
             except IntegrityError as err:
                 message = _(
                     "An error occured! Are you sure that the {0}'s name "
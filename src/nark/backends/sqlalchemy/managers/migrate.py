@@ -21,8 +21,6 @@ import os
 
 import lazy_import
 
-from nark.backends.sqlalchemy import objects
-
 from ....helpers.legacy_db import upgrade_legacy_db_hamster_applet
 from ....managers.migrate import BaseMigrationsManager
 
@@ -63,18 +61,18 @@ class MigrationsManager(BaseMigrationsManager):
     #   - This supports using an SQLite store in :memory:, for which there is no
     #     other way to connect to the same database other than through the Engine
     #     ((lb): At least, not that I know of; and makes sense there wouldn't be).
-    # - Note that using CliRunner poses a challenge with passing variables, and
-    #   test variables that need to be applied to the Click code under test
-    #   generally need to be applied using a MagicMock or a PropertyMock. However,
-    #   the Engine is already always available at a global location (at least the
-    #   way we've got our code wired, which follows convention), so rather than
-    #   mock it in, we just always look for the existing Engine, even in production.
-    #   - The SQLAlchemy Engine object is stashed at objects.metadata.bind, and is
-    #     meant to be "held globally for the lifetime of a single application...."
-    #       https://docs.sqlalchemy.org/en/13/core/connections.html
+    # - Use the store's own Engine, or else the Engine bound to the Session it
+    #   was given (e.g., by the tests), and not a global Engine, so that each
+    #   store migrates its own database (see StorePool).
     @property
     def engine_or_url(self):
-        return objects.metadata.bind or self.store.db_url
+        if self.store.engine is not None:
+            return self.store.engine
+        if self.store.session is not None:
+            bind = self.store.session.get_bind()
+            if bind is not None:
+                return bind
+        return self.store.db_url
 
     # ***
 
@@ -0,0 +1,251 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma. All rights reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""Daily rollups maintenance for FactManager."""
+
+from collections import defaultdict
+from gettext import gettext as _
+
+from sqlalchemy import Integer, cast, func, literal
+from sqlalchemy.sql.expression import and_
+
+from ..objects import AlchemyFact, fact_daily_rollups, fact_tags, facts
+from .gather_fact import GatherFactManager
+
+__all__ = ("RollupFactManager",)
+
+
+class RollupFactManager(GatherFactManager):
+    """Maintains the fact_daily_rollups table as FactManager writes Facts."""
+
+    def __init__(self, *args, **kwargs):
+        super(RollupFactManager, self).__init__(*args, **kwargs)
+
+    # ***
+
+    def rollups_tally(self, deltas, alchemy_fact, sign):
+        """
+        Add (sign=1) or subtract (sign=-1) a Fact's share of the daily rollups.
+
+        Only closed, non-deleted Facts are tallied. The Fact's Activity and
+        Tags must have PKs, so flush the session first if any of them are new.
+
+        Args:
+            deltas (defaultdict): Maps each (day, activity_id, tag_id) rollups
+                key to a [seconds, count] list. Pass the same ``deltas`` for
+                each Fact, and then call ``rollups_apply`` once.
+
+            alchemy_fact (nark.backends.sqlalchemy.objects.AlchemyFact):
+                The Fact to tally, in its current state. (So to update a Fact,
+                subtract the Fact, edit it, and then add it.)
+
+            sign (int): 1 to add the Fact, or -1 to subtract it.
+        """
+        if alchemy_fact.deleted or not alchemy_fact.start or not alchemy_fact.end:
+            return
+        day = alchemy_fact.start.date()
+        activity_id = alchemy_fact.activity.pk if alchemy_fact.activity else 0
+        seconds = int((alchemy_fact.end - alchemy_fact.start).total_seconds())
+        tag_ids = [0] + [tag.pk for tag in alchemy_fact.tags]
+        for tag_id in tag_ids:
+            delta = deltas[(day, activity_id, tag_id)]
+            delta[0] += sign * seconds
+            delta[1] += sign
+
+    def rollups_apply(self, deltas):
+        """
+        Apply tallied rollups deltas in the current session transaction.
+
+        Rows whose count drops to zero are deleted, so the table only holds
+        the days that have Facts.
+        """
+        rollups = fact_daily_rollups
+        for (day, activity_id, tag_id), (seconds, count) in deltas.items():
+            if not seconds and not count:
+                continue
+            key_condition = and_(
+                rollups.c.day == day,
+                rollups.c.activity_id == activity_id,
+                rollups.c.tag_id == tag_id,
+            )
+            result = self.store.session.execute(
+                rollups.update()
+                .where(key_condition)
+                .values(
+                    seconds=rollups.c.seconds + seconds,
+                    count=rollups.c.count + count,
+                )
+            )
+            if not result.rowcount:
+                self.store.session.execute(
+                    rollups.insert().values(
+                        day=day,
+                        activity_id=activity_id,
+                        tag_id=tag_id,
+                        seconds=seconds,
+                        count=count,
+                    )
+                )
+            elif count < 0:
+                self.store.session.execute(
+                    rollups.delete().where(
+                        and_(key_condition, rollups.c.count <= 0),
+                    )
+                )
+
+    def rollups_update(self, alchemy_facts, sign):
+        """Tallies and applies the rollups deltas for the given Facts."""
+        deltas = defaultdict(lambda: [0, 0])
+        for alchemy_fact in alchemy_facts:
+            self.rollups_tally(deltas, alchemy_fact, sign)
+        self.rollups_apply(deltas)
+
+    # ***
+
+    def rebuild_rollups(self):
+        """
+        Recompute the fact_daily_rollups table from the facts table.
+
+        The rollups are maintained as Facts are added, updated, and removed
+        through the FactManager, but if the facts table is edited otherwise
+        (e.g., by a legacy Hamster client, or by hand), the rollups will be
+        stale, and you'll want to rebuild them before using ``db.rollups``.
+
+        Returns:
+            int: The number of rollup rows.
+        """
+        self.store.logger.debug(_("Rebuilding the daily rollups"))
+
+        def _rebuild_rollups():
+            must_support_db_engine_funcs()
+            self.store.session.execute(fact_daily_rollups.delete())
+            insert_rollups(tagged=False)
+            insert_rollups(tagged=True)
+            self.store.commit()
+            n_rollups = self.store.session.query(fact_daily_rollups).count()
+            self.store.logger.debug(_("Rebuilt {} rollups").format(n_rollups))
+            return n_rollups
+
+        def must_support_db_engine_funcs():
+            if self.store.config["db.engine"] == "sqlite":
+                return
+
+            errmsg = _(
+                "This feature does not work with the current DBMS engine: ‘{}’."
+                " (Please tell the maintainers if you want this supported!"
+                " That, or switch to SQLite to use this feature.)".format(
+                    self.store.config["db.engine"]
+                )
+            )
+            raise NotImplementedError(errmsg)
+
+        def insert_rollups(tagged):
+            day_col = func.date(facts.c.start_time)
+            activity_col = func.coalesce(facts.c.activity_id, 0)
+            tag_col = fact_tags.c.tag_id if tagged else literal(0)
+            seconds_col = func.sum(
+                cast(func.strftime("%s", facts.c.end_time), Integer)
+                - cast(func.strftime("%s", facts.c.start_time), Integer)
+            )
+            query = self.store.session.query(
+                day_col,
+                activity_col,
+                tag_col,
+                seconds_col,
+                func.count(),
+            )
+            if tagged:
+                query = query.join(fact_tags, fact_tags.c.fact_id == facts.c.id)
+            else:
+                query = query.select_from(facts)
+            query = query.filter(
+                facts.c.deleted == False,  # noqa: E712
+                facts.c.start_time != None,  # noqa: E711
+                facts.c.end_time != None,  # noqa: E711
+            )
+            query = query.group_by(day_col, activity_col, tag_col)
+            self.store.session.execute(
+                fact_daily_rollups.insert().from_select(
+                    ["day", "activity_id", "tag_id", "seconds", "count"],
+                    query.statement,
+                )
+            )
+
+        return _rebuild_rollups()
+
+    # ***
+
+    def rollup_days(self, since=None, until=None):
+        """
+        Return the total time and number of Facts for each day, from the rollups.
+
+        This is a lightweight alternative to gathering with ``group_days``,
+        for when you only need the daily totals, and not the Facts themselves.
+        As with ``group_days``, each Fact is counted on the day it starts, and
+        the active Fact, if any, is counted up until now.
+
+        Args:
+            since (datetime.date, optional): The first day to include.
+
+            until (datetime.date, optional): The last day to include.
+
+        Returns:
+            list: A list of (day, duration, count) tuples, ordered by day,
+            where ``day`` is a datetime.date, and ``duration`` is in days
+            (like the ``span`` of ``get_all_by_usage``).
+        """
+        rollups = fact_daily_rollups
+
+        def _rollup_days():
+            totals = fetch_tallied()
+            add_ongoing(totals)
+            return [
+                (day, seconds / 86400.0, count)
+                for day, (seconds, count) in sorted(totals.items())
+            ]
+
+        def fetch_tallied():
+            query = self.store.session.query(
+                rollups.c.day,
+                func.sum(rollups.c.seconds),
+                func.sum(rollups.c.count),
+            )
+            query = query.filter(rollups.c.tag_id == 0)
+            if since is not None:
+                query = query.filter(rollups.c.day >= since)
+            if until is not None:
+                query = query.filter(rollups.c.day <= until)
+            query = query.group_by(rollups.c.day)
+            return {day: [seconds, count] for day, seconds, count in query.all()}
+
+        def add_ongoing(totals):
+            query = self.store.session.query(AlchemyFact.start)
+            query = query.filter(
+                AlchemyFact.end == None,  # noqa: E711
+                AlchemyFact.deleted == False,  # noqa: E712
+            )
+            for (start,) in query.all():
+                day = start.date()
+                if (since is not None and day < since) or (
+                    until is not None and day > until
+                ):
+                    continue
+                total = totals.setdefault(day, [0, 0])
+                total[0] += max(0, (self.store.now - start).total_seconds())
+                total[1] += 1
+
+        return _rollup_days()
@@ -31,6 +31,7 @@ from ..objects import (
     fact_tags,
 )
 from . import query_apply_true_or_not
+from .identity_cache import IdentityCache
 from .manager_base import BaseAlchemyManager
 
 __all__ = ("TagManager",)
@@ -41,6 +42,11 @@ class TagManager(BaseAlchemyManager, BaseTagManager):
 
     def __init__(self, *args, **kwargs):
         super(TagManager, self).__init__(*args, **kwargs)
+        self.identity_cache = IdentityCache(
+            state=tag_identity,
+            natural_key=lambda tag: tag.name,
+            maxsize=self.IDENTITY_CACHE_SIZE,
+        )
 
     # ***
 
@@ -135,9 +141,10 @@ class TagManager(BaseAlchemyManager, BaseTagManager):
             self.store.logger.error(message)
             raise KeyError(message)
         alchemy_tag.name = tag.name
+        self.identity_cache.forget(tag.pk)
 
         try:
-            self.store.session.commit()
+            self.store.commit()
         except IntegrityError as err:
             message = _(
                 "An error occured! Are you sure that tag.name is not "
@@ -180,8 +187,9 @@ class TagManager(BaseAlchemyManager, BaseTagManager):
             self.store.logger.error(message)
             raise KeyError(message)
 
+        self.identity_cache.forget(tag.pk)
         self.store.session.delete(alchemy_tag)
-        self.store.session.commit()
+        self.store.commit()
         self.store.logger.debug("Deleted: {!r}".format(tag))
 
     # ***
@@ -205,6 +213,9 @@ class TagManager(BaseAlchemyManager, BaseTagManager):
         self.store.logger.debug("Received PK: ‘{}’".format(pk))
 
         if deleted is None:
+            cached = self.identity_cache.get(pk)
+            if cached is not None:
+                return cached
             result = self.store.session.query(AlchemyTag).get(pk)
         else:
             query = self.store.session.query(AlchemyTag)
@@ -240,6 +251,10 @@ class TagManager(BaseAlchemyManager, BaseTagManager):
         """
         self.store.logger.debug("Received name: ‘{}’ / raw: {}.".format(name, raw))
 
+        cached = self.identity_cache_lookup(name, raw=raw)
+        if cached is not None:
+            return cached
+
         try:
             result = self.store.session.query(AlchemyTag).filter_by(name=name).one()
         except NoResultFound:
@@ -250,6 +265,8 @@ class TagManager(BaseAlchemyManager, BaseTagManager):
         if not raw:
             result = result.as_hamster(self.store)
             self.store.logger.debug("Returning: {!r}".format(result))
+        else:
+            self.identity_cache.remember(result)
         return result
 
     # ***
@@ -302,6 +319,27 @@ class TagManager(BaseAlchemyManager, BaseTagManager):
         query = query.join(AlchemyFact)
         return query
 
+    def _gather_query_start_rollup(self, qt, agg_cols, rollup_rows):
+        query = self.store.session.query(AlchemyTag, *agg_cols)
+        query = query.select_from(rollup_rows)
+        query = query.join(AlchemyTag, AlchemyTag.pk == rollup_rows.c.tag_id)
+        return query
+
+    def _gather_query_rollup_rows(self, qt, tagged=True):
+        # Tally each Tag's usage, rather than each Activity's.
+        return super(TagManager, self)._gather_query_rollup_rows(qt, tagged=tagged)
+
+    def _gather_query_allows_rollups(self, qt):
+        allows_rollups = super(TagManager, self)._gather_query_allows_rollups(qt)
+        # The Tag query joins Activity and Category from the Fact, which the
+        # rollups do not support (see query_criteria_filter_by_activities).
+        allows_rollups = allows_rollups and not (
+            qt.match_activities
+            or qt.match_categories
+            or qt.sort_cols_has_any("activity", "category")
+        )
+        return allows_rollups
+
     def query_criteria_filter_by_activities(self, query, qt):
         query, criteria = super(
             TagManager,
@@ -334,3 +372,13 @@ class TagManager(BaseAlchemyManager, BaseTagManager):
         return query, criteria
 
     # ***
+
+
+# ***
+
+
+def tag_identity(tag):
+    """Returns the values that a hydrated Tag must match to be reused."""
+    # An AlchemyTag has no freq, but a Fact may count Tags in Tag.freq.
+    freq = getattr(tag, "freq", 1)
+    return (tag.pk, tag.name, bool(tag.deleted), bool(tag.hidden), freq)
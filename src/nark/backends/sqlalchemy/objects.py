@@ -44,19 +44,28 @@ Note:
 # Profiling: Loading sqlalchemy takes about ~ 0.150 secs.
 # (lb): And there's probably not a way to avoid it.
 from sqlalchemy import (
+    DDL,
     Boolean,
     Column,
+    Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     MetaData,
     Table,
     Unicode,
     UnicodeText,
     UniqueConstraint,
+    event,
+    select,
+    union_all,
 )
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import mapper, relationship
+from sqlalchemy.sql import column, table
 
+from ...helpers.dev.instrument import instrument_hydrate
 from ...items.activity import Activity
 from ...items.category import Category
 from ...items.fact import Fact
@@ -64,6 +73,23 @@ from ...items.tag import Tag
 
 DEFAULT_STRING_LENGTH = 254
 
+# SQLite stores datetimes as strings, and SQLAlchemy's default format
+# includes microseconds, e.g., "2018-04-22 12:00:00.000000", whereas
+# Legacy Hamster (and older nark) stored "2018-04-22 12:00:00". Because
+# a mix of formats does not sort lexically, the queries used to wrap the
+# columns in func.datetime() to normalize them, which meant no index on
+# start_time or end_time could ever be used. So store one canonical,
+# lexically sortable format instead (and see migration 002, which rewrites
+# existing values to match). Note that AlchemyFact drops microseconds, too.
+DATETIME_STORAGE_FORMAT = (
+    "%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+)
+
+FactDateTime = DateTime().with_variant(
+    sqlite.DATETIME(storage_format=DATETIME_STORAGE_FORMAT),
+    "sqlite",
+)
+
 
 class AlchemyCategory(Category):
     def __init__(self, pk, name, deleted, hidden):
@@ -79,14 +105,25 @@ class AlchemyCategory(Category):
         self.deleted = bool(deleted)
         self.hidden = bool(hidden)
 
+    @instrument_hydrate
     def as_hamster(self, store):
         """Return store object as a real ``nark.Category`` instance."""
-        return Category(
-            pk=self.pk,
-            name=self.name,
-            deleted=bool(self.deleted),
-            hidden=bool(self.hidden),
-        )
+
+        def new_category():
+            return Category(
+                pk=self.pk,
+                name=self.name,
+                deleted=bool(self.deleted),
+                hidden=bool(self.hidden),
+            )
+
+        # Share one Category instance among all the Activities (and Facts)
+        # that use it, rather than making a new one for each.
+        return store.categories.identity_cache.hydrate(self, new_category)
+
+    def __repr__(self):
+        # Don't print Category.activities (see AlchemyActivity.__repr__).
+        return super(AlchemyCategory, self).__repr__(ignore=set(["activities"]))
 
 
 class AlchemyActivity(Activity):
@@ -108,20 +145,32 @@ class AlchemyActivity(Activity):
         self.deleted = bool(deleted)
         self.hidden = bool(hidden)
 
+    @instrument_hydrate
     def as_hamster(self, store):
-        """Return new ``nark.Activity`` representation of SQLAlchemy instance."""
-        if self.category:
-            category = self.category.as_hamster(store)
-        else:
-            category = None
-        activity_name = self.name
-        return Activity(
-            pk=self.pk,
-            name=activity_name,
-            category=category,
-            deleted=bool(self.deleted),
-            hidden=bool(self.hidden),
-        )
+        """Return ``nark.Activity`` representation of SQLAlchemy instance."""
+
+        def new_activity():
+            if self.category:
+                category = self.category.as_hamster(store)
+            else:
+                category = None
+            activity_name = self.name
+            return Activity(
+                pk=self.pk,
+                name=activity_name,
+                category=category,
+                deleted=bool(self.deleted),
+                hidden=bool(self.hidden),
+            )
+
+        # Share one Activity instance among all the Facts that use it.
+        return store.activities.identity_cache.hydrate(self, new_activity)
+
+    def __repr__(self):
+        # Don't print Activity.facts, which, once loaded (e.g., in a long
+        # store.transaction()), prints every Fact, each time the Activity
+        # is logged (e.g., on each save).
+        return super(AlchemyActivity, self).__repr__(ignore=set(["facts"]))
 
 
 class AlchemyTag(Tag):
@@ -138,14 +187,20 @@ class AlchemyTag(Tag):
         self.deleted = bool(deleted)
         self.hidden = bool(hidden)
 
+    @instrument_hydrate
     def as_hamster(self, store):
         """Provide an convenient way to return it as a ``nark.Tag`` instance."""
-        return Tag(
-            pk=self.pk,
-            name=self.name,
-            deleted=bool(self.deleted),
-            hidden=bool(self.hidden),
-        )
+
+        def new_tag():
+            return Tag(
+                pk=self.pk,
+                name=self.name,
+                deleted=bool(self.deleted),
+                hidden=bool(self.hidden),
+            )
+
+        # Share one Tag instance among all the Facts that use it.
+        return store.tags.identity_cache.hydrate(self, new_tag)
 
     def __repr__(self):
         # Don't print Tag.facts, otherwise printing a Fact creates a huge
@@ -184,6 +239,7 @@ class AlchemyFact(Fact):
         # Tags can only be assigned after the fact has been created.
         self.tags = list()
 
+    @instrument_hydrate
     def as_hamster(self, store, tags=None, set_freqs=False):
         """Provide an convenient way to return it as a ``nark.Fact`` instance."""
         # NOTE: (lb): By default, self.tags is lazy loaded, which causes a fetch
@@ -252,6 +308,11 @@ activities = Table(
     UniqueConstraint("name", "category_id"),
 )
 
+# Activities are joined to their Category, e.g., to find a Category's
+# Activities. (The UniqueConstraint index leads with the name, so it
+# does not help.) USYNC: This index is also created by migration 005.
+Index("ix_activities_category_id", activities.c.category_id)
+
 mapper(
     AlchemyActivity,
     activities,
@@ -291,8 +352,9 @@ facts = Table(
     # is more of a suggestion in SQLite, which stores both types as strings,
     # and the strings are your typical datetime (iso8601 without the 'T',
     # and with a timezone), "YYYY-MM-DD HH:MM:SS".
-    Column("start_time", DateTime),
-    Column("end_time", DateTime),
+    # - See FactDateTime, which stores one canonical, sortable format.
+    Column("start_time", FactDateTime),
+    Column("end_time", FactDateTime),
     Column("activity_id", Integer, ForeignKey(activities.c.id)),
     # FIXME/2018-05-20: (lb): Why the hard limit? And why isn't it documented?
     # ALSO: seriously, only 500 chars for "description"??
@@ -302,8 +364,26 @@ facts = Table(
     # FIXME/2018-06-09: (lb): Remove this comment after verifying against
     #   another store, e.g., Postgres.
     Column("description", UnicodeText()),
+    # Never reuse an ID, not even the highest, after its Fact is archived
+    # (see FactManager.archive), or purged.
+    # USYNC: The table is rebuilt with AUTOINCREMENT by migration 007.
+    sqlite_autoincrement=True,
 )
 
+# Most Fact queries exclude deleted Facts and compare start or end times,
+# so lead each time index with the deleted column. And the final, active
+# Fact is found by ``end_time IS NULL``, so index that expression, too.
+# USYNC: These indexes are also created by migration 002.
+Index("ix_facts_deleted_start_time", facts.c.deleted, facts.c.start_time)
+Index("ix_facts_deleted_end_time", facts.c.deleted, facts.c.end_time)
+Index("ix_facts_end_time_is_null", facts.c.end_time.is_(None))
+# And Facts are joined to their Activity, e.g., to gather Activity usage.
+# USYNC: This index is also created by migration 005.
+Index("ix_facts_activity_id", facts.c.activity_id)
+# And edits are found by the Fact they were split from (see FactManager.histories).
+# USYNC: This index is also created by migration 006.
+Index("ix_facts_split_from_id", facts.c.split_from_id)
+
 mapper(
     AlchemyFact,
     facts,
@@ -328,9 +408,207 @@ mapper(
 # 2018-04-22: (lb): ProjectHamster renamed fact_tags to facttags. But
 # that term isn't used in the code other than in this Table mapping
 # (which no other code uses; though maybe SQLAlchemy uses it internally?).
+# - Each Fact-Tag link is unique, and the (fact_id, tag_id) primary key
+#   is the table itself (WITHOUT ROWID), so finding a Fact's Tags is one
+#   index range, and the reverse index finds a Tag's Facts.
+# USYNC: The key and index are also created by migration 005.
 fact_tags = Table(
     "fact_tags",
     metadata,
-    Column("fact_id", Integer, ForeignKey(facts.c.id)),
-    Column("tag_id", Integer, ForeignKey(tags.c.id)),
+    Column("fact_id", Integer, ForeignKey(facts.c.id), primary_key=True),
+    Column("tag_id", Integer, ForeignKey(tags.c.id), primary_key=True),
+    sqlite_with_rowid=False,
+)
+Index("ix_fact_tags_tag_id_fact_id", fact_tags.c.tag_id, fact_tags.c.fact_id)
+
+# The deleted Facts -- each edit's old Fact, and each removed Fact -- can
+# be moved out of the way, to facts_archive, and their Tag links to
+# fact_tags_archive (see FactManager.archive), so that the live queries
+# (which all exclude deleted Facts) only search the live Facts. Archived
+# Facts keep their IDs, and the queries that find deleted Facts read each
+# table and its archive together, using the unions below.
+# USYNC: These tables are also created by migration 007.
+facts_archive = Table(
+    "facts_archive",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("deleted", Boolean),
+    Column("split_from_id", Integer, nullable=True),
+    Column("start_time", FactDateTime),
+    Column("end_time", FactDateTime),
+    Column("activity_id", Integer, ForeignKey(activities.c.id)),
+    Column("description", UnicodeText()),
+)
+Index("ix_facts_archive_split_from_id", facts_archive.c.split_from_id)
+
+fact_tags_archive = Table(
+    "fact_tags_archive",
+    metadata,
+    Column("fact_id", Integer, ForeignKey(facts_archive.c.id), primary_key=True),
+    Column("tag_id", Integer, ForeignKey(tags.c.id), primary_key=True),
+    sqlite_with_rowid=False,
+)
+
+# For reading the live and archived Facts (and Tag links) as one, e.g.,
+# ``session.query(AlchemyFact).select_entity_from(facts_and_archive)``.
+facts_and_archive = union_all(select(facts), select(facts_archive)).subquery(
+    "facts_and_archive"
+)
+fact_tags_and_archive = union_all(
+    select(fact_tags), select(fact_tags_archive)
+).subquery("fact_tags_and_archive")
+
+# Each Fact, Activity, Category, and Tag that's added, updated, or removed
+# (or marked deleted) appends a row to the changes table, in the same
+# transaction (see SQLAlchemyStore.changes_record). The seq only increases
+# (AUTOINCREMENT never reuses a seq), so a client that mirrors the items
+# can ask for the changes after the last seq it saw, and reload just those
+# items (see SQLAlchemyStore.changes_since).
+# USYNC: This table is also created by migration 008.
+changes = Table(
+    "changes",
+    metadata,
+    Column("seq", Integer, primary_key=True),
+    Column("entity", Unicode(16), nullable=False),
+    Column("item_id", Integer, nullable=False),
+    Column("op", Unicode(16), nullable=False),
+    Column("changed_at", FactDateTime, nullable=False),
+    sqlite_autoincrement=True,
+)
+
+# Each closed, non-deleted Fact is tallied by its start date (the same
+# date() that gather uses for group_days) on one row for its Activity,
+# with tag_id = 0, and on one row for each of its Tags. So Activity usage
+# sums the tag_id = 0 rows, and Tag usage sums the others. The rows are
+# maintained by FactManager as it adds, updates, and removes Facts; and
+# an unknown Activity (activity_id IS NULL) is tallied as activity_id = 0.
+# - The active Fact is not tallied, because its span is still growing.
+# USYNC: This table is also created (and populated) by migration 003.
+fact_daily_rollups = Table(
+    "fact_daily_rollups",
+    metadata,
+    Column("day", Date, primary_key=True),
+    Column("activity_id", Integer, primary_key=True, autoincrement=False),
+    Column("tag_id", Integer, primary_key=True, autoincrement=False),
+    Column("seconds", Integer, nullable=False),
+    Column("count", Integer, nullable=False),
+)
+
+# Each Fact's searchable text -- its description, its Activity and Category
+# names, and its Tag names -- is indexed in the facts_fts SQLite FTS5 table,
+# by the Fact ID (the FTS rowid). The rows are maintained by triggers, so
+# that renaming an Activity, Category, or Tag reindexes its Facts, too.
+# (The FTS table is SQLite-specific, so it's not a Table of the metadata;
+# see the lightweight facts_fts table, below, for querying it.)
+# USYNC: This table (and its triggers) is also created (and populated)
+#        by migration 004.
+
+FACTS_FTS_COLUMNS = ("description", "activity", "category", "tags")
+
+FACTS_FTS_CREATE = (
+    "CREATE VIRTUAL TABLE facts_fts USING fts5"
+    " (description, activity, category, tags,"
+    " tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+# Indexes the Facts that match the condition ({0}).
+FACTS_FTS_INSERT = (
+    "INSERT INTO facts_fts (rowid, description, activity, category, tags)"
+    " SELECT facts.id, COALESCE(facts.description, ''),"
+    " COALESCE(activities.name, ''), COALESCE(categories.name, ''),"
+    " COALESCE((SELECT group_concat(tags.name, ' ') FROM fact_tags"
+    " JOIN tags ON tags.id = fact_tags.tag_id"
+    " WHERE fact_tags.fact_id = facts.id), '')"
+    " FROM facts"
+    " LEFT JOIN activities ON activities.id = facts.activity_id"
+    " LEFT JOIN categories ON categories.id = activities.category_id"
+    " WHERE {0}"
+)
+
+# Reindexes the Facts that match the condition, which a trigger formats
+# using its NEW or OLD row.
+FACTS_FTS_REINDEX = (
+    "DELETE FROM facts_fts WHERE rowid IN (SELECT facts.id FROM facts WHERE {0}); "
+    + FACTS_FTS_INSERT
+    + ";"
+)
+
+# Maps each trigger name → (its event, and the condition of the Facts to reindex).
+FACTS_FTS_TRIGGERS = (
+    ("facts_fts_facts_insert", "AFTER INSERT ON facts", "facts.id = new.id"),
+    (
+        "facts_fts_facts_update",
+        "AFTER UPDATE OF description, activity_id ON facts",
+        "facts.id = new.id",
+    ),
+    (
+        "facts_fts_fact_tags_insert",
+        "AFTER INSERT ON fact_tags",
+        "facts.id = new.fact_id",
+    ),
+    (
+        "facts_fts_fact_tags_delete",
+        "AFTER DELETE ON fact_tags",
+        "facts.id = old.fact_id",
+    ),
+    (
+        "facts_fts_activities_update",
+        "AFTER UPDATE OF name, category_id ON activities",
+        "facts.activity_id = new.id",
+    ),
+    (
+        "facts_fts_categories_update",
+        "AFTER UPDATE OF name ON categories",
+        "facts.activity_id IN (SELECT id FROM activities WHERE category_id = new.id)",
+    ),
+    (
+        "facts_fts_tags_update",
+        "AFTER UPDATE OF name ON tags",
+        "facts.id IN (SELECT fact_id FROM fact_tags WHERE tag_id = new.id)",
+    ),
+)
+
+
+def facts_fts_ddl():
+    """Returns the statements that create (but do not populate) facts_fts."""
+    statements = [FACTS_FTS_CREATE]
+    for trigger_name, trigger_event, condition in FACTS_FTS_TRIGGERS:
+        statements.append(
+            "CREATE TRIGGER {0} {1} BEGIN {2} END".format(
+                trigger_name,
+                trigger_event,
+                FACTS_FTS_REINDEX.format(condition),
+            )
+        )
+    statements.append(
+        "CREATE TRIGGER facts_fts_facts_delete AFTER DELETE ON facts"
+        " BEGIN DELETE FROM facts_fts WHERE rowid = old.id; END"
+    )
+    return statements
+
+
+# Populates facts_fts from the existing Facts (e.g., after a migration).
+FACTS_FTS_POPULATE = FACTS_FTS_INSERT.format("1")
+
+
+def facts_fts_available(ddl, target, bind, **kwargs):
+    """Returns True if the SQLite library supports FTS5."""
+    options = bind.exec_driver_sql("PRAGMA compile_options").fetchall()
+    return ("ENABLE_FTS5",) in [tuple(option) for option in options]
+
+
+for _statement in facts_fts_ddl():
+    event.listen(
+        metadata,
+        "after_create",
+        DDL(_statement).execute_if(dialect="sqlite", callable_=facts_fts_available),
+    )
+
+# For querying facts_fts, e.g., ``facts_fts.c.facts_fts.op("MATCH")(terms)``.
+facts_fts = table(
+    "facts_fts",
+    column("rowid", Integer),
+    column("rank"),
+    column("facts_fts"),
+    *[column(col_name) for col_name in FACTS_FTS_COLUMNS],
 )
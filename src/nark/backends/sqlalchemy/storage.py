@@ -20,15 +20,18 @@
 """``nark`` object store."""
 
 import os.path
+from contextlib import contextmanager
 from gettext import gettext as _
 
 # Profiling: load create_engine: ~ 0.100 secs.
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
 from sqlalchemy.exc import OperationalError
 
 # Profiling: load sessionmaker: ~ 0.050 secs.
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql.expression import select
 
+from ...config import SQLITE_PRESETS
 from ...manager import BaseStore
 from . import objects
 from .managers.activity import ActivityManager
@@ -39,6 +42,15 @@ from .managers.tag import TagManager
 
 __all__ = ("SQLAlchemyStore",)
 
+# The item types recorded in the changes table, in the order that each
+# flush's changes are recorded (each item after those it references).
+CHANGES_ENTITIES = (
+    (objects.AlchemyCategory, "category"),
+    (objects.AlchemyActivity, "activity"),
+    (objects.AlchemyTag, "tag"),
+    (objects.AlchemyFact, "fact"),
+)
+
 
 class SQLAlchemyStore(BaseStore):
     """
@@ -70,7 +82,20 @@ class SQLAlchemyStore(BaseStore):
     def __init__(self, config):
         """ """
         super(SQLAlchemyStore, self).__init__(config)
+        # Each store owns its Engine and Session, so that one process can
+        # open many stores (see StorePool), each on a different database.
+        self.engine = None
+        self.session = None
+        self._owns_session = False
+        # The depth of nested session_scope calls.
+        self._session_scopes = 0
+        # The depth of nested transaction calls.
+        self._transactions = 0
+        # The (entity, pk) of each item added since the last commit.
+        self._changes_added = set()
         self.create_item_managers()
+        if self.config["dev.instrument"]:
+            self.instrument.enable()
 
     def standup(self, session=None):
         """
@@ -93,14 +118,33 @@ class SQLAlchemyStore(BaseStore):
         return created_fresh
 
     def cleanup(self):
-        pass
+        """Close the store's Session (unless provided) and its Engine's connections."""
+        if self.session is not None:
+            for event_name, listener in self.changes_listeners():
+                if event.contains(self.session, event_name, listener):
+                    event.remove(self.session, event_name, listener)
+        if self.session is not None and self._owns_session:
+            self.session.close()
+        self.session = None
+        self._owns_session = False
+        if self.engine is not None:
+            self.engine.dispose()
+        self.engine = None
 
     @property
     def db_url(self):
+        """The store's ``database_url`` (see config_db_url)."""
+        return self.config_db_url(self.config, self.logger)
+
+    @staticmethod
+    def config_db_url(config, logger):
         """
         Create a ``database_url`` from ``config`` suitable to be consumed
         by ``create_engine``
 
+        (This does not need a store, so that StorePool can find the store
+        for a config before creating one.)
+
         Our config may include:
             * ''db.engine``; Engine to be used.
             * ``db.host``; Host to connect to.
@@ -133,22 +177,22 @@ class SQLAlchemyStore(BaseStore):
 
         # Because ConfigDecorator, we could access variables with
         # dot-notation or by subscripting, e.g., these both work:
-        #   engine = self.config['db.engine']
-        #   engine = self.config['db']['engine']
+        #   engine = config['db.engine']
+        #   engine = config['db']['engine']
         # The code generally uses dot-notation because that's how
         # the user sees it in `dob config dump` output; it's more
         # concise; and it's easier to bang out in a search command.
-        engine = self.config["db.engine"]
-        host = self.config["db.host"]
-        name = self.config["db.name"]
-        path = self.config["db.path"]
-        port = self.config["db.port"]
-        user = self.config["db.user"]
-        password = self.config["db.password"]
+        engine = config["db.engine"]
+        host = config["db.host"]
+        name = config["db.name"]
+        path = config["db.path"]
+        port = config["db.port"]
+        user = config["db.user"]
+        password = config["db.password"]
 
         if not engine:
             message = _("No engine found in config!")
-            self.logger.error(message)
+            logger.error(message)
             raise ValueError(message)
 
         # URL composition is slightly different for sqlite
@@ -159,7 +203,7 @@ class SQLAlchemyStore(BaseStore):
                 # than implicit. You can still create an in memory db by passing
                 # ``db_path=':memory:'`` deliberately.
                 message = _("No 'db.path' found in config! Sqlite requires one.")
-                self.logger.error(message)
+                logger.error(message)
                 raise ValueError(message)
             if path != ":memory:":
                 # Make sure we always use an absolute path.
@@ -171,28 +215,28 @@ class SQLAlchemyStore(BaseStore):
                     "No 'db.host' found in config!"
                     " Engines other than sqlite require one."
                 )
-                self.logger.error(message)
+                logger.error(message)
                 raise ValueError(message)
             if not name:
                 message = _(
                     "No 'db.name' found in config!"
                     " Engines other than sqlite require one."
                 )
-                self.logger.error(message)
+                logger.error(message)
                 raise ValueError(message)
             if not user:
                 message = _(
                     "No 'db.user' found in config!"
                     " Engines other than sqlite require one."
                 )
-                self.logger.error(message)
+                logger.error(message)
                 raise ValueError(message)
             if not password:
                 message = _(
                     "No 'db.password' found in config!"
                     " Engines other than sqlite require one."
                 )
-                self.logger.error(message)
+                logger.error(message)
                 raise ValueError(message)
             if port:
                 port = ":{}".format(port)
@@ -204,7 +248,7 @@ class SQLAlchemyStore(BaseStore):
                 port=port,
                 name=name,
             )
-        self.logger.debug(_("database_url: {}".format(database_url)))
+        logger.debug(_("database_url: {}".format(database_url)))
         return database_url
 
     def create_storage_engine(self):
@@ -214,6 +258,8 @@ class SQLAlchemyStore(BaseStore):
         # its own engine?
         engine = create_engine(self.db_url)
         self.logger.debug(_("Engine created."))
+        if self.config["db.engine"] == "sqlite":
+            self.listen_sqlite_pragmas(engine)
         # NOTE: (lb): I succeeded at setting the ORM (Sqlite3) logger level,
         # but it didn't log anything (I was hoping to see all statements).
         #
@@ -221,13 +267,53 @@ class SQLAlchemyStore(BaseStore):
         #  engine.logger.setLevel(logging.DEBUG)
         return engine
 
+    # The db.sqlite settings, in the order to apply them. (Set busy_timeout
+    # first, so that changing the journal_mode waits on a locked database.)
+    SQLITE_PRAGMAS = (
+        "busy_timeout",
+        "journal_mode",
+        "synchronous",
+        "cache_size",
+        "mmap_size",
+        "temp_store",
+    )
+
+    @property
+    def sqlite_pragmas(self):
+        """Returns the (name, value) of each db.sqlite setting (or preset) to apply."""
+        preset = SQLITE_PRESETS.get(self.config["db.sqlite.preset"], {})
+        pragmas = []
+        for name in self.SQLITE_PRAGMAS:
+            value = self.config["db.sqlite.{}".format(name)]
+            if value is None or value == "":
+                value = preset.get(name)
+            if value is not None:
+                pragmas.append((name, value))
+        return pragmas
+
+    def listen_sqlite_pragmas(self, engine):
+        """Apply the db.sqlite settings to each connection the Engine opens."""
+        pragmas = self.sqlite_pragmas
+        if not pragmas:
+            return
+        # The settings are validated (by choices, or as int), so use as is.
+        statements = ["PRAGMA {} = {}".format(name, value) for name, value in pragmas]
+
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for statement in statements:
+                    cursor.execute(statement)
+            finally:
+                cursor.close()
+
+        event.listen(engine, "connect", set_sqlite_pragmas)
+        self.logger.debug(_("SQLite pragmas: {}").format(", ".join(statements)))
+
     def create_storage_tables(self, engine):
-        # Such magic: Stash the Engine() object in the SQLAlchemy package
-        # where the Alchemy items will find it and use it by default.
-        # - Per docs, store the object at objects.metadata.bind, where it can
-        #   be "held globally for the lifetime of a single application...."
-        #     https://docs.sqlalchemy.org/en/13/core/connections.html
-        objects.metadata.bind = engine
+        # Keep the Engine on the store, rather than binding it globally (at
+        # objects.metadata.bind), so that each store talks to its own database.
+        self.engine = engine
 
         created_fresh = False
         try:
@@ -252,9 +338,271 @@ class SQLAlchemyStore(BaseStore):
             Session = sessionmaker(bind=engine)  # NOQA
             self.logger.debug(_("Bound engine to session-object."))
             self.session = Session()
+            self._owns_session = True
             self.logger.debug(_("Instantiated session."))
         else:
             self.session = session
+            self._owns_session = False
+        for event_name, listener in self.changes_listeners():
+            if not event.contains(self.session, event_name, listener):
+                event.listen(self.session, event_name, listener)
+
+    # ***
+
+    @contextmanager
+    def session_scope(self):
+        """
+        Runs a unit of work, and then releases the items it loaded from the Session.
+
+        The managers commit their own changes, so the scope does not commit, but
+        it rolls back if the work raises. A nested scope is released when the
+        outermost scope exits.
+
+        Within a ``transaction`` (or ``savepoint``), the scope does not roll
+        back, so a scope's error does not cancel the enclosing transaction.
+        The error is left to the transaction (or savepoint) to roll back, if
+        it reaches it, and otherwise the transaction's other work is kept.
+
+        Note that any Alchemy items returned by the work (e.g., from ``raw=True``
+        calls) are detached when the scope exits, so they cannot lazy-load their
+        relationships after.
+        """
+        self._session_scopes += 1
+        try:
+            yield self.session
+        except Exception:
+            self.rollback()
+            raise
+        finally:
+            self._session_scopes -= 1
+            if not self._session_scopes:
+                self.session_release()
+
+    def session_release(self):
+        """
+        Expunges every item from the Session, unless it has unsaved changes.
+
+        The Session's identity map only holds weak references to unchanged
+        items, but a caller that keeps any loaded item (e.g., a Fact) keeps
+        everything it references (e.g., its Activity and Tags) in the Session,
+        too, and SQLAlchemy keeps bookkeeping state for each one.
+        """
+        session = self.session
+        if session is None:
+            return False
+        if session.new or session.dirty or session.deleted:
+            self.logger.warning(_("Session not released: It has unsaved changes."))
+            return False
+        session.expunge_all()
+        return True
+
+    def session_release_maybe(self):
+        """Releases the Session's items, if it has more than db.identity_map_size."""
+        limit = self.config["db.identity_map_size"]
+        if not limit or self._session_scopes or self.session is None:
+            return False
+        if len(self.session.identity_map) <= limit:
+            return False
+        self.logger.debug(_("Releasing Session items (over {}).").format(limit))
+        return self.session_release()
+
+    # ***
+
+    @contextmanager
+    def transaction(self):
+        """
+        Runs many saves (and removes) as one transaction, which commits once.
+
+        E.g., ``with store.transaction(): [store.facts.save(f) for f in facts]``.
+
+        Within the transaction, each manager call flushes its changes rather
+        than committing them (see ``commit``), so each call still sees the
+        changes before it (e.g., when checking that a Fact's time window is
+        available), and a failing change still raises from its call. When
+        the outermost transaction exits, the Session is committed, or, if
+        the work raised, it's rolled back.
+
+        To roll back just one part of the work (e.g., to skip a bad item, but
+        to keep the others), run that part in a ``savepoint``, and catch its
+        error outside the savepoint.
+        """
+        self._transactions += 1
+        outermost = self._transactions == 1
+        try:
+            if outermost:
+                self.transaction_begin()
+            yield self.session
+            if outermost:
+                self.session.commit()
+        except Exception:
+            if outermost:
+                self.transaction_rollback()
+            raise
+        finally:
+            self._transactions -= 1
+
+    @contextmanager
+    def savepoint(self):
+        """
+        Runs part of a ``transaction``, which, if it raises, is rolled back alone.
+
+        (If not already in a transaction, the savepoint runs in its own.)
+        """
+        with self.transaction():
+            nested = self.session.begin_nested()
+            try:
+                yield self.session
+            except Exception:
+                # A failed flush will have already rolled back the savepoint.
+                if nested.is_active:
+                    nested.rollback()
+                # Forget any new items that were hydrated before the rollback.
+                self.categories.identity_caches_clear()
+                raise
+            nested.commit()
+
+    def commit(self):
+        """Commits the Session, unless in a ``transaction``, which then flushes it."""
+        if self._transactions:
+            self.session.flush()
+        else:
+            self.session.commit()
+
+    def rollback(self):
+        """
+        Rolls back the Session, unless in a ``transaction``, which rolls back
+        (or whose ``savepoint`` rolls back) if the error reaches it.
+
+        Returns:
+            bool: True if the Session was rolled back.
+        """
+        if self.session is None or self._transactions:
+            return False
+        self.transaction_rollback()
+        return True
+
+    def transaction_begin(self):
+        # pysqlite does not emit BEGIN until the first INSERT (or UPDATE,
+        # etc.). So if a SAVEPOINT came first, it would start the transaction,
+        # and its RELEASE would commit it. So emit BEGIN first.
+        # - See "Serializable isolation / Savepoints / Transactional DDL":
+        #   https://docs.sqlalchemy.org/en/14/dialects/sqlite.html
+        if self.config["db.engine"] != "sqlite":
+            return
+        dbapi_connection = self.session.connection().connection.dbapi_connection
+        if not dbapi_connection.in_transaction:
+            dbapi_connection.execute("BEGIN")
+
+    def transaction_rollback(self):
+        self.session.rollback()
+        # Forget any new items that were hydrated before the rollback.
+        # (The FactManager's IntervalIndex forgets itself on rollback.)
+        self.categories.identity_caches_clear()
+
+    # ***
+
+    def changes_listeners(self):
+        return (
+            ("after_flush", self.changes_record),
+            ("after_commit", self.changes_forget),
+            ("after_soft_rollback", self.changes_forget),
+        )
+
+    def changes_record(self, session, flush_context):
+        """
+        Appends a changes row for each item that the Session just flushed.
+
+        Each new item is an "add"; each deleted item, or item newly marked
+        deleted, is a "remove"; and each other item whose columns changed is
+        an "update". (Changing just an item's collections, e.g., adding a
+        Fact to an Activity's ``facts``, does not change the Activity.) An
+        item that's added, and then changed by a later flush before it's
+        committed (e.g., a new Fact that's autoflushed before its Activity
+        is set), is just an "add".
+
+        The rows are inserted by the flush, so they're committed (or rolled
+        back) with the items. And SQLite allows just one writer at a time,
+        so the changes are committed in ``seq`` order.
+        """
+
+        def _changes_record():
+            changed = []
+            for item in session.new:
+                changed.append((item, "add"))
+            for item in session.dirty:
+                if session.is_modified(item, include_collections=False):
+                    changed.append((item, update_or_remove(item)))
+            for item in session.deleted:
+                changed.append((item, "remove"))
+            rows = []
+            for item, op in changed:
+                entity_index, entity = entity_of(item)
+                if entity is None:
+                    continue
+                if op == "add":
+                    self._changes_added.add((entity, item.pk))
+                elif op == "update" and (entity, item.pk) in self._changes_added:
+                    continue
+                rows.append((entity_index, item.pk, entity, op))
+            if not rows:
+                return
+            rows.sort()
+            changed_at = self.now_tz_aware()
+            session.connection().execute(
+                objects.changes.insert(),
+                [
+                    {
+                        "entity": entity,
+                        "item_id": pk,
+                        "op": op,
+                        "changed_at": changed_at,
+                    }
+                    for _entity_index, pk, entity, op in rows
+                ],
+            )
+
+        def update_or_remove(item):
+            deleted = inspect(item).attrs.deleted.history
+            if item.deleted and deleted.added:
+                return "remove"
+            return "update"
+
+        def entity_of(item):
+            for entity_index, (alchemy_cls, entity) in enumerate(CHANGES_ENTITIES):
+                if isinstance(item, alchemy_cls):
+                    return entity_index, entity
+            return None, None
+
+        _changes_record()
+
+    def changes_forget(self, session, *args):
+        """Forgets the items added before the commit (or rollback)."""
+        self._changes_added.clear()
+
+    def changes_since(self, seq=0, limit=None):
+        """
+        Returns the items' changes after the given sequence number, oldest first.
+
+        A client that mirrors the items (e.g., a report database, or a cache)
+        can save the last ``seq`` it sees, and later ask for the changes since,
+        and then reload just the changed items (e.g., using ``get``, with
+        ``deleted=None``), rather than reloading all the items.
+
+        Args:
+            seq (int): The ``seq`` of the last change already seen (0 for all).
+
+            limit (int, optional): The most changes to return.
+
+        Returns:
+            list: A ChangeTuple (seq, entity, pk, op, changed_at) for each change.
+        """
+        changes = objects.changes
+        query = select(changes).where(changes.c.seq > seq).order_by(changes.c.seq)
+        if limit:
+            query = query.limit(limit)
+        return [self.ChangeTuple(*row) for row in self.session.execute(query)]
+
+    # ***
 
     def create_item_managers(self):
         self.migrations = MigrationsManager(self)
@@ -0,0 +1,222 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# Copyright © 2015-2016 Eric Goller
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""Process-wide pool of open stores, for serving many databases from one process."""
+
+import copy
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from ...config import decorate_config
+from .storage import SQLAlchemyStore
+
+__all__ = ("StorePool",)
+
+
+class StorePool(object):
+    """
+    A bounded, least-recently-used cache of stood-up stores, by database URL.
+
+    Standing up a store creates its Engine, probes its tables, and opens
+    its Session, which is more work than most requests. So a process that
+    serves many databases (e.g., one per user) can check out each request's
+    store from the pool, and the pool returns the store it already stood up
+    for that database, if it still has it. When the pool is full, it cleans
+    up (closes) the least recently used store.
+
+    The pool is thread-safe, but the stores are not, so the pool only lends
+    each store to one thread at a time: A thread that checks out a store
+    that another thread has checked out waits for it to be checked back in.
+    A store that is evicted (or closed) while checked out is not cleaned up
+    until it is checked back in. And a store is stood up without holding up
+    the pool, so a slow database does not block the others.
+
+    Each store is given its own copy of its config, so that one database's
+    settings (e.g., ``db.fts``) do not change another's. (A config passed as
+    a dict is decorated in place of nark's one ``ConfigRoot``, and then
+    copied, so ``ConfigRoot`` is left with the last config checked out.)
+    """
+
+    class Entry(object):
+        """A pooled store, and who is using it (or waiting to)."""
+
+        def __init__(self, store):
+            self.store = store
+            # Held while the store is stood up, and then while checked out.
+            self.lock = threading.Lock()
+            # The checkouts using (or waiting on) the store. (Pool-locked.)
+            self.users = 0
+            # True once evicted (or closed), to be cleaned up by its last user.
+            self.evicted = False
+            # True if the store failed to stand up, so its waiters start over.
+            self.failed = False
+
+    def __init__(self, maxsize=32, store_cls=SQLAlchemyStore):
+        """
+        Args:
+            maxsize (int): The most stores to keep open before closing the least
+                recently used.
+
+            store_cls (class): The store class to create (and stand up).
+        """
+        self.maxsize = maxsize
+        self.store_cls = store_cls
+        # Maps db_url → Entry.
+        self.stores = OrderedDict()
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger("nark.store")
+
+    def __len__(self):
+        return len(self.stores)
+
+    def __contains__(self, db_url):
+        return db_url in self.stores
+
+    # ***
+
+    @contextmanager
+    def checkout(self, config):
+        """
+        Lend the caller the store for the ``config`` database, standing it up
+        if not open, and waiting if another thread has it checked out.
+
+        Usage::
+
+            with pool.checkout(config) as store:
+                ...
+
+        Yields:
+            The store, which the caller should not use after the ``with``.
+        """
+        entry = self.acquire(config)
+        try:
+            yield entry.store
+        finally:
+            self.release(entry)
+
+    def acquire(self, config):
+        """Return the Entry for ``config``, locked for the caller (see checkout)."""
+
+        def _acquire():
+            created, evicted, entry = find_or_create_entry()
+            for idle in evicted:
+                idle.store.cleanup()
+            if created:
+                # The new entry was locked before anyone else could see it,
+                # so other threads wait for it to be stood up.
+                standup(entry)
+            else:
+                entry.lock.acquire()
+                if entry.failed:
+                    self.release(entry)
+                    return None
+            return entry
+
+        def find_or_create_entry():
+            with self.lock:
+                # Decorating a dict rewrites ConfigRoot, so hold the lock until
+                # the store's config is copied from it.
+                decorated = decorate_config(config)
+                db_url = self.store_cls.config_db_url(decorated, self.logger)
+                try:
+                    self.stores.move_to_end(db_url)
+                except KeyError:
+                    entry = self.Entry(self.store_cls(copy.deepcopy(decorated)))
+                    entry.lock.acquire()
+                    entry.users += 1
+                    self.stores[db_url] = entry
+                    return True, evict_least_recently_used(), entry
+                entry = self.stores[db_url]
+                entry.users += 1
+                return False, [], entry
+
+        def evict_least_recently_used():
+            # Return the evicted stores that no one is using, to be cleaned up
+            # after releasing the pool lock. (The others are cleaned up when
+            # checked back in.)
+            idle = []
+            while len(self.stores) > self.maxsize:
+                _db_url, evicted = self.stores.popitem(last=False)
+                if self._evict(evicted):
+                    idle.append(evicted)
+            return idle
+
+        def standup(entry):
+            try:
+                entry.store.standup()
+            except Exception:
+                with self.lock:
+                    entry.failed = True
+                    self._discard(entry)
+                # Close whatever the store opened before it failed.
+                entry.store.cleanup()
+                self.release(entry)
+                raise
+
+        entry = None
+        while entry is None:
+            entry = _acquire()
+        return entry
+
+    def release(self, entry):
+        """Check in the store of the pool Entry from ``acquire``."""
+        with self.lock:
+            entry.users -= 1
+            cleanup = entry.evicted and not entry.users
+        entry.lock.release()
+        if cleanup:
+            entry.store.cleanup()
+
+    def _evict(self, entry):
+        """Mark the Entry evicted (pool-locked). Returns True if it is unused."""
+        entry.evicted = True
+        return not entry.users
+
+    def _discard(self, entry):
+        """Remove the Entry from the pool, if it is still pooled (pool-locked)."""
+        for db_url, pooled in self.stores.items():
+            if pooled is entry:
+                del self.stores[db_url]
+                break
+
+    def close(self, db_url):
+        """
+        Close the store for ``db_url``, if open. Returns True if it was.
+
+        (If the store is checked out, it is closed when checked back in.)
+        """
+        with self.lock:
+            entry = self.stores.pop(db_url, None)
+            idle = entry is not None and self._evict(entry)
+        if entry is None:
+            return False
+        if idle:
+            entry.store.cleanup()
+        return True
+
+    def clear(self):
+        """Close all the open stores (or, if checked out, once checked in)."""
+        with self.lock:
+            entries = list(self.stores.values())
+            self.stores.clear()
+            idle = [entry for entry in entries if self._evict(entry)]
+        for entry in idle:
+            entry.store.cleanup()
@@ -31,10 +31,12 @@ from .log_levels import get_log_level_safe, get_log_name_safe, must_verify_log_l
 
 __all__ = (
     "REGISTERED_BACKENDS",
+    "SQLITE_PRESETS",
     "ConfigRoot",
     "decorate_config",
     # PRIVATE:
     # 'NarkConfigurableDb',
+    # 'NarkConfigurableDbSqlite',
     # 'NarkConfigurableDev',
     # 'NarkConfigurableTime',
 )
@@ -183,6 +185,188 @@ class NarkConfigurableDb(object):
     def password(self):
         return ""
 
+    # ***
+
+    @property
+    @ConfigRoot.setting(
+        _(
+            "If True, answer Activity, Category, and Tag usage"
+            " from the daily rollups table, rather than from all the Facts."
+            " (Rebuild the rollups first if other apps edit your Facts.)"
+        ),
+    )
+    def rollups(self):
+        return False
+
+    @property
+    @ConfigRoot.setting(
+        _(
+            "If True, check for overlapping Facts and find neighboring Facts"
+            " using an in-memory index of the Facts' times, rather than a query."
+            " (Not for use when other apps edit your Facts at the same time.)"
+        ),
+    )
+    def interval_index(self):
+        return False
+
+    @property
+    @ConfigRoot.setting(
+        _(
+            "If True, move each Fact to the archive tables when it's deleted"
+            " (edited or removed), so that queries only search the live Facts."
+            " (Otherwise, the deleted Facts are archived on demand.)"
+        ),
+    )
+    def archive_deleted(self):
+        return False
+
+    @property
+    @ConfigRoot.setting(
+        _(
+            "If True, match search terms using the full-text search index"
+            " (words and word prefixes, ranked), rather than any substring."
+            " (Requires SQLite with FTS5.)"
+        ),
+    )
+    def fts(self):
+        return False
+
+    @property
+    @ConfigRoot.setting(
+        _(
+            "The most items the database session keeps loaded between queries,"
+            " after which it releases them all (or 0 to never release them)."
+            " (Set this for a long-running process, e.g., the daemon.)"
+        ),
+        value_type=int,
+    )
+    def identity_map_size(self):
+        return 0
+
+
+# ***
+# *** Backend (nark) Config: SQLite connection settings.
+# ***
+
+
+# The db.sqlite.preset choices. Each is a set of db.sqlite settings, which
+# any db.sqlite setting that is also set overrides. (See PRAGMA statements:
+#   https://www.sqlite.org/pragma.html )
+SQLITE_PRESETS = {
+    # Durable: Wait on a locked database, and sync every commit (to the WAL,
+    # which lets readers continue while another connection writes).
+    "safe": {
+        "busy_timeout": 5000,
+        "journal_mode": "wal",
+        "synchronous": "full",
+    },
+    # Faster reads of a large database: A larger page cache (64 MiB), reading
+    # via memory map (256 MiB), and temporary tables (e.g., for GROUP BY) in
+    # memory. Commits sync less often (but the database is not corrupted if
+    # the system crashes; the latest commits might just be lost).
+    "fast-reads": {
+        "busy_timeout": 5000,
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "memory",
+    },
+    # Fastest writes, e.g., for importing. Not crash-safe: Use on a copy,
+    # or on a database you could import again.
+    "bulk-load": {
+        "journal_mode": "memory",
+        "synchronous": "off",
+        "cache_size": -262144,
+        "temp_store": "memory",
+    },
+}
+
+
+@NarkConfigurableDb.section("sqlite")
+class NarkConfigurableDbSqlite(object):
+    """"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    # ***
+
+    @property
+    @NarkConfigurableDb.setting(
+        _(
+            "A set of db.sqlite settings to use (unless set individually):"
+            " ‘safe’, ‘fast-reads’, or ‘bulk-load’ (not crash-safe)."
+            " Or leave empty to use SQLite's defaults."
+        ),
+        choices=("",) + tuple(SQLITE_PRESETS),
+    )
+    def preset(self):
+        return ""
+
+    @property
+    @NarkConfigurableDb.setting(
+        _("The SQLite ‘journal_mode’, e.g., ‘wal’ (or empty for the default)."),
+        choices=("", "delete", "truncate", "persist", "memory", "wal", "off"),
+    )
+    def journal_mode(self):
+        return ""
+
+    @property
+    @NarkConfigurableDb.setting(
+        _("The SQLite ‘synchronous’ setting (or empty for the default)."),
+        choices=("", "off", "normal", "full", "extra"),
+    )
+    def synchronous(self):
+        return ""
+
+    @property
+    @NarkConfigurableDb.setting(
+        _(
+            "The SQLite page cache size, in pages, or in KiB if negative"
+            " (or None for the default)."
+        ),
+        value_type=int,
+        allow_none=True,
+    )
+    def cache_size(self):
+        return None
+
+    @property
+    @NarkConfigurableDb.setting(
+        _(
+            "The most bytes of the database file SQLite reads via memory map"
+            " (or None for the default, usually 0)."
+        ),
+        value_type=int,
+        allow_none=True,
+    )
+    def mmap_size(self):
+        return None
+
+    @property
+    @NarkConfigurableDb.setting(
+        _(
+            "Where SQLite keeps temporary tables and indices:"
+            " ‘file’ or ‘memory’ (or empty for the default)."
+        ),
+        choices=("", "default", "file", "memory"),
+    )
+    def temp_store(self):
+        return ""
+
+    @property
+    @NarkConfigurableDb.setting(
+        _(
+            "How many milliseconds to wait on a locked database before failing"
+            " (or None for the default, which fails immediately)."
+        ),
+        value_type=int,
+        allow_none=True,
+    )
+    def busy_timeout(self):
+        return None
+
 
 # ***
 
@@ -206,6 +390,16 @@ class NarkConfigurableDev(object):
     def catch_errors(self):
         return False
 
+    @property
+    @ConfigRoot.setting(
+        _(
+            "If True, record the timings, SQL statement counts, and more,"
+            " of each store manager call (see store.instrument)."
+        ),
+    )
+    def instrument(self):
+        return False
+
     @property
     @ConfigRoot.setting(
         _(
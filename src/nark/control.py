@@ -76,11 +76,31 @@ class NarkControl(object):
 
         self.lib_logger = self._get_logger()
         # Profiling: _get_store(): Observed: ~ 0.136 to 0.240 secs.
-        self.store = self._get_store()
+        # - So defer loading the store (and importing the backend, which
+        #   configures the ORM mappers) until the store is first used.
+        self._store = None
         self.sql_logger = self._sql_logger()
 
     # ***
 
+    @property
+    def store(self):
+        """Returns the store, which is created on first access."""
+        if self._store is None:
+            self._store = self._get_store()
+        return self._store
+
+    @store.setter
+    def store(self, store):
+        self._store = store
+
+    @property
+    def store_loaded(self):
+        """Returns True if the store has been created (e.g., was accessed)."""
+        return self._store is not None
+
+    # ***
+
     def standup_store(self):
         created_fresh = self.store.standup()
         return created_fresh
@@ -159,4 +179,11 @@ class NarkControl(object):
         actually wants to use logging needs to setup its required handlers
         itself.
         """
-        return self.store.logger
+        # Use the same logger as the store (see BaseStore.init_logger),
+        # but without loading the store.
+        sql_log_level = self.config["dev.sql_log_level"]
+        sql_logger = logging_helpers.set_logger_level(
+            "nark.store",
+            sql_log_level,
+        )
+        return sql_logger
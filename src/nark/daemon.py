@@ -0,0 +1,352 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""Long-lived nark server, to serve a warm store over a Unix domain socket.
+
+USAGE:
+
+    python -m nark.daemon SOCKET_PATH DB_PATH
+
+Starting a command (importing SQLAlchemy, standing up the store, checking
+its migration version) costs much more than most of the queries a command
+runs. So a client can keep a ``NarkDaemon`` running, which holds one
+``NarkControl`` and its store (and its caches) open, and then send it the
+manager calls it wants to make, using a ``NarkClient``, e.g.::
+
+    client = NarkClient(SOCKET_PATH)
+    facts = client.facts.get_all(since=since)
+
+Each call is one round trip: The client sends a frame (a 4-byte length and
+a pickle) with the manager, method, and arguments, and the daemon replies
+with the result, or with the exception the method raised. (A method that
+returns a generator, e.g., ``iter_gather``, replies with a list.)
+
+Because the frames are pickles, the socket is only accessible to the user
+who started the daemon (much like the database file itself).
+"""
+
+import os
+import pickle
+import queue
+import socket
+import socketserver
+import struct
+import sys
+import threading
+from collections.abc import Iterator
+from gettext import gettext as _
+
+from config_decorator import KeyChainedValue
+
+from .control import NarkControl
+
+__all__ = (
+    "NarkClient",
+    "NarkDaemon",
+    "NarkDaemonError",
+    "RPC_MANAGERS",
+    "main",
+)
+
+# The NarkControl managers that clients may call (any public method).
+RPC_MANAGERS = ("activities", "categories", "tags", "facts")
+
+# The frame header: the length of the pickle that follows.
+FRAME_HEADER = struct.Struct("!I")
+
+
+class NarkDaemonError(Exception):
+    """Raised on a malformed RPC, or if the daemon goes away mid-call."""
+
+    pass
+
+
+# ***
+
+
+def send_frame(sock, obj):
+    send_payload(sock, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def send_payload(sock, payload):
+    sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+def recv_frame(sock):
+    """Return the next unpickled frame, or raise EOFError if the peer closed."""
+    header = recv_exactly(sock, FRAME_HEADER.size)
+    (length,) = FRAME_HEADER.unpack(header)
+    return pickle.loads(recv_exactly(sock, length))
+
+
+def recv_exactly(sock, length):
+    chunks = []
+    while length:
+        chunk = sock.recv(min(length, 65536))
+        if not chunk:
+            raise EOFError
+        chunks.append(chunk)
+        length -= len(chunk)
+    return b"".join(chunks)
+
+
+# ***
+
+
+class NarkDaemon(object):
+    """
+    Serves one NarkControl's managers over a Unix domain socket.
+
+    Each client connection is read on its own thread, but every call is run
+    in turn on the thread that runs ``serve_forever`` (which owns the store
+    and its Session). So the calls are serialized: Only one reads or writes
+    the store at a time, and each sees the changes of the calls before it.
+    """
+
+    def __init__(self, controller, socket_path):
+        self.controller = controller
+        self.socket_path = socket_path
+        # The calls waiting to run, each a (request, reply queue).
+        self.calls = queue.Queue()
+        self.server = None
+        self.listening = threading.Event()
+
+    # ***
+
+    def serve_forever(self):
+        """Listen on the socket, and run the calls as they come, until shutdown."""
+        self.listen()
+        listener = threading.Thread(target=self.server.serve_forever, daemon=True)
+        listener.start()
+        try:
+            while True:
+                call = self.calls.get()
+                if call is None:
+                    break
+                request, replies = call
+                replies.put(self.dispatch(request))
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+            listener.join()
+            self.unlink_socket()
+
+    def shutdown(self):
+        """Stop serving, after the calls already received."""
+        self.calls.put(None)
+
+    def listen(self):
+        daemon = self
+
+        class CallHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                replies = queue.Queue(maxsize=1)
+                while True:
+                    try:
+                        request = recv_frame(self.request)
+                    except (EOFError, ConnectionError):
+                        return
+                    daemon.calls.put((request, replies))
+                    send_payload(self.request, replies.get())
+
+        class CallServer(socketserver.ThreadingUnixStreamServer):
+            daemon_threads = True
+
+        self.unlink_socket()
+        # Create the socket so only this user can connect.
+        umask = os.umask(0o177)
+        try:
+            self.server = CallServer(self.socket_path, CallHandler)
+        finally:
+            os.umask(umask)
+        self.listening.set()
+
+    def unlink_socket(self):
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+    # ***
+
+    def dispatch(self, request):
+        """Run one call, and return its pickled ``(ok, result or exception)`` reply."""
+
+        def _dispatch():
+            ok, result = dispatch_call()
+            try:
+                payload = pickle.dumps((ok, result), protocol=pickle.HIGHEST_PROTOCOL)
+                if not ok:
+                    # Some exceptions pickle, but do not unpickle (e.g., if
+                    # their __init__ takes other args than they pass to super).
+                    pickle.loads(payload)
+                return payload
+            except Exception as err:
+                # E.g., the method returned (or raised) an object that cannot
+                # be pickled. Reply with an error, rather than failing to send.
+                return pickle.dumps(
+                    (False, NarkDaemonError(repr(err))),
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+
+        def dispatch_call():
+            try:
+                target, method_name, args, kwargs = request
+            except (TypeError, ValueError):
+                return False, NarkDaemonError(_("Malformed request."))
+            if target is None:
+                return dispatch_daemon(method_name)
+            method = must_find_method(target, method_name)
+            if method is None:
+                return False, NarkDaemonError(
+                    _("Unknown method: {}.{}").format(target, method_name)
+                )
+            try:
+                # Each call is a unit of work, so the daemon's Session does not
+                # keep everything each call loaded (replies are pickled items,
+                # not Alchemy items, so nothing in the reply is detached). And
+                # the scope rolls back if the call raises, so the next call
+                # does not inherit a failed transaction.
+                with self.controller.store.session_scope():
+                    result = method(*args, **kwargs)
+                    # Run a generator (e.g., from iter_gather) within the scope,
+                    # and reply with its items (a generator cannot be pickled).
+                    if isinstance(result, Iterator):
+                        result = list(result)
+                    return True, result
+            except Exception as err:
+                return False, err
+
+        def dispatch_daemon(method_name):
+            if method_name == "ping":
+                return True, os.getpid()
+            if method_name == "shutdown":
+                self.shutdown()
+                return True, None
+            return False, NarkDaemonError(
+                _("Unknown daemon method: {}").format(method_name)
+            )
+
+        def must_find_method(target, method_name):
+            if target not in RPC_MANAGERS or method_name.startswith("_"):
+                return None
+            manager = getattr(self.controller, target)
+            method = getattr(manager, method_name, None)
+            if not callable(method):
+                return None
+            return method
+
+        return _dispatch()
+
+
+# ***
+
+
+class NarkClient(object):
+    """
+    Calls a NarkDaemon's managers, e.g., ``client.facts.get(pk)``.
+
+    The client keeps its connection open, so each call is one round trip.
+    """
+
+    def __init__(self, socket_path, timeout=None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.sock = None
+        self.activities = ManagerProxy(self, "activities")
+        self.categories = ManagerProxy(self, "categories")
+        self.tags = ManagerProxy(self, "tags")
+        self.facts = ManagerProxy(self, "facts")
+
+    def connect(self):
+        if self.sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self.sock = sock
+        return self.sock
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # ***
+
+    def call(self, target, method_name, *args, **kwargs):
+        """Run ``target.method_name(*args, **kwargs)`` in the daemon, and return it."""
+        sock = self.connect()
+        try:
+            send_frame(sock, (target, method_name, args, kwargs))
+            ok, result = recv_frame(sock)
+        except (EOFError, ConnectionError):
+            self.close()
+            raise NarkDaemonError(_("The nark daemon closed the connection."))
+        if not ok:
+            raise result
+        return result
+
+    def ping(self):
+        """Return the daemon's process ID."""
+        return self.call(None, "ping")
+
+    def shutdown(self):
+        """Ask the daemon to stop serving."""
+        self.call(None, "shutdown")
+        self.close()
+
+
+class ManagerProxy(object):
+    def __init__(self, client, target):
+        self.client = client
+        self.target = target
+
+    def __getattr__(self, method_name):
+        if method_name.startswith("_"):
+            raise AttributeError(method_name)
+        return lambda *args, **kwargs: self.client.call(
+            self.target, method_name, *args, **kwargs
+        )
+
+
+# ***
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        # T001 print found.
+        print(_("USAGE: python -m nark.daemon SOCKET_PATH DB_PATH"))  # noqa: T001
+        return 1
+    socket_path, db_path = argv
+    # Avoid config_decorator's warning (a client normally sets its own prefix).
+    KeyChainedValue._envvar_prefix = "NARK_"
+    controller = NarkControl({"db": {"engine": "sqlite", "path": db_path}})
+    controller.standup_store()
+    NarkDaemon(controller, socket_path).serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
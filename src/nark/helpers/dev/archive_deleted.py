@@ -0,0 +1,126 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""Archive benchmark, timing the live queries before and after archiving.
+
+USAGE:
+
+    python -m nark.helpers.dev.archive_deleted [facts] [edits] [runs]
+
+Makes a new database file with ``facts`` live Facts, each edited ``edits``
+times (so each leaves that many deleted Facts behind, as FactManager._update
+does), and then times the queries that only read live Facts, each run
+``runs`` times: first with the deleted Facts in the facts table, and then
+after FactManager.archive moves them to facts_archive. It also times the
+queries that read the deleted Facts, which read the archive afterwards.
+
+The gathers only count their Facts, so that hydrating the Facts (which is
+the same before and after) does not swamp the query times.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from .benchmark import SINCE, benchmark_setup, fill_database
+
+__all__ = ("QUERIES", "measure_queries", "main")
+
+WEEK = SINCE + timedelta(days=7)
+
+# Each Fact (and each of its edits) spans the same 5 of every 10 minutes.
+MIDDLE = SINCE + timedelta(days=180, minutes=1)
+
+
+def check_overlap(store):
+    from ...items.fact import Fact
+
+    fact = Fact(activity=None, start=MIDDLE, end=MIDDLE + timedelta(minutes=2))
+    return store.facts._timeframe_available_for_fact(fact)
+
+
+QUERIES = (
+    ("overlap check", check_overlap),
+    ("antecedent", lambda store: store.facts.antecedent(ref_time=MIDDLE)),
+    (
+        "gather, week",
+        lambda store: store.facts.get_all(since=SINCE, until=WEEK, count_results=True),
+    ),
+    (
+        "gather deleted, week",
+        lambda store: store.facts.get_all(
+            deleted=True, since=SINCE, until=WEEK, count_results=True
+        ),
+    ),
+)
+
+
+def measure_queries(store, runs):
+    """Return the seconds spent running each query ``runs`` times."""
+    results = []
+    for name, query in QUERIES:
+        started = time.perf_counter()
+        for _ in range(runs):
+            query(store)
+        results.append((name, time.perf_counter() - started))
+    return results
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    n_facts = int(argv[0]) if argv else 20000
+    n_edits = int(argv[1]) if len(argv) > 1 else 2
+    runs = int(argv[2]) if len(argv) > 2 else 20
+    benchmark_setup()
+
+    # Import on demand, so the backend is only loaded when run.
+    from ...backends.sqlalchemy.storage import SQLAlchemyStore
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "archive_deleted.sqlite")
+        store = SQLAlchemyStore({"db": {"engine": "sqlite", "path": db_path}})
+        store.standup()
+        try:
+            fill_database(store, n_facts, n_edits)
+            before = measure_queries(store, runs)
+            started = time.perf_counter()
+            n_archived = store.facts.archive()
+            archive_secs = time.perf_counter() - started
+            after = measure_queries(store, runs)
+        finally:
+            store.cleanup()
+
+    # T001 print found.
+    print(  # noqa: T001
+        "Archived {} deleted Facts (of {} live Facts) in {:.3f} secs.".format(
+            n_archived, n_facts, archive_secs
+        )
+    )
+    print("Secs. to run each query {} times:".format(runs))  # noqa: T001
+    for (name, before_secs), (_name, after_secs) in zip(before, after):
+        print(  # noqa: T001
+            "  {0:<20} before {1:>7.3f}  after {2:>7.3f}".format(
+                name, before_secs, after_secs
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""Setup shared by the benchmarks (see ``Makefile.project``'s profile-* targets)."""
+
+from datetime import datetime, timedelta
+
+from config_decorator import KeyChainedValue
+
+__all__ = ("SINCE", "TAGS_PER_FACT", "benchmark_setup", "fill_database")
+
+TAGS_PER_FACT = 4
+
+SINCE = datetime(2020, 1, 1)
+
+
+def benchmark_setup():
+    """Prepare to run a benchmark, as a client would prepare to run nark."""
+    # Avoid config_decorator's warning (a client normally sets its own prefix).
+    KeyChainedValue._envvar_prefix = "NARK_"
+
+
+def fill_database(store, n_facts, n_edits=0):
+    """
+    Insert ``n_facts`` Facts, and their Activities, Category, and Tags.
+
+    Each Fact starts 10 minutes after the one before (from SINCE), lasts 5
+    minutes, and has TAGS_PER_FACT Tags (of 50), and one of 20 Activities.
+    Each Fact is also edited ``n_edits`` times, leaving that many deleted
+    Facts behind (as FactManager._update does), each split from the one
+    before, with the live Fact last. The rows are inserted directly, which
+    is much faster than saving the Facts, so the rollups are not updated.
+    """
+    with store.engine.begin() as conn:
+        conn.execute("INSERT INTO categories (id, name) VALUES (1, 'category')")
+        conn.execute(
+            "INSERT INTO activities (id, name, category_id, deleted, hidden)"
+            " VALUES (?, ?, 1, 0, 0)",
+            [(idx + 1, "activity-{}".format(idx)) for idx in range(20)],
+        )
+        conn.execute(
+            "INSERT INTO tags (id, name, deleted, hidden) VALUES (?, ?, 0, 0)",
+            [(idx + 1, "tag-{}".format(idx)) for idx in range(50)],
+        )
+        rows = []
+        links = []
+        pk = 0
+        for idx in range(n_facts):
+            start = SINCE + timedelta(minutes=10 * idx)
+            split_from = None
+            for edit in range(n_edits + 1):
+                pk += 1
+                rows.append(
+                    (
+                        pk,
+                        split_from,
+                        int(edit < n_edits),
+                        (idx % 20) + 1,
+                        start.strftime("%Y-%m-%d %H:%M:%S"),
+                        (start + timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S"),
+                        "fact {} edit {}".format(idx, edit),
+                    )
+                )
+                links.extend(
+                    (pk, ((idx + offset * 13) % 50) + 1)
+                    for offset in range(TAGS_PER_FACT)
+                )
+                split_from = pk
+        conn.execute(
+            "INSERT INTO facts"
+            " (id, split_from_id, deleted, activity_id,"
+            " start_time, end_time, description)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.execute("INSERT INTO fact_tags (fact_id, tag_id) VALUES (?, ?)", links)
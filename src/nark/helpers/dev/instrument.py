@@ -0,0 +1,335 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""Runtime instrumentation of the store's manager methods."""
+
+import json
+import time
+from contextlib import contextmanager
+from functools import wraps
+from types import GeneratorType
+
+__all__ = (
+    "CallStats",
+    "INSTRUMENTED_MANAGERS",
+    "INSTRUMENTED_METHODS",
+    "INSTRUMENTED_STORE_METHODS",
+    "Instrumentation",
+    "instrument_hydrate",
+)
+
+# The store attributes of the managers whose methods are instrumented.
+INSTRUMENTED_MANAGERS = ("activities", "categories", "tags", "facts")
+
+# The manager methods that are instrumented (if the manager has them).
+INSTRUMENTED_METHODS = (
+    "save",
+    "add_many",
+    "get_or_create",
+    "remove",
+    "get",
+    "get_by_name",
+    "get_by_composite",
+    "get_all",
+    "get_all_by_usage",
+    "gather",
+    "iter_gather",
+    "gather_columns",
+    "rollup_days",
+    "get_current_fact",
+    "find_latest_fact",
+    "find_oldest_fact",
+    "stop_current_fact",
+    "cancel_current_fact",
+    "starting_at",
+    "ending_at",
+    "antecedent",
+    "subsequent",
+    "strictly_during",
+    "surrounding",
+    "endless",
+    "window",
+    "history",
+    "histories",
+    "archive",
+)
+
+# The store methods that are instrumented (if the store has them).
+INSTRUMENTED_STORE_METHODS = ("changes_since",)
+
+
+class CallStats(object):
+    """The accumulated measurements of one instrumented method."""
+
+    __slots__ = (
+        "calls",
+        "seconds",
+        "max_seconds",
+        "statements",
+        "sql_seconds",
+        "rows",
+        "hydrate_seconds",
+    )
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.hydrate_seconds = 0.0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Instrumentation(object):
+    """
+    Records per-call timings, SQL statement counts, rows, and hydration time.
+
+    Each store has an Instrumentation, ``store.instrument``, which is disabled
+    until you call ``enable()`` (or set ``dev.instrument``). Enabling it wraps
+    the INSTRUMENTED_METHODS of each manager instance, so a disabled
+    Instrumentation costs nothing. Each measured method records:
+
+    - ``calls``, ``seconds``, and ``max_seconds``: The number of calls, and
+      their total and longest elapsed time.
+
+    - ``statements`` and ``sql_seconds``: The number of SQL statements
+      executed, and the time spent executing them (not counting fetching).
+
+    - ``rows``: The number of results returned, e.g., a list's length (but
+      not a count, e.g., from ``count_results``, which is 0 rows).
+
+    - ``hydrate_seconds``: The time spent making ``nark`` items from the
+      Alchemy items (``as_hamster``).
+
+    The measurements are inclusive: When one method calls another (e.g.,
+    ``facts.save`` calls ``activities.get_or_create``), each one counts
+    what happens during its own call.
+
+    A method that returns a generator (e.g., ``facts.iter_gather``) is also
+    measured while the generator runs, and its call is recorded once the
+    generator is exhausted (or closed).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.enabled = False
+        self.calls = {}
+        # The CallStats of each instrumented method currently running.
+        self._frames = []
+        self._hydrating = False
+        self._engine = None
+        self._statement_started = None
+
+    # ***
+
+    def enable(self):
+        """Start measuring the store's manager methods."""
+        if self.enabled:
+            return
+        for name, target, method_names in self.instrumented_targets():
+            for method_name in method_names:
+                method = getattr(target, method_name, None)
+                if method is None:
+                    continue
+                method_path = "{}.{}".format(name, method_name)
+                setattr(target, method_name, self.wrap(method_path, method))
+        self.enabled = True
+
+    def disable(self):
+        """Stop measuring, but keep what was measured (see ``reset``)."""
+        if not self.enabled:
+            return
+        for _name, target, method_names in self.instrumented_targets():
+            for method_name in method_names:
+                # Remove the instance attribute, which shadows the method.
+                target.__dict__.pop(method_name, None)
+        self.unwatch_engine()
+        self.enabled = False
+
+    def instrumented_targets(self):
+        yield "store", self.store, INSTRUMENTED_STORE_METHODS
+        for manager_name in INSTRUMENTED_MANAGERS:
+            manager = getattr(self.store, manager_name, None)
+            if manager is not None:
+                yield manager_name, manager, INSTRUMENTED_METHODS
+
+    def reset(self):
+        """Forget all measurements."""
+        self.calls = {}
+
+    # ***
+
+    def wrap(self, name, method):
+        @wraps(method)
+        def instrumented(*args, **kwargs):
+            stats = CallStats()
+            try:
+                with self.measuring(stats):
+                    result = method(*args, **kwargs)
+            except Exception:
+                self.record(name, stats)
+                raise
+            if isinstance(result, GeneratorType):
+                return self.measure_generator(name, stats, result)
+            stats.rows += count_rows(result)
+            self.record(name, stats)
+            return result
+
+        def count_rows(result):
+            if result is None:
+                return 0
+            if isinstance(result, (list, tuple, set)):
+                return len(result)
+            # E.g., a count_results count, which is not a row.
+            if isinstance(result, int):
+                return 0
+            return 1
+
+        return instrumented
+
+    def measure_generator(self, name, stats, generator):
+        """Measure each item the generator makes, and record the call after."""
+        try:
+            while True:
+                with self.measuring(stats):
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        return
+                stats.rows += 1
+                yield item
+        finally:
+            generator.close()
+            self.record(name, stats)
+
+    @contextmanager
+    def measure(self, name):
+        """Measure the enclosed block, and add it to the named CallStats."""
+        stats = CallStats()
+        try:
+            with self.measuring(stats):
+                yield stats
+        finally:
+            self.record(name, stats)
+
+    @contextmanager
+    def measuring(self, stats):
+        """Measure the enclosed block, and add it to the (one call's) stats."""
+        self.watch_engine()
+        self._frames.append(stats)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats.seconds += time.perf_counter() - started
+            self._frames.pop()
+
+    def record(self, name, stats):
+        """Add one call's stats to the named CallStats."""
+        total = self.calls.setdefault(name, CallStats())
+        total.calls += 1
+        total.seconds += stats.seconds
+        total.max_seconds = max(total.max_seconds, stats.seconds)
+        total.statements += stats.statements
+        total.sql_seconds += stats.sql_seconds
+        total.rows += stats.rows
+        total.hydrate_seconds += stats.hydrate_seconds
+
+    @contextmanager
+    def hydrating(self):
+        """Measure the enclosed (outermost) hydration."""
+        if self._hydrating or not self._frames:
+            yield
+            return
+        self._hydrating = True
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._hydrating = False
+            elapsed = time.perf_counter() - started
+            for stats in self._frames:
+                stats.hydrate_seconds += elapsed
+
+    # ***
+
+    def watch_engine(self):
+        """Count the SQL statements the store's engine executes, once it has one."""
+        if self._engine is not None:
+            return
+        session = getattr(self.store, "session", None)
+        if session is None:
+            return
+        # Import on demand, so nark's startup does not load SQLAlchemy.
+        from sqlalchemy import event
+
+        self._engine = session.get_bind()
+        event.listen(self._engine, "before_cursor_execute", self.statement_started)
+        event.listen(self._engine, "after_cursor_execute", self.statement_executed)
+
+    def unwatch_engine(self):
+        if self._engine is None:
+            return
+        from sqlalchemy import event
+
+        event.remove(self._engine, "before_cursor_execute", self.statement_started)
+        event.remove(self._engine, "after_cursor_execute", self.statement_executed)
+        self._engine = None
+
+    def statement_started(self, *args, **kwargs):
+        self._statement_started = time.perf_counter()
+
+    def statement_executed(self, *args, **kwargs):
+        if self._statement_started is None:
+            return
+        elapsed = time.perf_counter() - self._statement_started
+        self._statement_started = None
+        for stats in self._frames:
+            stats.statements += 1
+            stats.sql_seconds += elapsed
+
+    # ***
+
+    def stats(self):
+        """Return the measurements, as a dict of method name → dict of stats."""
+        return {name: stats.as_dict() for name, stats in sorted(self.calls.items())}
+
+    def to_json(self, **kwargs):
+        """Return the measurements as JSON (see ``stats``)."""
+        return json.dumps(self.stats(), **kwargs)
+
+
+# ***
+
+
+def instrument_hydrate(as_hamster):
+    """Decorates an Alchemy item's ``as_hamster(store)`` to measure hydration."""
+
+    @wraps(as_hamster)
+    def _as_hamster(self, store, *args, **kwargs):
+        instrument = getattr(store, "instrument", None)
+        if not isinstance(instrument, Instrumentation) or not instrument.enabled:
+            return as_hamster(self, store, *args, **kwargs)
+        with instrument.hydrating():
+            return as_hamster(self, store, *args, **kwargs)
+
+    return _as_hamster
@@ -0,0 +1,133 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""Join keys benchmark, timing usage reports with and without migration 005.
+
+USAGE:
+
+    python -m nark.helpers.dev.join_keys [links] [gathers]
+
+Makes a new database file with ``links`` Fact-Tag links (4 Tags per Fact),
+and then times the usage reports that join through fact_tags, each run
+``gathers`` times: first as migration 004 left the schema (no key on
+fact_tags, and no foreign key indexes), and then after migration 005.
+
+The reports are bounded by time, so the rollups cannot answer them, and
+one spans just a week, so its cost is mostly the joins.
+"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from .benchmark import SINCE, TAGS_PER_FACT, benchmark_setup, fill_database
+
+__all__ = ("REPORTS", "measure_reports", "main")
+
+UNTIL = SINCE + timedelta(days=3650)
+
+WEEK = SINCE + timedelta(days=7)
+
+REPORTS = (
+    (
+        "tags usage",
+        lambda store: store.tags.get_all_by_usage(since=SINCE, until=UNTIL),
+    ),
+    (
+        "tags usage, week",
+        lambda store: store.tags.get_all_by_usage(since=SINCE, until=WEEK),
+    ),
+    (
+        "activities usage",
+        lambda store: store.activities.get_all_by_usage(since=SINCE, until=UNTIL),
+    ),
+    (
+        "tagged facts",
+        lambda store: store.facts.get_all(
+            match_tags=["tag-7"], since=SINCE, until=UNTIL
+        ),
+    ),
+)
+
+
+def migration_005():
+    # The module name starts with a digit, so load it by path.
+    from ... import migrations
+
+    path = os.path.join(
+        os.path.dirname(migrations.__file__), "versions", "005_Index_join_keys.py"
+    )
+    spec = importlib.util.spec_from_file_location("migration_005", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure_reports(store, gathers):
+    """Return the seconds spent running each report ``gathers`` times."""
+    results = []
+    for name, report in REPORTS:
+        started = time.perf_counter()
+        for _ in range(gathers):
+            report(store)
+        results.append((name, time.perf_counter() - started))
+    return results
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    links = int(argv[0]) if argv else 500000
+    gathers = int(argv[1]) if len(argv) > 1 else 5
+    benchmark_setup()
+
+    # Import on demand, so the backend is only loaded when run.
+    from ...backends.sqlalchemy.storage import SQLAlchemyStore
+
+    migration = migration_005()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "join_keys.sqlite")
+        store = SQLAlchemyStore({"db": {"engine": "sqlite", "path": db_path}})
+        store.standup()
+        try:
+            fill_database(store, links // TAGS_PER_FACT)
+            store.facts.rebuild_rollups()
+            # Put the schema back the way migration 004 left it.
+            migration.downgrade(store.engine)
+            before = measure_reports(store, gathers)
+            migration.upgrade(store.engine)
+            after = measure_reports(store, gathers)
+        finally:
+            store.cleanup()
+
+    # T001 print found.
+    print(  # noqa: T001
+        "Secs. to run each report {} times, with {} tag links:".format(gathers, links)
+    )
+    for (name, before_secs), (_name, after_secs) in zip(before, after):
+        print(  # noqa: T001
+            "  {0:<17} before {1:>7.3f}  after {2:>7.3f}".format(
+                name, before_secs, after_secs
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
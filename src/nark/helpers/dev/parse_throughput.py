@@ -0,0 +1,97 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""Parsing throughput benchmark, for friendly (human) datetimes, as when importing.
+
+USAGE:
+
+    python -m nark.helpers.dev.parse_throughput [count]
+
+Parses ``count`` friendly datetimes (drawn from a small set, as an import
+file would repeat them), first making a new parser for each one (as nark
+used to), then using the parser pool, and then using the memo, too.
+"""
+
+import sys
+import time
+from datetime import datetime
+
+from ..parse_time import (
+    parse_datetime_get_parser,
+    parse_datetime_get_settings,
+    parse_datetime_human,
+    parse_datetime_human_memo,
+)
+
+__all__ = ("DATEPARTS", "measure", "main")
+
+DATEPARTS = (
+    "yesterday 9am",
+    "today 14:30",
+    "2 hours ago",
+    "last monday",
+    "3 days ago 10:15",
+    "January 5th",
+    "Friday noon",
+    "tomorrow 8am",
+)
+
+
+def parse_unpooled(datepart, time_now):
+    # What parse_datetime_human did before the parser pool and memo.
+    import dateparser
+
+    settings = parse_datetime_get_settings(time_now)
+    return dateparser.DateDataParser(settings=settings).get_date_data(datepart)
+
+
+def parse_pooled(datepart, time_now):
+    return parse_datetime_get_parser(time_now, None).get_date_data(datepart)
+
+
+def measure(parse, count, time_now):
+    """Return the number of datetimes parsed per second."""
+    started = time.perf_counter()
+    for idx in range(count):
+        parse(DATEPARTS[idx % len(DATEPARTS)], time_now)
+    return count / (time.perf_counter() - started)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    count = int(argv[0]) if argv else 2000
+    time_now = datetime.now().replace(microsecond=0)
+
+    # Load dateparser and its data before timing anything.
+    parse_unpooled(DATEPARTS[0], time_now)
+
+    parse_datetime_human_memo.cache_clear()
+    results = (
+        ("unpooled", measure(parse_unpooled, count, time_now)),
+        ("pooled", measure(parse_pooled, count, time_now)),
+        ("memoized", measure(parse_datetime_human, count, time_now)),
+    )
+
+    # T001 print found.
+    print("Friendly datetimes parsed per second ({} each):".format(count))  # noqa: T001
+    for name, per_sec in results:
+        print("  {0:<9} {1:>10.1f}".format(name, per_sec))  # noqa: T001
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""Save batching benchmark, comparing saves one at a time versus in a transaction.
+
+USAGE:
+
+    python -m nark.helpers.dev.save_batching [facts]
+
+For each mode, makes a new database file, saves ``facts`` new Facts, and
+then saves an edit to each one (which splits it into a new Fact). In the
+single mode, each save commits, and each commit syncs the database file.
+In the batched mode, the saves run in one ``store.transaction()``, each
+in its own ``store.savepoint()`` (as a script would, to skip a bad edit).
+"""
+
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from .benchmark import benchmark_setup
+
+__all__ = ("measure_saves", "main")
+
+
+@contextmanager
+def nothing():
+    yield
+
+
+def measure_saves(db_path, facts, batched):
+    """Return the seconds spent adding, and editing, the Facts."""
+    # Import on demand, so the backend is only loaded when run.
+    from ...backends.sqlalchemy.storage import SQLAlchemyStore
+    from ...items.activity import Activity
+    from ...items.category import Category
+    from ...items.fact import Fact
+
+    store = SQLAlchemyStore({"db": {"engine": "sqlite", "path": db_path}})
+    store.standup()
+    transaction = store.transaction if batched else nothing
+    savepoint = store.savepoint if batched else nothing
+    try:
+        activity = Activity("activity", category=Category("category"))
+        since = datetime(2020, 1, 1)
+        started = time.perf_counter()
+        saved = []
+        with transaction():
+            for idx in range(facts):
+                start = since + timedelta(minutes=10 * idx)
+                with savepoint():
+                    saved.append(
+                        store.facts.save(
+                            Fact(
+                                activity=activity,
+                                start=start,
+                                end=start + timedelta(minutes=5),
+                                description="fact {}".format(idx),
+                            )
+                        )
+                    )
+        added = time.perf_counter()
+        with transaction():
+            for fact in saved:
+                fact.description += " (edited)"
+                with savepoint():
+                    store.facts.save(fact)
+        edited = time.perf_counter()
+    finally:
+        store.cleanup()
+    return added - started, edited - added
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    facts = int(argv[0]) if argv else 1000
+    benchmark_setup()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for batched in (False, True):
+            db_path = os.path.join(tmpdir, "batched-{}.sqlite".format(batched))
+            results.append((batched, measure_saves(db_path, facts, batched)))
+
+    # T001 print found.
+    print("Saves per second, adding and editing {} Facts:".format(facts))  # noqa: T001
+    for batched, (add_secs, edit_secs) in results:
+        print(  # noqa: T001
+            "  {0:<8} add {1:>8.1f}/s  edit {2:>8.1f}/s".format(
+                "batched" if batched else "single",
+                facts / add_secs,
+                facts / edit_secs,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
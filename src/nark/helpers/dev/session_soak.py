@@ -0,0 +1,109 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""Session soak benchmark, checking that hydrating Facts does not grow memory.
+
+USAGE:
+
+    python -m nark.helpers.dev.session_soak [facts] [rounds]
+
+Makes a new database file with ``facts`` Facts, and then, ``rounds`` times,
+streams all the Facts (hydrated), gathers them all raw, and gets each 100th
+Fact by PK, each round in a ``store.session_scope()``. Reports the memory
+allocated (per tracemalloc) after each round, and fails if the last round
+ends with more than 10% (or 1 MiB) more allocated than the first.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from ...managers.query_terms import QueryTerms
+from .benchmark import benchmark_setup, fill_database
+
+__all__ = ("soak_round", "main")
+
+CHUNK_SIZE = 1000
+
+
+def soak_round(store, facts):
+    """Hydrate every Fact, and then some, and return how many were hydrated."""
+    hydrated = 0
+    with store.session_scope():
+        stream = store.facts.iter_gather(QueryTerms(), chunk_size=CHUNK_SIZE)
+        for _fact in stream:
+            hydrated += 1
+        hydrated += len(store.facts.get_all(raw=True))
+        for pk in range(1, facts + 1, 100):
+            store.facts.get(pk)
+            hydrated += 1
+    return hydrated
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    facts = int(argv[0]) if argv else 20000
+    rounds = int(argv[1]) if len(argv) > 1 else 10
+    benchmark_setup()
+
+    # Import on demand, so the backend is only loaded when run.
+    from ...backends.sqlalchemy.storage import SQLAlchemyStore
+
+    allocated = []
+    hydrated = 0
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "session_soak.sqlite")
+        store = SQLAlchemyStore({"db": {"engine": "sqlite", "path": db_path}})
+        store.standup()
+        try:
+            fill_database(store, facts)
+            store.facts.rebuild_rollups()
+            started = time.perf_counter()
+            tracemalloc.start()
+            for idx in range(rounds):
+                hydrated += soak_round(store, facts)
+                allocated.append(tracemalloc.get_traced_memory()[0])
+                # T001 print found.
+                print(  # noqa: T001
+                    "  round {0:>3}  {1:>9} hydrated  {2:>8.1f} KiB"
+                    "  ({3} in Session)".format(
+                        idx + 1,
+                        hydrated,
+                        allocated[-1] / 1024,
+                        len(store.session.identity_map),
+                    )
+                )
+            tracemalloc.stop()
+            elapsed = time.perf_counter() - started
+        finally:
+            store.cleanup()
+
+    growth = allocated[-1] - allocated[0]
+    print(  # noqa: T001
+        "Hydrated {} Facts in {:.1f} secs.; memory grew {:.1f} KiB.".format(
+            hydrated, elapsed, growth / 1024
+        )
+    )
+    if growth > max(allocated[0] * 0.1, 1024 * 1024):
+        sys.exit("Memory is not flat!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""SQLite preset benchmark, comparing the db.sqlite.preset choices.
+
+USAGE:
+
+    python -m nark.helpers.dev.sqlite_presets [facts] [gathers]
+
+For each preset (and for SQLite's defaults), makes a new database file,
+saves ``facts`` Facts one at a time (each save commits, as when using
+dob), and then gathers all the Facts, and the Activities by usage, each
+``gathers`` times.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from ...config import SQLITE_PRESETS
+from .benchmark import benchmark_setup
+
+__all__ = ("PRESETS", "measure_preset", "main")
+
+PRESETS = ("",) + tuple(SQLITE_PRESETS)
+
+
+def measure_preset(preset, db_path, facts, gathers):
+    """Return the seconds spent saving, and gathering, using the preset."""
+    # Import on demand, so the backend is only loaded when run.
+    from ...backends.sqlalchemy.storage import SQLAlchemyStore
+    from ...items.activity import Activity
+    from ...items.category import Category
+    from ...items.fact import Fact
+
+    config = {
+        "db": {"engine": "sqlite", "path": db_path, "sqlite": {"preset": preset}},
+    }
+    store = SQLAlchemyStore(config)
+    store.standup()
+    try:
+        activities = [
+            Activity("activity-{}".format(idx), category=Category("category"))
+            for idx in range(10)
+        ]
+        started = time.perf_counter()
+        since = datetime(2020, 1, 1)
+        for idx in range(facts):
+            start = since + timedelta(minutes=10 * idx)
+            store.facts.save(
+                Fact(
+                    activity=activities[idx % len(activities)],
+                    start=start,
+                    end=start + timedelta(minutes=5),
+                    description="fact {}".format(idx),
+                )
+            )
+        saved = time.perf_counter()
+        for _ in range(gathers):
+            store.facts.get_all()
+            store.activities.get_all_by_usage()
+        gathered = time.perf_counter()
+    finally:
+        store.cleanup()
+    return saved - started, gathered - saved
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    facts = int(argv[0]) if argv else 500
+    gathers = int(argv[1]) if len(argv) > 1 else 20
+    benchmark_setup()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for preset in PRESETS:
+            db_path = os.path.join(tmpdir, "{}.sqlite".format(preset or "default"))
+            results.append((preset, measure_preset(preset, db_path, facts, gathers)))
+
+    # T001 print found.
+    print(  # noqa: T001
+        "Secs. to save {} Facts, and to gather {} times:".format(facts, gathers)
+    )
+    for preset, (save_secs, gather_secs) in results:
+        print(  # noqa: T001
+            "  {0:<11} save {1:>7.3f}  gather {2:>7.3f}".format(
+                preset or "(default)", save_secs, gather_secs
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
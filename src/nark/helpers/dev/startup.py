@@ -0,0 +1,100 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""Startup benchmark, to track the cost of loading nark, its store, and its DB.
+
+USAGE:
+
+    python -m nark.helpers.dev.startup [runs]
+
+Each run is a fresh Python process (so imports are not cached), which
+times each stage of a simple command, from importing nark to running
+its first query. Each process also enables ``__PROFILING__`` (via
+``NARK_PROFILING``), so the ``timefunc`` timings are reported, too.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+__all__ = ("STAGES", "run_startup", "main")
+
+STAGES = ("import", "control", "store", "standup", "query")
+
+# The script that each run executes. It prints a JSON line of stage
+# timings, and then the profiling hooks print their report at exit.
+STARTUP_SCRIPT = """
+import json, sys, time
+time_0 = time.time()
+timings = {}
+def checkpoint(stage):
+    timings[stage] = time.time() - time_0
+from config_decorator import KeyChainedValue
+from nark.control import NarkControl
+from nark.helpers.dev import profiling
+KeyChainedValue._envvar_prefix = "NARK_"
+checkpoint("import")
+controller = NarkControl({"db": {"engine": "sqlite", "path": sys.argv[1]}})
+checkpoint("control")
+controller.store
+checkpoint("store")
+controller.standup_store()
+checkpoint("standup")
+controller.facts.endless()
+checkpoint("query")
+print(json.dumps({"timings": timings, "funcs": profiling.MSGS_FUNC}))
+sys.stdout.flush()
+"""
+
+
+def run_startup(db_path):
+    """Run the startup script once, in a new process, and return its report."""
+    env = dict(os.environ, NARK_PROFILING="1")
+    output = subprocess.check_output(
+        [sys.executable, "-c", STARTUP_SCRIPT, db_path],
+        env=env,
+        universal_newlines=True,
+    )
+    return json.loads(output.splitlines()[0])
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    runs = int(argv[0]) if argv else 5
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "startup.sqlite")
+        # Create the database first, so each run finds it already created.
+        run_startup(db_path)
+        reports = [run_startup(db_path) for _ in range(runs)]
+
+    # T001 print found.
+    print("Startup, cumulative secs. (median of {} runs):".format(runs))  # noqa: T001
+    for stage in STAGES:
+        elapsed = statistics.median(report["timings"][stage] for report in reports)
+        print("  {0:<8} {1:.3f}".format(stage, elapsed))  # noqa: T001
+    print("Profiled functions (last run):")  # noqa: T001
+    for msg in reports[-1]["funcs"]:
+        print("  {}".format(msg))  # noqa: T001
+
+
+if __name__ == "__main__":
+    main()
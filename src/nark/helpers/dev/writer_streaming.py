@@ -0,0 +1,130 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""Report writer benchmark, comparing the streaming writers against buffering.
+
+USAGE:
+
+    python -m nark.helpers.dev.writer_streaming [facts]
+
+Writes ``facts`` Facts using the JSON writer, buffered (all the results in
+one list, and then dumped, as JSONWriter used to) and streaming, and using
+the XML writer, with the DOM and streaming. Each write is timed, and then
+run again with tracemalloc, to measure its peak memory. (The unit tests only
+check the memory, because the timings vary too much on a busy machine.)
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from .benchmark import benchmark_setup
+
+__all__ = ("make_facts", "measure_write", "main")
+
+
+def make_facts(count):
+    """Yield ``count`` new Facts, each made as it's requested."""
+    from ...items.activity import Activity
+    from ...items.category import Category
+    from ...items.fact import Fact
+
+    activity = Activity("activity", category=Category("category"))
+    since = datetime(2020, 1, 1)
+    for idx in range(count):
+        start = since + timedelta(hours=4 * idx)
+        yield Fact(
+            activity=activity,
+            start=start,
+            end=start + timedelta(hours=2),
+            description="fact {}".format(idx),
+            tags=["tag-a", "tag-b"],
+        )
+
+
+def measure_write(write, path, count):
+    """Return the seconds, and then the peak bytes, that writing takes."""
+    started = time.perf_counter()
+    write(path, make_facts(count))
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    try:
+        write(path, make_facts(count))
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(argv=None):
+    # Import on demand, so the writers are only loaded when run.
+    from ...reports.json_writer import JSONWriter
+    from ...reports.xml_writer import XMLWriter
+
+    argv = sys.argv[1:] if argv is None else argv
+    count = int(argv[0]) if argv else 10000
+    benchmark_setup()
+
+    def json_buffered(path, facts):
+        json_writer = JSONWriter()
+        json_writer.output_setup(path)
+        results = [json_writer.fact_as_dict(fact) for fact in facts]
+        json.dump(results, json_writer.output_file)
+        json_writer._close()
+
+    def json_streaming(path, facts):
+        json_writer = JSONWriter()
+        json_writer.output_setup(path)
+        json_writer.write_facts(facts)
+
+    def xml_writer(streaming):
+        def write(path, facts):
+            xml_writer = XMLWriter(streaming=streaming)
+            xml_writer.output_setup(path)
+            xml_writer.write_facts(facts)
+
+        return write
+
+    writers = (
+        ("json", "buffered", json_buffered),
+        ("json", "streaming", json_streaming),
+        ("xml", "dom", xml_writer(streaming=False)),
+        ("xml", "streaming", xml_writer(streaming=True)),
+    )
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for output_format, mode, write in writers:
+            path = os.path.join(tmpdir, "facts.{}".format(output_format))
+            results.append((output_format, mode, measure_write(write, path, count)))
+
+    # T001 print found.
+    print("Writing {} Facts:".format(count))  # noqa: T001
+    for output_format, mode, (elapsed, peak) in results:
+        print(  # noqa: T001
+            "  {0:<4} {1:<9} {2:>8.1f} Facts/s  peak {3:>8.1f} KiB".format(
+                output_format, mode, count / elapsed, peak / 1024
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
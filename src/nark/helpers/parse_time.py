@@ -20,7 +20,9 @@
 """This module provides nark raw fact parsing-related functions."""
 
 import re
+import time
 from datetime import timedelta
+from functools import lru_cache
 from gettext import gettext as _
 from string import punctuation
 
@@ -381,6 +383,27 @@ def parse_datetime_get_settings(time_now=None, local_tz=None):
     return settings
 
 
+# The most DateDataParser instances to keep, one per (time_now, local_tz).
+PARSER_POOL_SIZE = 32
+
+# The most parsed (datepart, time_now, local_tz) results to remember.
+PARSED_MEMO_SIZE = 4096
+
+
+@lru_cache(maxsize=PARSER_POOL_SIZE)
+def parse_datetime_get_parser(time_now=None, local_tz=None):
+    """Return a DateDataParser for the given settings, reused for each call."""
+    settings = parse_datetime_get_settings(time_now, local_tz)
+    # Use the parser class, and not the parse() wrapper, which would make
+    # a new parser each call. I.e., avoid calling just this:
+    #   parsed = dateparser.parse(datepart, settings=settings)
+    # - Note that we do not set try_previous_locales, which would have the
+    #   parser reuse the locale it last detected. As the notes below show,
+    #   the locale affects the result, e.g., '2021-02-05' is May 2nd in
+    #   Polish, so each result would depend on what was parsed before it.
+    return dateparser.DateDataParser(settings=settings)
+
+
 def parse_datetime_human(datepart, time_now=None, local_tz=None):
     # Bouncer (aka Guard Clause): Callers have done their due diligence to
     # handler input that's numbers and punctuation only, so return early if
@@ -388,12 +411,18 @@ def parse_datetime_human(datepart, time_now=None, local_tz=None):
     if RE_ONLY_09_WH_AND_PUNCT.match(datepart) is not None:
         return
 
-    settings = parse_datetime_get_settings(time_now, local_tz)
+    # Without a time_now, dateparser reckons relative dates from the current
+    # time, so only reuse a result from within the same second. (nark drops
+    # microseconds, and relative dates are whole seconds or more, so a result
+    # from earlier in the same second truncates the same as a fresh result.)
+    now_bucket = int(time.time()) if time_now is None else None
 
-    # Use the parse() wrapper class, so that the detected language is reused every
-    # time, potentially speeding up a long import job. So avoid calling just this:
-    #   parsed = dateparser.parse(datepart, settings=settings)
-    ddp = dateparser.DateDataParser(settings=settings).get_date_data(datepart)
+    return parse_datetime_human_memo(datepart, time_now, local_tz, now_bucket)
+
+
+@lru_cache(maxsize=PARSED_MEMO_SIZE)
+def parse_datetime_human_memo(datepart, time_now, local_tz, now_bucket):
+    ddp = parse_datetime_get_parser(time_now, local_tz).get_date_data(datepart)
     # ddp is dict: 'date_obj' is None or the datetime;
     #              'period' is None or, e.g., 'day';
     #              'locale' is None or, e.g., 'en'.
@@ -20,8 +20,10 @@
 """This module provides nark raw fact parsing-related functions."""
 
 import logging
+import multiprocessing
 import os
 import re
+from functools import lru_cache, partial
 from gettext import gettext as _
 
 from .parse_errors import (
@@ -35,6 +37,7 @@ from .parse_time import HamsterTimeSpec, parse_datetime_human, parse_datetime_is
 
 __all__ = (
     "parse_factoid",
+    "parse_factoids",
     "Parser",
 )
 
@@ -68,12 +71,63 @@ TIME_HINT_CLUE = {
 }
 
 
+# The patterns depend only on the separators and hash_stamps, which rarely
+# change, so compile each configuration's patterns once, not per Factoid.
+
+
+@lru_cache(maxsize=32)
+def compile_item_sep(separators):
+    sep_group = "|".join(separators)
+    # Gobble whitespace as part of separator, to make it easier to pull
+    # data apart and then put it back together if we need. E.g., if user
+    # puts description on same line as meta data, and if description contains
+    # separators, we'll split the line first to parse out the meta data, and
+    # then we'll put it back together, so if a separator is part of the
+    # description, we want to be sure to retain the whitespace around the
+    # separator if we have to patch the description back together from its
+    # parts that did not turn out to be meta data (like #tags).
+    # This is how parser originally split, leaving whitespace in the last part:
+    #   # C✗P✗: re.compile('(?:,|:)(?=\\s|$)')
+    #   ..._sep = re.compile(r'({})(?=\s|$)'.format(sep_group))
+    # We can pull whitespace into the separator with two Levenshtein moves.
+    return re.compile(r"({}(?=\s+|$))".format(sep_group))
+
+
+@lru_cache(maxsize=32)
+def compile_hash_stamps(hash_stamps):
+    # FIXME/2018-05-15: (lb): Should #|@ be settable, like the other
+    # two (DATE_TO_DATE_SEPARATORS and FACT_METADATA_SEPARATORS)?
+    # Or does that make maintaining the parser that much harder?
+    # HINT: Matches space(s) followed by hash.
+    #   On split, removes whitespace (because matched).
+    #   - First split element may be empty string.
+    #   - Final split element may have trailing spaces.
+    re_split_cat_and_tags = re.compile(
+        r"\s+[{hash_stamps}](?=\S)".format(hash_stamps=hash_stamps)
+    )
+    # HINT: Matches only on a hash starting the string.
+    #   On split, leaves trailing spaces on each element.
+    #   - First split element may be whitespace string.
+    re_split_tags_and_tags = re.compile(
+        r"(?<!\S)[{hash_stamps}](?=\S)".format(hash_stamps=hash_stamps)
+    )
+    return re_split_cat_and_tags, re_split_tags_and_tags
+
+
 class Parser(object):
     """FIXME"""
 
     ACTEGORY_SEP = "@"
 
-    RE_DATE_TO_DATE_SEP = None
+    # 2020-12-22: (lb): I had this splitting 'digit-digit'
+    # (without spaces) but ran into issue on YYYY-MM-DD,
+    # not sure how I didn't see this before. Was:
+    #    r'\s(to|until|\-)\s|(?<=\d)(\-)(?=\d)'
+    # See instead simple split('-') if this regex matchless
+    # and the string under parse only contains a single dash.
+    # Groups: (?:...) is non-capturing, so just the to/until/-.
+    RE_DATE_TO_DATE_SEP = re.compile(r"(?:^|\s)(to|until|\-)\s")
+    # Set per Parser (per hash_stamps), by setup_patterns.
     RE_SPLIT_CAT_AND_TAGS = None
     RE_SPLIT_TAGS_AND_TAGS = None
 
@@ -156,19 +210,10 @@ class Parser(object):
     # **************************************
 
     def setup_patterns(self):
-        self.re_setup_datetimes_separator()
-        self.re_setup_category_and_tags()
-        self.re_setup_tags_upon_tags()
-
-    def re_setup_datetimes_separator(self):
-        # 2020-12-22: (lb): I had this splitting 'digit-digit'
-        # (without spaces) but ran into issue on YYYY-MM-DD,
-        # not sure how I didn't see this before. Was:
-        #    r'\s(to|until|\-)\s|(?<=\d)(\-)(?=\d)'
-        # See instead simple split('-') if this regex matchless
-        # and the string under parse only contains a single dash.
-        # Groups: (?:...) is non-capturing, so just the to/until/-.
-        Parser.RE_DATE_TO_DATE_SEP = re.compile(r"(?:^|\s)(to|until|\-)\s")
+        (
+            self.RE_SPLIT_CAT_AND_TAGS,
+            self.RE_SPLIT_TAGS_AND_TAGS,
+        ) = compile_hash_stamps(self.hash_stamps)
 
     def re_split_datetimes_separator(self, rest):
         # Prefer ' to ', ' until ', and ' - ', but fallback to
@@ -183,26 +228,6 @@ class Parser(object):
 
         return parts
 
-    def re_setup_category_and_tags(self):
-        # FIXME/2018-05-15: (lb): Should #|@ be settable, like the other
-        # two (DATE_TO_DATE_SEPARATORS and FACT_METADATA_SEPARATORS)?
-        # Or does that make maintaining the parser that much harder?
-        # HINT: Matches space(s) followed by hash.
-        #   On split, removes whitespace (because matched).
-        #   - First split element may be empty string.
-        #   - Final split element may have trailing spaces.
-        Parser.RE_SPLIT_CAT_AND_TAGS = re.compile(
-            r"\s+[{hash_stamps}](?=\S)".format(hash_stamps=self.hash_stamps)
-        )
-
-    def re_setup_tags_upon_tags(self):
-        # HINT: Matches only on a hash starting the string.
-        #   On split, leaves trailing spaces on each element.
-        #   - First split element may be whitespace string.
-        Parser.RE_SPLIT_TAGS_AND_TAGS = re.compile(
-            r"(?<!\S)[{hash_stamps}](?=\S)".format(hash_stamps=self.hash_stamps)
-        )
-
     # **************************************
     # *** dissect_raw_fact: Main class entry
     # **************************************
@@ -326,20 +351,7 @@ class Parser(object):
         if not separators:
             separators = FACT_METADATA_SEPARATORS
         assert len(separators) > 0
-        sep_group = "|".join(separators)
-        # Gobble whitespace as part of separator, to make it easier to pull
-        # data apart and then put it back together if we need. E.g., if user
-        # puts description on same line as meta data, and if description contains
-        # separators, we'll split the line first to parse out the meta data, and
-        # then we'll put it back together, so if a separator is part of the
-        # description, we want to be sure to retain the whitespace around the
-        # separator if we have to patch the description back together from its
-        # parts that did not turn out to be meta data (like #tags).
-        # This is how parser originally split, leaving whitespace in the last part:
-        #   # C✗P✗: re.compile('(?:,|:)(?=\\s|$)')
-        #   ..._sep = re.compile(r'({})(?=\s|$)'.format(sep_group))
-        # We can pull whitespace into the separator with two Levenshtein moves.
-        re_item_sep = re.compile(r"({}(?=\s+|$))".format(sep_group))
+        re_item_sep = compile_item_sep(tuple(separators))
 
         if not hash_stamps:
             hash_stamps = "#@"
@@ -635,7 +647,7 @@ class Parser(object):
                 assert len(parts) == 3
 
         if cat_and_tags:
-            cat_tags = Parser.RE_SPLIT_TAGS_AND_TAGS.split(cat_and_tags, 1)
+            cat_tags = self.RE_SPLIT_TAGS_AND_TAGS.split(cat_and_tags, 1)
             self.category_name = cat_tags[0]
             if len(cat_tags) == 2:
                 unseparated_tags = self.hash_stamps[0] + cat_tags[1]
@@ -669,9 +681,9 @@ class Parser(object):
         description_prefix = ""
         if unseparated_tags:
             # NOTE: re.match checks for a match only at the beginning of the string.
-            match_tags = Parser.RE_SPLIT_CAT_AND_TAGS.match(unseparated_tags)
+            match_tags = self.RE_SPLIT_CAT_AND_TAGS.match(unseparated_tags)
             if match_tags is not None:
-                split_tags = Parser.RE_SPLIT_TAGS_AND_TAGS.split(unseparated_tags)
+                split_tags = self.RE_SPLIT_TAGS_AND_TAGS.split(unseparated_tags)
                 self.consume_tags(split_tags)
             else:
                 description_prefix = unseparated_tags
@@ -789,6 +801,10 @@ def parse_factoid(*args, **kwargs):
     """
     parser = Parser()
     err = parser.dissect_raw_fact(*args, **kwargs)
+    return parser_fact_dict(parser), err
+
+
+def parser_fact_dict(parser):
     fact_dict = {
         "start": parser.datetime1 if parser.datetime1 else None,
         "end": parser.datetime2 if parser.datetime2 else None,
@@ -798,4 +814,62 @@ def parse_factoid(*args, **kwargs):
         "tags": parser.tags if parser.tags else [],
         "warnings": parser.warnings,
     }
-    return fact_dict, err
+    return fact_dict
+
+
+# ***
+
+
+def parse_factoids(factoids, workers=1, chunksize=64, **kwargs):
+    """
+    Parses many Factoids, e.g., from an import file, yielding each in order.
+
+    Args:
+        factoids (iterable): The Factoids to parse (each a str, or a list of
+            str, as passed to ``parse_factoid``). They're consumed lazily, so
+            this can stream a large file.
+
+        workers (int): The number of processes to parse with, or 1 to parse in
+            this process, or None to use one process per CPU.
+
+        chunksize (int): The number of Factoids to send a worker at a time.
+
+        kwargs: The other ``Parser.setup_rules`` arguments (e.g., ``time_hint``,
+            ``separators``, ``hash_stamps``, ``lenient``), which apply to every
+            Factoid.
+
+    Yields:
+        tuple: The ``(fact_dict, err)`` for each Factoid, in the same order,
+        as ``parse_factoid`` returns. Unless ``lenient``, the first Factoid
+        that fails to parse raises its error instead.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        parse_one = partial(parse_factoid_reusing_parser, **kwargs)
+        for factoid in factoids:
+            yield parse_one(factoid)
+        return
+
+    # The workers always return their errors, so that a strict caller still
+    # receives every Factoid before the one that fails (which a worker
+    # raising would lose, along with the rest of its chunk).
+    lenient = kwargs.pop("lenient", False)
+    parse_one = partial(parse_factoid_reusing_parser, lenient=True, **kwargs)
+    with multiprocessing.Pool(workers) as pool:
+        for fact_dict, err in pool.imap(parse_one, factoids, chunksize):
+            if err is not None and not lenient:
+                raise err
+            yield fact_dict, err
+
+
+# Each process reuses one Parser, which setup_rules resets for each Factoid.
+_batch_parser = None
+
+
+def parse_factoid_reusing_parser(factoid, **kwargs):
+    global _batch_parser
+    if _batch_parser is None:
+        _batch_parser = Parser()
+    err = _batch_parser.dissect_raw_fact(factoid, **kwargs)
+    return parser_fact_dict(_batch_parser), err
@@ -18,12 +18,15 @@
 # or visit <http://www.gnu.org/licenses/>.
 
 import os
+from collections import namedtuple
+from contextlib import contextmanager
 from datetime import datetime
 
 from easy_as_pypi_appdirs import AppDirs
 
 from .config import decorate_config
 from .helpers import logging as logging_helpers
+from .helpers.dev.instrument import Instrumentation
 from .managers.activity import BaseActivityManager
 from .managers.category import BaseCategoryManager
 from .managers.fact import BaseFactManager
@@ -42,6 +45,7 @@ class BaseStore(object):
         self.config = decorate_config(config)
         self.init_config()
         self.init_logger()
+        self.instrument = Instrumentation(self)
         self._now = None
         self.add_pytest_managers()
 
@@ -69,6 +73,48 @@ class BaseStore(object):
         """
         raise NotImplementedError
 
+    @contextmanager
+    def session_scope(self):
+        """
+        Runs a unit of work, after which the backend may release what it loaded.
+
+        E.g., ``with store.session_scope(): store.facts.get_all()``.
+        """
+        yield None
+
+    @contextmanager
+    def transaction(self):
+        """Runs many saves as one transaction, if the backend supports it."""
+        yield None
+
+    @contextmanager
+    def savepoint(self):
+        """Runs part of a transaction, which the backend might roll back alone."""
+        yield None
+
+    def session_release_maybe(self):
+        """Releases what the backend loaded, if it loaded too much."""
+        return False
+
+    # Each change that changes_since returns: The change's sequence number;
+    # the item type ("fact", "activity", "category", or "tag"); the item's PK;
+    # the operation ("add", "update", or "remove"); and when it was saved.
+    ChangeTuple = namedtuple("ChangeTuple", ("seq", "entity", "pk", "op", "changed_at"))
+
+    def changes_since(self, seq=0, limit=None):
+        """
+        Returns the items' changes after the given sequence number, oldest first.
+
+        Args:
+            seq (int): The ``seq`` of the last change already seen (0 for all).
+
+            limit (int, optional): The most changes to return.
+
+        Returns:
+            list: A ChangeTuple for each change.
+        """
+        raise NotImplementedError
+
     def init_config(self):
         self.config.setdefault("db.orm", "sqlalchemy")
         self.config.setdefault("db.engine", "sqlite")
@@ -78,10 +124,23 @@ class BaseStore(object):
         self.config.setdefault("db.name", "")
         self.config.setdefault("db.user", "")
         self.config.setdefault("db.password", "")
+        self.config.setdefault("db.rollups", False)
+        self.config.setdefault("db.interval_index", False)
+        self.config.setdefault("db.archive_deleted", False)
+        self.config.setdefault("db.fts", False)
+        self.config.setdefault("db.identity_map_size", 0)
+        self.config.setdefault("db.sqlite.preset", "")
+        self.config.setdefault("db.sqlite.journal_mode", "")
+        self.config.setdefault("db.sqlite.synchronous", "")
+        self.config.setdefault("db.sqlite.cache_size", None)
+        self.config.setdefault("db.sqlite.mmap_size", None)
+        self.config.setdefault("db.sqlite.temp_store", "")
+        self.config.setdefault("db.sqlite.busy_timeout", None)
         self.config.setdefault("time.allow_momentaneous", False)
         self.config.setdefault("time.day_start", "")
         self.config.setdefault("time.fact_min_delta", "0")
         self.config.setdefault("dev.catch_errors", False)
+        self.config.setdefault("dev.instrument", False)
         self.config.setdefault("dev.lib_log_level", "WARNING")
         self.config.setdefault("dev.sql_log_level", "WARNING")
         self.config.setdefault("time.tz_aware", False)
@@ -107,6 +107,22 @@ class BaseFactManager(BaseManager):
 
     # ***
 
+    def add_many(self, facts):
+        """
+        Add many new ``Fact`` instances to the backend at once, e.g., on import.
+
+        Args:
+            facts (list of nark.Fact): Facts to be added.
+
+        Returns:
+            list: One ``(fact, err)`` tuple per input Fact, in order, where
+            ``fact`` is the added ``Fact`` (or None if it was not added), and
+            ``err`` explains why it was not added (or is None).
+        """
+        raise NotImplementedError
+
+    # ***
+
     def _update(self, fact):
         """
         Update and existing fact with new values.
@@ -188,6 +204,38 @@ class BaseFactManager(BaseManager):
 
     # ***
 
+    def iter_gather(self, query_terms, chunk_size=None):
+        """
+        Return a generator of ``Facts`` matching given criteria, fetched in chunks.
+        """
+        raise NotImplementedError
+
+    # ***
+
+    def gather_columns(self, query_terms):
+        """
+        Return the ``Facts`` matching given criteria, ready to aggregate in-process.
+        """
+        raise NotImplementedError
+
+    # ***
+
+    def rebuild_rollups(self):
+        """
+        Recompute the daily rollups (used for usage reports) from the ``Facts``.
+        """
+        raise NotImplementedError
+
+    # ***
+
+    def rollup_days(self, since=None, until=None):
+        """
+        Return the total time and number of ``Facts`` for each day.
+        """
+        raise NotImplementedError
+
+    # ***
+
     def get_today(self):
         """
         Return all facts for today, while respecting ``day_start``.
@@ -468,6 +516,78 @@ class BaseFactManager(BaseManager):
 
     # ***
 
+    def window(self, ref, before=1, after=1):
+        """
+        Return the Facts surrounding the indicated Fact or time, using one query.
+
+        Args:
+            ref (nark.Fact or datetime.datetime): The Fact or time to reference.
+
+            before (int): The number of preceding Facts to find.
+
+            after (int): The number of following Facts to find.
+
+        Returns:
+            list: The preceding Facts, then the reference Fact (if it's stored,
+            and not deleted), then the following Facts, ordered by start time.
+
+        Raises:
+            ValueError: If the reference Fact has neither ``start`` nor ``end``.
+        """
+        raise NotImplementedError
+
+    # ***
+
+    def history(self, fact):
+        """
+        Return the edit history of a Fact, from its original to its latest edit.
+
+        Args:
+            fact (nark.Fact): The Fact, or any of its edits, with its PK set.
+
+        Returns:
+            list: The Facts that the Fact was split from, and the Fact, and the
+            Facts split from it, ordered by when each was saved.
+
+        Raises:
+            ValueError: If the Fact does not have a PK.
+        """
+        raise NotImplementedError
+
+    def histories(self, facts):
+        """
+        Return the edit history of each Fact, using one query.
+
+        Args:
+            facts (list of nark.Fact): The Facts, each with its PK set.
+
+        Returns:
+            list: One history list per input Fact, in the same order.
+
+        Raises:
+            ValueError: If a Fact does not have a PK.
+        """
+        raise NotImplementedError
+
+    # ***
+
+    def archive(self, pks=None):
+        """
+        Move deleted Facts to the archive, out of the way of the live Facts.
+
+        Archived Facts are still found by the queries for deleted Facts.
+
+        Args:
+            pks (list of int, optional): The PKs of the deleted Facts
+                to archive, or None to archive all deleted Facts.
+
+        Returns:
+            int: The number of Facts archived.
+        """
+        raise NotImplementedError
+
+    # ***
+
     def strictly_during(self, start, end, result_limit=1000):
         """
         Return the fact(s) strictly contained within a start and end time.
@@ -0,0 +1,117 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma. All rights reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+"""Client-side prefetch cache for stepping through Facts."""
+
+__all__ = ("FactWindowCache",)
+
+
+class FactWindowCache(object):
+    """
+    Caches the Facts surrounding the current Fact, for stepping through Facts.
+
+    An interactive editor steps from Fact to Fact using the FactManager
+    ``antecedent`` and ``subsequent`` methods, which run a query per step.
+    The FactWindowCache instead calls FactManager ``window`` to fetch a page
+    of Facts on each side of the current Fact, and then answers each step from
+    the page, until it steps off the page, when it fetches the next page.
+
+    The cache does not see changes made to the store, so call ``clear``
+    after saving or removing Facts.
+    """
+
+    # The default number of Facts to fetch on each side of the current Fact.
+    PAGE_SIZE = 25
+
+    def __init__(self, facts, page_size=None):
+        """
+        Args:
+            facts (nark.managers.fact.BaseFactManager): The FactManager,
+                e.g., ``controller.facts``.
+
+            page_size (int, optional): The number of Facts to fetch on each
+                side of the current Fact, when stepping off the cached Facts.
+        """
+        self.facts = facts
+        self.page_size = page_size or FactWindowCache.PAGE_SIZE
+        self.clear()
+
+    def __len__(self):
+        return len(self.cached)
+
+    def clear(self):
+        """Forgets the cached Facts, which are fetched again on the next step."""
+        # The cached Facts, ordered by start time.
+        self.cached = []
+        # Maps each cached Fact's PK to its index in self.cached.
+        self.positions = {}
+        # True if the cached Facts include the first, or final, Fact.
+        self.includes_first = False
+        self.includes_final = False
+
+    # ***
+
+    def antecedent(self, fact):
+        """Returns the Fact preceding the indicated Fact, or None if none."""
+        return self.step(fact, -1)
+
+    def subsequent(self, fact):
+        """Returns the Fact following the indicated Fact, or None if none."""
+        return self.step(fact, 1)
+
+    def step(self, fact, offset):
+        # Only a stored Fact is cached (by its PK).
+        if fact is None or fact.unstored:
+            return self.step_uncached(fact, offset)
+
+        position = self.positions.get(fact.pk)
+        if position is None or self.steps_off_page(position + offset):
+            self.prefetch(fact)
+            position = self.positions.get(fact.pk)
+            if position is None:
+                # E.g., the Fact is deleted, so window found its neighbors,
+                # but the Fact itself is not part of the sequence.
+                return self.step_uncached(fact, offset)
+
+        target = position + offset
+        if 0 <= target < len(self.cached):
+            return self.cached[target]
+        return None
+
+    def steps_off_page(self, target):
+        if target < 0:
+            return not self.includes_first
+        if target >= len(self.cached):
+            return not self.includes_final
+        return False
+
+    def step_uncached(self, fact, offset):
+        if offset < 0:
+            return self.facts.antecedent(fact)
+        return self.facts.subsequent(fact)
+
+    def prefetch(self, fact):
+        """Replaces the cached Facts with the page surrounding the indicated Fact."""
+        page_size = self.page_size
+        self.clear()
+        self.cached = self.facts.window(fact, before=page_size, after=page_size)
+        self.positions = {cached.pk: idx for idx, cached in enumerate(self.cached)}
+        position = self.positions.get(fact.pk)
+        if position is not None:
+            # If window found fewer Facts than requested, it reached the end.
+            self.includes_first = position < page_size
+            self.includes_final = len(self.cached) - position - 1 < page_size
@@ -46,6 +46,8 @@ QueryTermsTuple = namedtuple(
         "sort_orders",
         "limit",
         "offset",
+        "after",
+        "before",
     ),
 )
 
@@ -87,6 +89,8 @@ class QueryTerms(object):
                 "ords: {}".format(self.sort_orders),
                 "limit: {}".format(self.limit),
                 "offset: {}".format(self.offset),
+                "after: {}".format(self.after),
+                "before: {}".format(self.before),
             ]
         )
 
@@ -105,7 +109,8 @@ class QueryTerms(object):
         #   from the results.
         exclude_ongoing=None,
         partial=False,
-        # The `deleted` option only applies to Facts.
+        # The `deleted` option only applies to Facts (including the Facts
+        # tallied by the Activity, Category, and Tag usage stats).
         deleted=False,
         search_terms=None,
         broad_match=False,
@@ -135,6 +140,8 @@ class QueryTerms(object):
         sort_orders=None,
         limit=None,
         offset=None,
+        after=None,
+        before=None,
     ):
         """
         Configures query parameters for item.get_all() and item.get_all_by_usage().
@@ -182,6 +189,9 @@ class QueryTerms(object):
                 will be included in the results.
                 * Use ``not`` before a search term to exclude its matches from the
                   results.
+                * If ``db.fts`` is set, Fact terms are matched using the full-text
+                  search index, which matches words (and word prefixes), rather
+                  than any substring.
             broad_match: If True, apply search_terms fuzzy search to activity,
                 category, and tag names.
 
@@ -224,7 +234,9 @@ class QueryTerms(object):
                 - When aggregating results (include_stats=True) or searching
                   Facts, defaults to 'start', and orders results by Fact start.
                 - Choices include: 'start', 'time', 'day', 'name', 'activity,
-                  'category', 'tag', 'usage', and 'fact'.
+                  'category', 'tag', 'usage', 'fact', and 'rank'.
+                - Note that 'rank' orders Facts by how well they match the
+                  search_terms, best first, if using the ``db.fts`` index.
                 - Note that 'start' and 'usage' only apply if include_stats,
                   and 'day' is only valid when group_days is True.
             sort_orders (str list, optional): Specifies the direction of each
@@ -236,6 +248,25 @@ class QueryTerms(object):
 
             limit (int, optional): Query "limit".
             offset (int, optional): Query "offset".
+
+            after (str, optional): A cursor from a previous query's
+                ``cursor_next``. Restricts the results to those that sort after
+                the final result of that query. Unlike ``offset``, the database
+                seeks directly to the cursor, so each page costs the same as
+                the first. Cursors only work with the default sort (or with
+                'start' for Facts, or 'name' for the other items), and not when
+                grouping or sorting by aggregates.
+            before (str, optional): A cursor from a previous query's
+                ``cursor_prev``. Restricts the results to those that sort before
+                the first result of that query (i.e., fetches the previous page).
+
+        After a query that uses ``limit``, ``after``, or ``before``, the query
+        sets two output values:
+
+            cursor_next (str or None): Pass as ``after`` to fetch the next
+                page, or None if there are no more results.
+            cursor_prev (str or None): Pass as ``before`` to fetch the previous
+                page, or None if this is the first page.
         """
         self.raw = raw
         self.named_tuples = named_tuples
@@ -268,6 +299,12 @@ class QueryTerms(object):
 
         self.limit = limit
         self.offset = offset
+        self.after = after
+        self.before = before
+
+        # The paging cursors are output values, set by the query.
+        self.cursor_next = None
+        self.cursor_prev = None
 
     # ***
 
@@ -297,6 +334,8 @@ class QueryTerms(object):
             sort_orders=self.sort_orders,
             limit=self.limit,
             offset=self.offset,
+            after=self.after,
+            before=self.before,
         )
 
     def __eq__(self, other):
@@ -0,0 +1,70 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All rights reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+from sqlalchemy import Index, MetaData, Table
+
+# USAGE: See 001_Add_deleted_columns.py, or just run:
+#
+#           dob migrate up
+
+# Rewrite Fact times to the canonical storage format, "YYYY-MM-DD HH:MM:SS"
+# (see objects.FactDateTime), and index the start and end times.
+#
+# - Legacy Hamster stored datetimes without microseconds, but SQLAlchemy's
+#   default SQLite format includes them. Mixed formats do not compare
+#   lexically, which is why the Fact queries used to wrap each column in
+#   datetime() -- which also meant the database could never use an index.
+#
+# - SQLite's datetime() returns NULL for values it cannot parse, so skip
+#   those rows, rather than clobbering whatever bizarre value is stored.
+
+FACT_TIME_INDEXES = (
+    ("ix_facts_deleted_start_time", ("deleted", "start_time")),
+    ("ix_facts_deleted_end_time", ("deleted", "end_time")),
+)
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    facts = Table("facts", meta, autoload=True)
+
+    if migrate_engine.name == "sqlite":
+        for col_name in ("start_time", "end_time"):
+            migrate_engine.execute(
+                "UPDATE facts SET {0} = datetime({0})"
+                " WHERE {0} IS NOT NULL"
+                " AND datetime({0}) IS NOT NULL"
+                " AND {0} != datetime({0})".format(col_name)
+            )
+
+    for index_name, col_names in FACT_TIME_INDEXES:
+        Index(index_name, *[facts.c[col_name] for col_name in col_names]).create()
+    Index("ix_facts_end_time_is_null", facts.c.end_time.is_(None)).create()
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    facts = Table("facts", meta, autoload=True)
+
+    # Note that there's no reason to restore the old datetime format,
+    # which the older code normalizes with datetime() anyway.
+    for index_name, col_names in FACT_TIME_INDEXES:
+        Index(index_name, *[facts.c[col_name] for col_name in col_names]).drop()
+    Index("ix_facts_end_time_is_null", facts.c.end_time.is_(None)).drop()
@@ -0,0 +1,95 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All rights reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+from sqlalchemy import Column, Date, Integer, MetaData, Table
+
+# USAGE: See 001_Add_deleted_columns.py, or just run:
+#
+#           dob migrate up
+
+# Add the fact_daily_rollups table, which tallies the seconds and count
+# of closed, non-deleted Facts per day, per Activity, and per Tag (see
+# objects.fact_daily_rollups), and populate it from the existing Facts.
+#
+# - The SQL to populate the table is specific to SQLite. For any other
+#   DBMS, the table is created empty, and you'll want to rebuild it, e.g.,
+#   call ``store.facts.rebuild_rollups()``.
+
+ROLLUP_SECONDS = (
+    "SUM(CAST(strftime('%s', facts.end_time) AS INTEGER)"
+    " - CAST(strftime('%s', facts.start_time) AS INTEGER))"
+)
+
+ROLLUP_WHERE = (
+    "facts.deleted = 0"
+    " AND facts.start_time IS NOT NULL"
+    " AND facts.end_time IS NOT NULL"
+)
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    fact_daily_rollups = Table(
+        "fact_daily_rollups",
+        meta,
+        Column("day", Date, primary_key=True),
+        Column("activity_id", Integer, primary_key=True, autoincrement=False),
+        Column("tag_id", Integer, primary_key=True, autoincrement=False),
+        Column("seconds", Integer, nullable=False),
+        Column("count", Integer, nullable=False),
+    )
+    fact_daily_rollups.create()
+
+    if migrate_engine.name != "sqlite":
+        return
+
+    migrate_engine.execute(
+        "INSERT INTO fact_daily_rollups"
+        " (day, activity_id, tag_id, seconds, count)"
+        " SELECT date(facts.start_time), COALESCE(facts.activity_id, 0), 0,"
+        " {0}, COUNT(*)"
+        " FROM facts"
+        " WHERE {1}"
+        " GROUP BY date(facts.start_time), COALESCE(facts.activity_id, 0)".format(
+            ROLLUP_SECONDS,
+            ROLLUP_WHERE,
+        )
+    )
+
+    migrate_engine.execute(
+        "INSERT INTO fact_daily_rollups"
+        " (day, activity_id, tag_id, seconds, count)"
+        " SELECT date(facts.start_time), COALESCE(facts.activity_id, 0),"
+        " fact_tags.tag_id, {0}, COUNT(*)"
+        " FROM facts"
+        " JOIN fact_tags ON fact_tags.fact_id = facts.id"
+        " WHERE {1}"
+        " GROUP BY date(facts.start_time), COALESCE(facts.activity_id, 0),"
+        " fact_tags.tag_id".format(
+            ROLLUP_SECONDS,
+            ROLLUP_WHERE,
+        )
+    )
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    fact_daily_rollups = Table("fact_daily_rollups", meta, autoload=True)
+    fact_daily_rollups.drop()
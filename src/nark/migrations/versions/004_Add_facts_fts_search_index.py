@@ -0,0 +1,59 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All rights reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+from nark.backends.sqlalchemy.objects import FACTS_FTS_POPULATE, facts_fts_ddl
+
+# USAGE: See 001_Add_deleted_columns.py, or just run:
+#
+#           dob migrate up
+
+# Add the facts_fts full-text search table, and the triggers that maintain
+# it (see objects.facts_fts_ddl), and index the existing Facts.
+#
+# - FTS5 is specific to SQLite (and to an SQLite built with it, as most
+#   are). For any other DBMS, or without FTS5, this migration does nothing,
+#   and the db.fts setting should be left off.
+
+
+def fts5_available(migrate_engine):
+    if migrate_engine.name != "sqlite":
+        return False
+    options = migrate_engine.execute("PRAGMA compile_options").fetchall()
+    return ("ENABLE_FTS5",) in [tuple(option) for option in options]
+
+
+def upgrade(migrate_engine):
+    if not fts5_available(migrate_engine):
+        return
+
+    for statement in facts_fts_ddl():
+        migrate_engine.execute(statement)
+    migrate_engine.execute(FACTS_FTS_POPULATE)
+
+
+def downgrade(migrate_engine):
+    if not fts5_available(migrate_engine):
+        return
+
+    # Drop the triggers (which are on the other tables), and then the table.
+    for (trigger_name,) in migrate_engine.execute(
+        "SELECT name FROM sqlite_master"
+        " WHERE type = 'trigger' AND name LIKE 'facts_fts_%'"
+    ).fetchall():
+        migrate_engine.execute("DROP TRIGGER {}".format(trigger_name))
+    migrate_engine.execute("DROP TABLE facts_fts")
@@ -0,0 +1,146 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All rights reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+from sqlalchemy import Index, MetaData, Table
+
+from nark.backends.sqlalchemy.objects import FACTS_FTS_POPULATE
+
+# USAGE: See 001_Add_deleted_columns.py, or just run:
+#
+#           dob migrate up
+
+# Index the join keys: key fact_tags by (fact_id, tag_id), index it the
+# other way round, by (tag_id, fact_id), and index the foreign keys of
+# facts.activity_id and activities.category_id (see objects).
+#
+# - Legacy databases might have duplicate fact_tags rows (the table never
+#   had a key), which would double-count a Tag's usage. The duplicates (and
+#   any NULL links) are dropped, and, if any were, the Tag rollups are
+#   recounted (see 003_Add_fact_daily_rollups.py), and the search index
+#   is rebuilt (see 004_Add_facts_fts_search_index.py).
+#
+# - SQLite cannot add a primary key to an existing table, so the table is
+#   rebuilt. Dropping the table drops its triggers (e.g., those made by
+#   004_Add_facts_fts_search_index.py), so they are recreated afterwards.
+#   The rebuild SQL is specific to SQLite; for any other DBMS, only the
+#   indexes are created.
+
+FOREIGN_KEY_INDEXES = (
+    ("ix_facts_activity_id", "facts", "activity_id"),
+    ("ix_activities_category_id", "activities", "category_id"),
+)
+
+FACT_TAGS_REVERSE_INDEX = "ix_fact_tags_tag_id_fact_id"
+
+FACT_TAGS_KEYED = (
+    "CREATE TABLE fact_tags ("
+    " fact_id INTEGER NOT NULL REFERENCES facts (id),"
+    " tag_id INTEGER NOT NULL REFERENCES tags (id),"
+    " PRIMARY KEY (fact_id, tag_id)"
+    ") WITHOUT ROWID"
+)
+
+FACT_TAGS_UNKEYED = (
+    "CREATE TABLE fact_tags ("
+    " fact_id INTEGER REFERENCES facts (id),"
+    " tag_id INTEGER REFERENCES tags (id)"
+    ")"
+)
+
+ROLLUP_TAGS_RECOUNT = (
+    "INSERT INTO fact_daily_rollups"
+    " (day, activity_id, tag_id, seconds, count)"
+    " SELECT date(facts.start_time), COALESCE(facts.activity_id, 0),"
+    " fact_tags.tag_id,"
+    " SUM(CAST(strftime('%s', facts.end_time) AS INTEGER)"
+    " - CAST(strftime('%s', facts.start_time) AS INTEGER)), COUNT(*)"
+    " FROM facts"
+    " JOIN fact_tags ON fact_tags.fact_id = facts.id"
+    " WHERE facts.deleted = 0"
+    " AND facts.start_time IS NOT NULL"
+    " AND facts.end_time IS NOT NULL"
+    " GROUP BY date(facts.start_time), COALESCE(facts.activity_id, 0),"
+    " fact_tags.tag_id"
+)
+
+
+def rebuild_fact_tags(conn, create_sql, select_sql):
+    # Remember the triggers on fact_tags, which DROP TABLE also drops.
+    triggers = conn.execute(
+        "SELECT sql FROM sqlite_master"
+        " WHERE type = 'trigger' AND tbl_name = 'fact_tags'"
+    ).fetchall()
+    conn.execute("CREATE TEMPORARY TABLE fact_tags_rebuild AS {}".format(select_sql))
+    conn.execute("DROP TABLE fact_tags")
+    conn.execute(create_sql)
+    conn.execute("INSERT INTO fact_tags SELECT * FROM fact_tags_rebuild")
+    conn.execute("DROP TABLE fact_tags_rebuild")
+    for (trigger_sql,) in triggers:
+        conn.execute(trigger_sql)
+
+
+def upgrade(migrate_engine):
+    if migrate_engine.name == "sqlite":
+        # Use one connection throughout, for the temporary table.
+        with migrate_engine.begin() as conn:
+            n_links = conn.execute("SELECT COUNT(*) FROM fact_tags").scalar()
+            rebuild_fact_tags(
+                conn,
+                FACT_TAGS_KEYED,
+                "SELECT DISTINCT fact_id, tag_id FROM fact_tags"
+                " WHERE fact_id IS NOT NULL AND tag_id IS NOT NULL",
+            )
+            n_kept = conn.execute("SELECT COUNT(*) FROM fact_tags").scalar()
+            if n_kept != n_links:
+                conn.execute("DELETE FROM fact_daily_rollups WHERE tag_id != 0")
+                conn.execute(ROLLUP_TAGS_RECOUNT)
+                if conn.execute(
+                    "SELECT COUNT(*) FROM sqlite_master"
+                    " WHERE type = 'table' AND name = 'facts_fts'"
+                ).scalar():
+                    conn.execute("DELETE FROM facts_fts")
+                    conn.execute(FACTS_FTS_POPULATE)
+
+    meta = MetaData(bind=migrate_engine)
+
+    fact_tags = Table("fact_tags", meta, autoload=True)
+    Index(FACT_TAGS_REVERSE_INDEX, fact_tags.c.tag_id, fact_tags.c.fact_id).create()
+
+    for index_name, table_name, col_name in FOREIGN_KEY_INDEXES:
+        table = Table(table_name, meta, autoload=True)
+        Index(index_name, table.c[col_name]).create()
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    for index_name, table_name, col_name in FOREIGN_KEY_INDEXES:
+        table = Table(table_name, meta, autoload=True)
+        Index(index_name, table.c[col_name]).drop()
+
+    fact_tags = Table("fact_tags", meta, autoload=True)
+    Index(FACT_TAGS_REVERSE_INDEX, fact_tags.c.tag_id, fact_tags.c.fact_id).drop()
+
+    if migrate_engine.name == "sqlite":
+        # The old table had no key, so there's nothing to restore but that.
+        with migrate_engine.begin() as conn:
+            rebuild_fact_tags(
+                conn,
+                FACT_TAGS_UNKEYED,
+                "SELECT fact_id, tag_id FROM fact_tags",
+            )
@@ -0,0 +1,40 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All rights reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+from sqlalchemy import Index, MetaData, Table
+
+# USAGE: See 001_Add_deleted_columns.py, or just run:
+#
+#           dob migrate up
+
+# Index facts.split_from_id, which FactManager.histories walks (from each
+# Fact to the Facts split from it) using a recursive query (see objects).
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    facts = Table("facts", meta, autoload=True)
+    Index("ix_facts_split_from_id", facts.c.split_from_id).create()
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    facts = Table("facts", meta, autoload=True)
+    Index("ix_facts_split_from_id", facts.c.split_from_id).drop()
@@ -0,0 +1,139 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All rights reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+from sqlalchemy import Column, ForeignKey, Index, Integer, MetaData, Table
+
+# USAGE: See 001_Add_deleted_columns.py, or just run:
+#
+#           dob migrate up
+
+# Add the facts_archive and fact_tags_archive tables, to which deleted Facts,
+# and their Tag links, are moved (see FactManager.archive, and objects).
+#
+# - The archive is empty until the Facts are archived. Downgrading moves
+#   any archived Facts back to the facts and fact_tags tables.
+#
+# - On SQLite, the facts table is also rebuilt with AUTOINCREMENT, so that
+#   a new Fact is never assigned an archived Fact's ID (without it, SQLite
+#   assigns the highest ID in facts plus one). Downgrading leaves facts as
+#   AUTOINCREMENT, which is harmless.
+
+
+def facts_autoincrement(migrate_engine, meta, facts):
+    if migrate_engine.name != "sqlite":
+        # Other DBMSes use a sequence, which does not reuse IDs.
+        return
+
+    # The indexes and triggers on facts are dropped with it, so remember
+    # them, to recreate them after. (The triggers on the other tables that
+    # reference facts are left alone.)
+    schema_sqls = [
+        sql
+        for (sql,) in migrate_engine.execute(
+            "SELECT sql FROM sqlite_master"
+            " WHERE tbl_name = 'facts' AND type IN ('index', 'trigger')"
+            " AND sql IS NOT NULL"
+        ).fetchall()
+    ]
+
+    # USYNC: Same columns as objects.facts.
+    facts_autoincrement = Table(
+        "facts_autoincrement",
+        meta,
+        Column("id", Integer, primary_key=True),
+        Column("deleted", facts.c.deleted.type),
+        Column("split_from_id", Integer, ForeignKey("facts.id"), nullable=True),
+        Column("start_time", facts.c.start_time.type),
+        Column("end_time", facts.c.end_time.type),
+        Column("activity_id", Integer, ForeignKey("activities.id")),
+        Column("description", facts.c.description.type),
+        sqlite_autoincrement=True,
+    )
+    facts_autoincrement.create()
+
+    # Copying the rows also sets the facts' sqlite_sequence to the highest ID.
+    columns = ", ".join(col.name for col in facts.c)
+    migrate_engine.execute(
+        "INSERT INTO facts_autoincrement ({0}) SELECT {0} FROM facts".format(columns)
+    )
+    # Use the legacy rename, which does not check the triggers on the other
+    # tables, which reference facts (which, in the meantime, does not exist).
+    # (The PRAGMA is per connection, so use the same connection throughout.)
+    with migrate_engine.connect() as connection:
+        connection.execute("DROP TABLE facts")
+        connection.execute("PRAGMA legacy_alter_table = ON")
+        try:
+            connection.execute("ALTER TABLE facts_autoincrement RENAME TO facts")
+        finally:
+            connection.execute("PRAGMA legacy_alter_table = OFF")
+        for sql in schema_sqls:
+            connection.execute(sql)
+    meta.remove(facts_autoincrement)
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    facts = Table("facts", meta, autoload=True)
+    Table("activities", meta, autoload=True)
+    facts_autoincrement(migrate_engine, meta, facts)
+    Table("tags", meta, autoload=True)
+
+    # Same columns as facts, but no split_from_id foreign key (the Fact it
+    # was split from might be in either table), and PKs are copied over.
+    facts_archive = Table(
+        "facts_archive",
+        meta,
+        Column("id", Integer, primary_key=True, autoincrement=False),
+        Column("deleted", facts.c.deleted.type),
+        Column("split_from_id", Integer, nullable=True),
+        Column("start_time", facts.c.start_time.type),
+        Column("end_time", facts.c.end_time.type),
+        Column("activity_id", Integer, ForeignKey("activities.id")),
+        Column("description", facts.c.description.type),
+    )
+    facts_archive.create()
+    Index("ix_facts_archive_split_from_id", facts_archive.c.split_from_id).create()
+
+    fact_tags_archive = Table(
+        "fact_tags_archive",
+        meta,
+        Column("fact_id", Integer, ForeignKey("facts_archive.id"), primary_key=True),
+        Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+        sqlite_with_rowid=False,
+    )
+    fact_tags_archive.create()
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    facts_archive = Table("facts_archive", meta, autoload=True)
+    fact_tags_archive = Table("fact_tags_archive", meta, autoload=True)
+
+    columns = ", ".join(col.name for col in facts_archive.c)
+    migrate_engine.execute(
+        "INSERT INTO facts ({0}) SELECT {0} FROM facts_archive".format(columns)
+    )
+    migrate_engine.execute(
+        "INSERT INTO fact_tags (fact_id, tag_id)"
+        " SELECT fact_id, tag_id FROM fact_tags_archive"
+    )
+
+    fact_tags_archive.drop()
+    facts_archive.drop()
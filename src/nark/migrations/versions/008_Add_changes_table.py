@@ -0,0 +1,55 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+from sqlalchemy import Column, Integer, MetaData, Table, Unicode
+
+# USAGE: See 001_Add_deleted_columns.py, or just run:
+#
+#           dob migrate up
+
+# Add the changes table, to which each Fact, Activity, Category, and Tag
+# add, update, and remove appends a row (see SQLAlchemyStore.changes_record).
+#
+# - The table starts empty; changes before the upgrade are not recorded.
+
+
+def upgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    facts = Table("facts", meta, autoload=True)
+
+    # USYNC: Same columns as objects.changes. (AUTOINCREMENT, so that a
+    # seq is never reused, even after the newest changes are deleted.)
+    changes = Table(
+        "changes",
+        meta,
+        Column("seq", Integer, primary_key=True),
+        Column("entity", Unicode(16), nullable=False),
+        Column("item_id", Integer, nullable=False),
+        Column("op", Unicode(16), nullable=False),
+        Column("changed_at", facts.c.start_time.type, nullable=False),
+        sqlite_autoincrement=True,
+    )
+    changes.create()
+
+
+def downgrade(migrate_engine):
+    meta = MetaData(bind=migrate_engine)
+
+    changes = Table("changes", meta, autoload=True)
+    changes.drop()
@@ -25,9 +25,16 @@ __all__ = ("JSONWriter",)
 
 
 class JSONWriter(ReportWriter):
-    def __init__(self):
-        """Initialize a new JSONWriter instance."""
+    def __init__(self, json_lines=False):
+        """
+        Initialize a new JSONWriter instance.
+
+        Args:
+            json_lines (bool): If True, write JSON Lines, i.e., one JSON object
+                per line, rather than a JSON array of objects.
+        """
         super(JSONWriter, self).__init__()
+        self.json_lines = json_lines
 
     def fact_as_dict(self, fact):
         kvals = {
@@ -40,13 +47,31 @@ class JSONWriter(ReportWriter):
         }
         return kvals
 
+    # Rather than collecting every result and calling json.dump once at the
+    # end, write the opening bracket up front, and encode each result as it
+    # arrives. So memory use does not grow with the size of the export, and
+    # the output is streamed. (And it's the same output as json.dump makes.)
+
     def init_result_list(self):
-        self.result_list = []
+        self.n_results = 0
+        if not self.json_lines:
+            self.output_file.write("[")
+
+    def write_result(self, kvals):
+        if self.json_lines:
+            self.output_file.write(json.dumps(kvals))
+            self.output_file.write("\n")
+        else:
+            if self.n_results:
+                self.output_file.write(", ")
+            self.output_file.write(json.dumps(kvals))
+        self.n_results += 1
 
     def write_result_list(self):
-        json.dump(self.result_list, self.output_file)
-        n_written = len(self.result_list)
-        del self.result_list
+        if not self.json_lines:
+            self.output_file.write("]")
+        n_written = self.n_results
+        del self.n_results
         return n_written
 
     def write_facts_list(self, facts):
@@ -57,7 +82,7 @@ class JSONWriter(ReportWriter):
 
     def _write_fact(self, idx, fact):
         kvals = self.fact_as_dict(fact)
-        self.result_list.append(kvals)
+        self.write_result(kvals)
 
     def write_report_table(self, table, headers, tabulation=None):
         self.init_result_list()
@@ -67,4 +92,4 @@ class JSONWriter(ReportWriter):
 
     def _write_result(self, row, headers, tabulation=None):
         kvals = {header: value for header, value in zip(headers, row)}
-        self.result_list.append(kvals)
+        self.write_result(kvals)
@@ -113,12 +113,21 @@ class ReportWriter(object):
         return n_written
 
     def write_facts_list(self, facts):
-        """Write facts to output file."""
+        """
+        Write facts to output file.
+
+        The facts are consumed one at a time, so ``facts`` may be a generator
+        (e.g., from ``FactManager.iter_gather``), in which case the facts are
+        streamed to the output without ever all being loaded into memory.
+        """
         n_written = 0
         for idx, fact in enumerate(facts):
             self._write_fact(idx, fact)
             n_written += 1
             if self.row_limit > 0 and n_written >= self.row_limit:
+                # If streaming, close the generator, and its database cursor.
+                if hasattr(facts, "close"):
+                    facts.close()
                 break
         return n_written
 
@@ -27,6 +27,7 @@ __all__ = ("XMLWriter",)
 
 # Profiling: load Document: ~ 0.004 secs.
 minidom = lazy_import.lazy_module("xml.dom.minidom")
+saxutils = lazy_import.lazy_module("xml.sax.saxutils")
 
 
 class XMLWriter(ReportWriter):
@@ -39,49 +40,73 @@ class XMLWriter(ReportWriter):
     #   (Other than this class, the nark code authors are either:
     #    landonb (2018-2020); or elbenfreund (2015-2017).)
 
-    def __init__(self, *args, **kwargs):
-        """Setup the writer including a main xml document."""
+    def __init__(self, *args, streaming=False, **kwargs):
+        """
+        Setup the writer including a main xml document.
+
+        Args:
+            streaming (bool): If True, write each element as it arrives, using
+                an XMLGenerator, rather than building a DOM of the complete
+                document and writing it all at the end. The output is the same
+                XML (though perhaps not byte-for-byte, e.g., attribute quoting
+                may differ), but the memory used does not grow with its size.
+        """
         kwargs["output_b"] = True
         super(XMLWriter, self).__init__(*args, **kwargs)
+        self.streaming = streaming
 
     def start_document(self, element_name):
+        if self.streaming:
+            self.generator = saxutils.XMLGenerator(
+                self.output_file,
+                encoding="utf-8",
+                short_empty_elements=True,
+            )
+            self.generator.startDocument()
+            self.generator.startElement(element_name, {})
+            self.element_name = element_name
+            return
+
         # Profiling: load Document: ~ 0.004 secs.
         self.document = minidom.Document()
         self.fact_list = self.document.createElement(element_name)
 
+    def write_element(self, attrs):
+        """Write a new fact element, or append it to ``fact_list``."""
+        if self.streaming:
+            self.generator.startElement("fact", attrs)
+            self.generator.endElement("fact")
+            return
+
+        elem = self.document.createElement("fact")
+        for name, value in attrs.items():
+            elem.setAttribute(name, value)
+        self.fact_list.appendChild(elem)
+
     def write_facts(self, facts):
         self.start_document("facts")
         return super(XMLWriter, self).write_facts(facts)
 
     def _write_fact(self, idx, fact):
-        """
-        Create new fact element and populate attributes.
-
-        Once the child is prepared append it to ``fact_list``.
-        """
-        elem = self.document.createElement("fact")
-        elem.setAttribute("start", fact.start_fmt(self.datetime_format))
-        elem.setAttribute("end", fact.end_fmt(self.datetime_format))
-        elem.setAttribute("activity", fact.activity_name)
-        elem.setAttribute("duration", fact.format_delta(style=self.duration_fmt))
-        elem.setAttribute("category", fact.category_name)
-        elem.setAttribute("description", fact.description_or_empty)
-        self.fact_list.appendChild(elem)
+        """Create new fact element and populate attributes."""
+        attrs = {
+            "start": fact.start_fmt(self.datetime_format),
+            "end": fact.end_fmt(self.datetime_format),
+            "activity": fact.activity_name,
+            "duration": fact.format_delta(style=self.duration_fmt),
+            "category": fact.category_name,
+            "description": fact.description_or_empty,
+        }
+        self.write_element(attrs)
 
     def write_report(self, table, headers, tabulation=None):
         self.start_document("results")
         return super(XMLWriter, self).write_report(table, headers, tabulation)
 
     def _write_result(self, row, headers, tabulation=None):
-        """
-        Create new fact element and populate attributes.
-
-        Once the child is prepared append it to ``fact_list``.
-        """
-        fact = self.document.createElement("fact")
-        for idx, header in enumerate(headers):
-            fact.setAttribute(header, row[idx])
-        self.fact_list.appendChild(fact)
+        """Create new fact element and populate attributes."""
+        attrs = {header: row[idx] for idx, header in enumerate(headers)}
+        self.write_element(attrs)
 
     def _close(self):
         """
@@ -89,7 +114,10 @@ class XMLWriter(ReportWriter):
 
         ``toxml`` should take care of encoding everything with UTF-8.
         """
-
-        self.document.appendChild(self.fact_list)
-        self.output_file.write(self.document.toxml(encoding="utf-8"))
+        if self.streaming:
+            self.generator.endElement(self.element_name)
+            self.generator.endDocument()
+        else:
+            self.document.appendChild(self.fact_list)
+            self.output_file.write(self.document.toxml(encoding="utf-8"))
         return super(XMLWriter, self)._close()
@@ -88,7 +88,6 @@ def alchemy_runner(request):
     """
     engine = create_engine("sqlite:///:memory:")
     implement_transactional_support_fully(engine)
-    objects.metadata.bind = engine
     objects.metadata.create_all(engine)
     common.Session.configure(bind=engine)
 
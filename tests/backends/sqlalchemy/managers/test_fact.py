@@ -21,8 +21,36 @@ import datetime
 
 import pytest
 from freezegun import freeze_time
-
-from nark.backends.sqlalchemy.objects import AlchemyActivity, AlchemyFact, AlchemyTag
+from sqlalchemy import event, select
+
+from nark.backends.sqlalchemy.objects import (
+    AlchemyActivity,
+    AlchemyFact,
+    AlchemyTag,
+    facts,
+    facts_archive,
+)
+from nark.managers.fact_window import FactWindowCache
+from nark.managers.query_terms import QueryTerms
+
+
+def count_statements(alchemy_store, func, *args, **kwargs):
+    """Returns the result of calling func, and the number of statements it ran."""
+    statements = []
+
+    def trace_statement(conn, cursor, statement, parameters, context, many):
+        statements.append(statement)
+
+    # Start from a Session without loaded items, so that nothing is cached.
+    alchemy_store.session.flush()
+    alchemy_store.session.expire_all()
+    engine = alchemy_store.session.get_bind()
+    event.listen(engine, "before_cursor_execute", trace_statement)
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        event.remove(engine, "before_cursor_execute", trace_statement)
+    return result, len(statements)
 
 
 class TestFactManager:
@@ -139,6 +167,59 @@ class TestFactManager:
 
     # ***
 
+    def test_add_many_new_facts(self, alchemy_store, fact):
+        """Verify add_many adds Facts, sharing new Activities and Tags."""
+        start = datetime.datetime(2020, 1, 1, 10, 0, 0)
+        delta = datetime.timedelta(hours=1)
+        facts = []
+        for idx in range(3):
+            new_fact = fact.copy(include_pk=False)
+            new_fact.start = start + (delta * idx)
+            new_fact.end = new_fact.start + delta
+            facts.append(new_fact)
+        results = alchemy_store.facts.add_many(facts)
+        assert [err for new_fact, err in results] == [None, None, None]
+        new_facts = [new_fact for new_fact, err in results]
+        assert all(new_fact.pk for new_fact in new_facts)
+        assert alchemy_store.session.query(AlchemyFact).count() == 3
+        assert alchemy_store.session.query(AlchemyActivity).count() == 1
+        assert alchemy_store.session.query(AlchemyTag).count() == len(fact.tags)
+        for new_fact, old_fact in zip(new_facts, facts):
+            stored = alchemy_store.facts.get(new_fact.pk)
+            assert stored.start == old_fact.start
+            assert stored.activity.name == fact.activity.name
+            assert stored.tagnames() == fact.tagnames()
+
+    def test_add_many_reports_errors(self, alchemy_store, alchemy_fact, fact):
+        """Verify add_many reports bad Facts without aborting the batch."""
+        delta = datetime.timedelta(hours=1)
+
+        def new_fact(start, end, pk=None):
+            new_fact = fact.copy(include_pk=False)
+            new_fact.pk = pk
+            new_fact.start = start
+            new_fact.end = end
+            return new_fact
+
+        after = alchemy_fact.end
+        batch = [
+            # Overlaps the stored Fact.
+            new_fact(alchemy_fact.start, alchemy_fact.end),
+            # Has a PK.
+            new_fact(after, after + delta, pk=123),
+            # Valid.
+            new_fact(after, after + delta),
+            # Overlaps the previous Fact in the batch.
+            new_fact(after, after + (delta / 2)),
+            # Ends before it starts.
+            new_fact(after + delta, after),
+        ]
+        results = alchemy_store.facts.add_many(batch)
+        errs = [bool(err) for new_fact, err in results]
+        assert errs == [True, True, False, True, True]
+        assert results[2][0].pk
+        assert alchemy_store.session.query(AlchemyFact).count() == 2
+
     def test_update_respects_tags(self, alchemy_store, alchemy_fact, new_fact_values):
         """Make sure that updating sets tags as expected."""
         fact = alchemy_fact.as_hamster(alchemy_store)
@@ -278,6 +359,42 @@ class TestFactManager:
 
     # ***
 
+    def test_start_end_stored_canonical(self, alchemy_store, alchemy_fact):
+        """Verify Fact times are stored "YYYY-MM-DD HH:MM:SS" (sans micros)."""
+        stored = alchemy_store.session.execute(
+            "SELECT start_time, end_time FROM facts WHERE id = :pk",
+            {"pk": alchemy_fact.pk},
+        ).fetchone()
+        assert stored[0] == alchemy_fact.start.strftime("%Y-%m-%d %H:%M:%S")
+        assert stored[1] == alchemy_fact.end.strftime("%Y-%m-%d %H:%M:%S")
+
+    def test_starting_at_query_uses_index(self, alchemy_store, alchemy_fact):
+        """Verify time comparisons do not defeat the facts time indexes."""
+        fact = alchemy_fact.as_hamster(alchemy_store)
+        statements = []
+
+        def trace_statement(conn, cursor, statement, parameters, context, many):
+            if statement.lstrip().startswith("SELECT"):
+                statements.append((statement, parameters))
+
+        engine = alchemy_store.session.get_bind()
+        event.listen(engine, "before_cursor_execute", trace_statement)
+        try:
+            alchemy_store.facts.starting_at(fact)
+        finally:
+            event.remove(engine, "before_cursor_execute", trace_statement)
+        assert statements
+        statement, parameters = statements[0]
+        plan = alchemy_store.session.connection().exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + statement, parameters
+        )
+        details = " ".join(row[-1] for row in plan)
+        # (SQLite may pick either time index, absent ANALYZE stats.)
+        assert "SEARCH facts USING INDEX ix_facts_deleted_" in details
+        assert "SCAN facts" not in details
+
+    # ***
+
     @pytest.mark.parametrize("send_fact", (False, "closed", "active"))
     def test_antecedent(self, alchemy_store, set_of_alchemy_facts_active, send_fact):
         """Verify FactManager.antecedent works with various reference input."""
@@ -316,6 +433,262 @@ class TestFactManager:
 
     # ***
 
+    @pytest.mark.parametrize("interval_index", (False, True))
+    def test_window_matches_antecedent_and_subsequent(
+        self, alchemy_store, set_of_alchemy_facts_active, interval_index
+    ):
+        """Verify FactManager.window finds what antecedent and subsequent do."""
+        alchemy_store.config["db.interval_index"] = interval_index
+        facts = [
+            alchemy_fact.as_hamster(alchemy_store)
+            for alchemy_fact in set_of_alchemy_facts_active
+        ]
+        for idx, fact in enumerate(facts):
+            expect = []
+            neighbor = fact
+            while len(expect) < 2:
+                neighbor = alchemy_store.facts.antecedent(neighbor)
+                if neighbor is None:
+                    break
+                expect.insert(0, neighbor)
+            expect.append(fact)
+            neighbor = fact
+            while len(expect) < idx + 5:
+                neighbor = alchemy_store.facts.subsequent(neighbor)
+                if neighbor is None:
+                    break
+                expect.append(neighbor)
+            results = alchemy_store.facts.window(fact, before=2, after=5)
+            assert results == expect
+            assert results == facts[max(0, idx - 2) : idx + 6]
+        # Reference a time between Facts.
+        ref_time = facts[2].end
+        results = alchemy_store.facts.window(ref_time, before=1, after=1)
+        assert results == facts[2:4]
+
+    @pytest.mark.parametrize("interval_index", (False, True))
+    def test_window_around_deleted_fact(
+        self, alchemy_store, set_of_alchemy_facts_active, interval_index
+    ):
+        """Verify a deleted reference Fact is not in its window, nor cached."""
+        alchemy_store.config["db.interval_index"] = interval_index
+        set_of_alchemy_facts_active[2].deleted = True
+        alchemy_store.session.flush()
+        facts = [
+            alchemy_fact.as_hamster(alchemy_store)
+            for alchemy_fact in set_of_alchemy_facts_active
+        ]
+        deleted = facts[2]
+        results = alchemy_store.facts.window(deleted, before=1, after=1)
+        assert results == [facts[1], facts[3]]
+        assert results == [
+            alchemy_store.facts.antecedent(deleted),
+            alchemy_store.facts.subsequent(deleted),
+        ]
+        cache = FactWindowCache(alchemy_store.facts, page_size=2)
+        assert cache.subsequent(deleted) == facts[3]
+        assert cache.antecedent(deleted) == facts[1]
+        assert deleted.pk not in cache.positions
+        assert cache.cached == [facts[0], facts[1], facts[3], facts[4]]
+
+    def test_window_uses_one_query(self, alchemy_store, set_of_alchemy_facts):
+        """Verify FactManager.window loads the Activities and Tags, too."""
+        fact = set_of_alchemy_facts[2].as_hamster(alchemy_store)
+        alchemy_store.session.expire_all()
+        statements = []
+
+        def trace_statement(conn, cursor, statement, parameters, context, many):
+            statements.append(statement)
+
+        engine = alchemy_store.session.get_bind()
+        event.listen(engine, "before_cursor_execute", trace_statement)
+        try:
+            results = alchemy_store.facts.window(fact, before=2, after=2)
+        finally:
+            event.remove(engine, "before_cursor_execute", trace_statement)
+        assert len(results) == 5
+        assert len(statements) == 1
+
+    def test_window_cache_prefetches_pages(
+        self, alchemy_store, set_of_alchemy_facts_active, mocker
+    ):
+        """Verify FactWindowCache steps through Facts using one query per page."""
+        facts = [
+            alchemy_fact.as_hamster(alchemy_store)
+            for alchemy_fact in set_of_alchemy_facts_active
+        ]
+        mocker.spy(alchemy_store.facts, "window")
+        cache = FactWindowCache(alchemy_store.facts, page_size=2)
+        stepped = [facts[0]]
+        while True:
+            subsequent = cache.subsequent(stepped[-1])
+            if subsequent is None:
+                break
+            stepped.append(subsequent)
+        assert stepped == facts
+        # The window around facts[0] has 3 Facts, and the window around facts[2]
+        # has all 5. But that window has exactly 2 Facts after facts[2], so it's
+        # not known if there are more, until the window around facts[4].
+        assert alchemy_store.facts.window.call_count == 3
+        assert cache.antecedent(facts[-1]) == facts[-2]
+        assert alchemy_store.facts.window.call_count == 3
+        assert cache.antecedent(facts[0]) is None
+        assert alchemy_store.facts.window.call_count == 4
+
+    # ***
+
+    def test_histories_walk_each_chain(self, alchemy_store, set_of_alchemy_facts):
+        """Verify FactManager.histories finds every edit, before and after."""
+        fact = set_of_alchemy_facts[0].as_hamster(alchemy_store)
+        edits = [fact.pk]
+        # Commit just once, lest the test escape the fixture's savepoint.
+        with alchemy_store.transaction():
+            for idx in range(3):
+                fact.description = "edit {}".format(idx)
+                fact = alchemy_store.facts._update(fact)
+                edits.append(fact.pk)
+        other = set_of_alchemy_facts[1].as_hamster(alchemy_store)
+        middle = alchemy_store.facts.get(edits[1], deleted=True)
+        histories, n_statements = count_statements(
+            alchemy_store, alchemy_store.facts.histories, [middle, other, fact]
+        )
+        assert [[fact.pk for fact in history] for history in histories] == [
+            edits,
+            [other.pk],
+            edits,
+        ]
+        assert [fact.deleted for fact in histories[0]] == [True, True, True, False]
+        assert histories[0][-1].description == "edit 2"
+        assert all(len(fact.tags) == 4 for fact in histories[0])
+        # One query for the Facts (the recursive CTE), and one for the Tags.
+        assert n_statements == 2
+        assert alchemy_store.facts.history(middle) == histories[0]
+
+    def test_histories_fails_pk_none(self, alchemy_store, fact):
+        """Verify FactManager.histories requires stored Facts."""
+        with pytest.raises(ValueError):
+            alchemy_store.facts.history(fact)
+        assert alchemy_store.facts.histories([]) == []
+
+    # ***
+
+    def test_archive_moves_deleted_facts(self, alchemy_store, set_of_alchemy_facts):
+        """Verify FactManager.archive moves deleted Facts, which are still found."""
+        fact = set_of_alchemy_facts[0].as_hamster(alchemy_store)
+        removed = set_of_alchemy_facts[1].as_hamster(alchemy_store)
+        edits = [fact.pk]
+        # Commit just once, lest the test escape the fixture's savepoint.
+        with alchemy_store.transaction():
+            for idx in range(2):
+                fact.description = "edit {}".format(idx)
+                fact = alchemy_store.facts._update(fact)
+                edits.append(fact.pk)
+            alchemy_store.facts.remove(removed)
+            assert alchemy_store.facts.archive() == 3
+            assert alchemy_store.facts.archive() == 0
+        session = alchemy_store.session
+        assert session.execute(select(facts.c.id).where(facts.c.deleted)).all() == []
+        archived_pks = session.execute(select(facts_archive.c.id)).scalars().all()
+        assert sorted(archived_pks) == sorted(edits[:-1] + [removed.pk])
+        # The live queries skip the archive, but not those for deleted Facts.
+        assert len(alchemy_store.facts.get_all()) == 4
+        assert len(alchemy_store.facts.get_all(deleted=True)) == 3
+        assert len(alchemy_store.facts.get_all(deleted=None)) == 7
+        assert alchemy_store.facts.get(removed.pk).deleted
+        with pytest.raises(KeyError):
+            alchemy_store.facts.get(removed.pk, deleted=False)
+        history = alchemy_store.facts.history(fact)
+        assert [fact.pk for fact in history] == edits
+        assert all(len(fact.tags) == 4 for fact in history)
+        qt = QueryTerms(deleted=True, match_tags=[removed.tags[0].name])
+        assert [fact.pk for fact in alchemy_store.facts.gather(qt)] == [removed.pk]
+
+    def test_archive_pks_not_reused(self, alchemy_store, set_of_alchemy_facts):
+        """Verify a new Fact is never assigned an archived Fact's PK."""
+        first, removed, latest = [
+            alchemy_fact.as_hamster(alchemy_store)
+            for alchemy_fact in sorted(set_of_alchemy_facts, key=lambda fact: fact.pk)
+        ][-3:]
+        # (The latest Fact is active, so add the new Facts after it starts.)
+        since = latest.start
+        with alchemy_store.transaction():
+            alchemy_store.facts.remove(removed)
+            assert alchemy_store.facts.archive() == 1
+            # Purge the highest PK, so that it's not in either table.
+            alchemy_store.facts.remove(latest, purge=True)
+            new_facts = []
+            for hours in (1, 3):
+                fact = first.copy(include_pk=False)
+                fact.start = since + datetime.timedelta(hours=hours)
+                fact.end = fact.start + datetime.timedelta(hours=1)
+                new_facts.append(fact)
+            # Add one Fact using the ORM insert, and one using add_many's PKs.
+            added = [alchemy_store.facts.save(new_facts[0])]
+            added += [
+                fact for fact, _err in alchemy_store.facts.add_many(new_facts[1:])
+            ]
+            assert removed.pk not in [fact.pk for fact in added]
+            # Archiving again only moves the Tag links of the Facts it archives.
+            alchemy_store.facts.remove(first)
+            assert alchemy_store.facts.archive() == 1
+        for fact in added:
+            assert len(alchemy_store.facts.get(fact.pk).tags) == 4
+        assert alchemy_store.facts.get(removed.pk, deleted=True).pk == removed.pk
+
+    def test_archive_deleted_on_update(self, alchemy_store, set_of_alchemy_facts):
+        """Verify db.archive_deleted archives each Fact as it is edited."""
+        alchemy_store.config["db.archive_deleted"] = True
+        fact = set_of_alchemy_facts[0].as_hamster(alchemy_store)
+        fact.description = "edited"
+        new_fact = alchemy_store.facts._update(fact)
+        session = alchemy_store.session
+        assert session.query(AlchemyFact).get(fact.pk) is None
+        archived = alchemy_store.facts.get(fact.pk, deleted=True)
+        assert archived.description == set_of_alchemy_facts[0].description
+        assert len(archived.tags) == 4
+        assert alchemy_store.facts.history(new_fact)[0] == archived
+
+    # ***
+
+    def test_strictly_during_loads_related_in_batch(
+        self, alchemy_store, set_of_alchemy_facts
+    ):
+        """Verify FactManager.strictly_during does not query once per Fact."""
+        results, n_statements = count_statements(
+            alchemy_store,
+            alchemy_store.facts.strictly_during,
+            since=set_of_alchemy_facts[0].start,
+            until=set_of_alchemy_facts[-1].start,
+        )
+        assert len(results) == 5
+        assert all(len(fact.tags) == 4 for fact in results)
+        # One query for the Facts (joined with Activities and Categories),
+        # and one query for all their Tags.
+        assert n_statements == 2
+
+    @pytest.mark.parametrize(
+        "method", ("antecedent", "subsequent", "surrounding", "endless", "get")
+    )
+    def test_finders_load_related_in_batch(
+        self, alchemy_store, set_of_alchemy_facts_active, method
+    ):
+        """Verify the Fact finders each fetch Facts with a fixed number of queries."""
+        fact = set_of_alchemy_facts_active[2].as_hamster(alchemy_store)
+        if method == "surrounding":
+            args = (fact.start + datetime.timedelta(minutes=5),)
+        elif method == "endless":
+            args = ()
+        elif method == "get":
+            args = (fact.pk,)
+        else:
+            args = (fact,)
+        finder = getattr(alchemy_store.facts, method)
+        result, n_statements = count_statements(alchemy_store, finder, *args)
+        results = result if isinstance(result, list) else [result]
+        assert len(results) == 1
+        assert len(results[0].tags) == 4
+        assert n_statements == 2
+
     def test_strictly_during(self, alchemy_store, set_of_alchemy_facts):
         """Verify FactManager.strictly_during finds a range of Facts."""
         assert len(set_of_alchemy_facts) == 5
@@ -108,3 +108,27 @@ class TestGatherBaseAlchemyManager:
         mocker.patch.object(alchemy_store.logger, "warning")
         alchemy_store.activities.get_all()
         assert alchemy_store.logger.warning.called
+
+    def test_get_all_pages_by_cursor(self, alchemy_store, set_of_alchemy_facts):
+        expect = alchemy_store.activities.get_all(
+            sort_cols=["name"], include_stats=True
+        )
+        qt = QueryTerms(include_stats=True, limit=2)
+        results = alchemy_store.activities.gather(qt)
+        qt.after = qt.cursor_next
+        results += alchemy_store.activities.gather(qt)
+        qt.after = qt.cursor_next
+        results += alchemy_store.activities.gather(qt)
+        assert qt.cursor_next is None
+        assert [act.pk for act, *aggs in results] == [act.pk for act, *aggs in expect]
+
+    def test_get_all_cursor_invalid(self, alchemy_store, set_of_alchemy_facts):
+        with pytest.raises(ValueError):
+            alchemy_store.activities.get_all(after="not-a-cursor")
+        # A cursor from one sort cannot be used with another.
+        qt = QueryTerms(limit=2)
+        alchemy_store.facts.gather(qt)
+        with pytest.raises(ValueError):
+            alchemy_store.activities.get_all(after=qt.cursor_next)
+        with pytest.raises(ValueError):
+            alchemy_store.activities.get_all(after=qt.cursor_next, sort_cols=["usage"])
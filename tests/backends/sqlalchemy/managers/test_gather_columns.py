@@ -0,0 +1,154 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# Copyright © 2015-2016 Eric Goller
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+import datetime
+
+import pytest
+
+from nark.backends.sqlalchemy.managers.gather_fact import GatherFactManager
+from nark.managers.query_terms import QueryTerms
+
+
+@pytest.fixture
+def set_of_grouped_alchemy_facts(
+    alchemy_store,
+    alchemy_activity_factory,
+    alchemy_category_factory,
+    alchemy_fact_factory,
+    alchemy_tag_factory,
+):
+    """Provide Facts that share Activities, Categories, and Tags."""
+    category = alchemy_category_factory()
+    activities = [
+        alchemy_activity_factory(name="foo", category=category),
+        alchemy_activity_factory(name="bar", category=category),
+        alchemy_activity_factory(name="foo"),
+    ]
+    tags = [alchemy_tag_factory(), alchemy_tag_factory()]
+    start = datetime.datetime(2020, 1, 6, 9, 0, 0)
+    facts = []
+    for idx in range(12):
+        fact_start = start + datetime.timedelta(days=idx // 2, hours=(idx % 2) * 3)
+        fact = alchemy_fact_factory(
+            start=fact_start,
+            end=fact_start + datetime.timedelta(minutes=20 * (idx + 1)),
+            activity=activities[idx % len(activities)],
+        )
+        fact.tags = tags[: idx % 3]
+        facts.append(fact)
+    alchemy_store.session.flush()
+    return facts
+
+
+class TestFactColumns:
+    """"""
+
+    @pytest.mark.parametrize(
+        "group_by",
+        (
+            {},
+            {"group_activity": True},
+            {"group_category": True},
+            {"group_activity": True, "group_category": True},
+            {"group_tags": True},
+            {"group_days": True},
+            {"group_activity": True, "group_days": True},
+            {"group_category": True, "group_tags": True},
+        ),
+    )
+    def test_aggregate_matches_gather(
+        self, alchemy_store, set_of_grouped_alchemy_facts, group_by
+    ):
+        qt = QueryTerms(include_stats=True, named_tuples=True, **group_by)
+        expect = alchemy_store.facts.gather(qt)
+        columns = alchemy_store.facts.gather_columns(qt)
+        assert len(columns) == len(set_of_grouped_alchemy_facts)
+        results = columns.aggregate(qt)
+        assert len(results) == len(expect)
+        assert isinstance(results[0], GatherFactManager.FactStatsTuple)
+
+        def comparable(result):
+            return (
+                round(result.duration, 6),
+                result.group_count,
+                result.first_start,
+                result.final_end,
+                result.activities,
+                result.actegories,
+                result.categories,
+                # The start_date is that of an arbitrary Fact unless grouping by day.
+                result.start_date if qt.group_days else None,
+                result.fact.activity_name,
+                result.fact.category_name,
+                sorted((tag.name, tag.freq) for tag in result.fact.tags),
+            )
+
+        assert sorted(map(comparable, results), key=repr) == sorted(
+            map(comparable, expect), key=repr
+        )
+
+    def test_aggregate_many_reports_from_one_fetch(
+        self, alchemy_store, set_of_grouped_alchemy_facts
+    ):
+        columns = alchemy_store.facts.gather_columns(QueryTerms())
+        by_day = columns.aggregate(QueryTerms(include_stats=True), group_period="day")
+        by_week = columns.aggregate(QueryTerms(include_stats=True), group_period="week")
+        by_month = columns.aggregate(
+            QueryTerms(include_stats=True), group_period="month"
+        )
+        i_count = GatherFactManager.RESULT_GRP_INDEX["group_count"] + 1
+        i_start_date = GatherFactManager.RESULT_GRP_INDEX["start_date"] + 1
+        assert [row[i_count] for row in by_day] == [2] * 6
+        # 2020-01-06 is a Monday, and the Facts run through Saturday.
+        assert [(row[i_start_date], row[i_count]) for row in by_week] == [
+            ("2020-01-06", 12)
+        ]
+        assert [(row[i_start_date], row[i_count]) for row in by_month] == [
+            ("2020-01-01", 12)
+        ]
+
+    def test_aggregate_sort_limit(self, alchemy_store, set_of_grouped_alchemy_facts):
+        qt = QueryTerms(
+            include_stats=True,
+            named_tuples=True,
+            group_activity=True,
+            group_category=True,
+            sort_cols=["time"],
+            sort_orders=["desc"],
+            limit=2,
+        )
+        results = alchemy_store.facts.gather_columns(qt).aggregate(qt)
+        assert len(results) == 2
+        assert results[0].duration >= results[1].duration
+        expect = alchemy_store.facts.gather(qt)
+        assert [result.duration for result in results] == pytest.approx(
+            [result.duration for result in expect]
+        )
+
+    def test_aggregate_facts_only(self, alchemy_store, set_of_grouped_alchemy_facts):
+        qt = QueryTerms(group_category=True)
+        results = alchemy_store.facts.gather_columns(qt).aggregate(qt)
+        assert sorted(fact.category_name or "" for fact in results) == sorted(
+            fact.category_name or "" for fact in alchemy_store.facts.gather(qt)
+        )
+
+    def test_aggregate_unknown_group_period(self, alchemy_store):
+        columns = alchemy_store.facts.gather_columns(QueryTerms())
+        with pytest.raises(ValueError):
+            columns.aggregate(QueryTerms(), group_period="fortnight")
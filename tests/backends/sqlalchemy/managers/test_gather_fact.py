@@ -18,6 +18,7 @@
 # or visit <http://www.gnu.org/licenses/>.
 
 import datetime
+import types
 
 import pytest
 
@@ -26,6 +27,7 @@ from nark.backends.sqlalchemy.managers.gather_fact import GatherFactManager
 from nark.backends.sqlalchemy.objects import AlchemyFact
 from nark.items.fact import Fact
 from nark.items.tag import Tag
+from nark.managers.query_terms import QueryTerms
 
 
 class TestGatherFactManager:
@@ -47,6 +49,24 @@ class TestGatherFactManager:
         #   assert len(results) == alchemy_store.session.query(AlchemyFact).count()
         assert isinstance(results[0], AlchemyFact)
 
+    @pytest.mark.parametrize("chunk_size", (1, 2, 1000))
+    def test_iter_gather_streams_chunks(
+        self, set_of_alchemy_facts, alchemy_store, chunk_size
+    ):
+        expect = alchemy_store.facts.gather(QueryTerms())
+        results = alchemy_store.facts.iter_gather(QueryTerms(), chunk_size=chunk_size)
+        assert isinstance(results, types.GeneratorType)
+        results = list(results)
+        assert len(results) == len(set_of_alchemy_facts)
+        assert [str(fact) for fact in results] == [str(fact) for fact in expect]
+        assert isinstance(results[0], Fact)
+
+    def test_iter_gather_include_stats(self, set_of_alchemy_facts, alchemy_store):
+        qt = QueryTerms(include_stats=True, named_tuples=True)
+        results = list(alchemy_store.facts.iter_gather(qt, chunk_size=2))
+        assert len(results) == len(set_of_alchemy_facts)
+        assert isinstance(results[0], GatherFactManager.FactStatsTuple)
+
     @pytest.mark.parametrize(
         ("start_filter", "end_filter"),
         (
@@ -281,6 +301,16 @@ class TestGatherFactManager:
         # Because raw=True, the Tag objects were recreated, but without PKs.
         assert not fact_0.tags[0].pk
 
+    def test_get_all_raw_tags_not_pending(self, alchemy_store, set_of_alchemy_facts):
+        """Make sure the PK-less Tags of raw results are not Session changes."""
+        alchemy_store.session.flush()
+        results = alchemy_store.facts.get_all(include_stats=True, raw=True)
+        assert not results[0][0].tags[0].pk
+        session = alchemy_store.session
+        assert not (session.new or session.dirty)
+        # And the next query's autoflush does not INSERT the PK-less Tags.
+        assert session.query(AlchemyFact).count() == 5
+
     def test__get_all_by_pk_with_stats_named(self, alchemy_store, set_of_alchemy_facts):
         """Verify QueryTerms.named_tuples returns attribute-accessible results."""
         assert len(set_of_alchemy_facts) == 5
@@ -302,6 +332,45 @@ class TestGatherFactManager:
         assert len(results) == 2
         assert results == set_of_alchemy_facts[2:4]
 
+    @pytest.mark.parametrize("sort_orders", ([], ["desc"]))
+    def test_gather_pages_by_cursor(
+        self, alchemy_store, set_of_alchemy_facts_active, sort_orders
+    ):
+        """Ensure paging after and before cursors visits each Fact once."""
+        expect = alchemy_store.facts.gather(
+            QueryTerms(sort_cols=["start"], sort_orders=sort_orders)
+        )
+        assert len(expect) == 5
+        qt = QueryTerms(sort_orders=sort_orders, limit=2)
+        pages = []
+        while True:
+            pages.append(alchemy_store.facts.gather(qt))
+            if not qt.cursor_next:
+                break
+            qt.after = qt.cursor_next
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert [fact.pk for page in pages for fact in page] == [
+            fact.pk for fact in expect
+        ]
+        # Page backwards from the final page.
+        qt.after = None
+        qt.before = qt.cursor_prev
+        results = alchemy_store.facts.gather(qt)
+        assert [fact.pk for fact in results] == [fact.pk for fact in pages[1]]
+        qt.before = qt.cursor_prev
+        results = alchemy_store.facts.gather(qt)
+        assert [fact.pk for fact in results] == [fact.pk for fact in pages[0]]
+        assert qt.cursor_prev is None
+
+    def test_gather_cursor_raises_when_grouped(
+        self, alchemy_store, set_of_alchemy_facts
+    ):
+        qt = QueryTerms(limit=2)
+        alchemy_store.facts.gather(qt)
+        qt = QueryTerms(after=qt.cursor_next, group_activity=True)
+        with pytest.raises(ValueError):
+            alchemy_store.facts.gather(qt)
+
     # ***
 
     def test__get_all_fails_on_unsupported_store(self, controller, alchemy_store):
@@ -0,0 +1,125 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+import datetime
+
+import pytest
+
+from nark.items.category import Category
+
+
+@pytest.fixture
+def facts_sharing_items(
+    alchemy_store,
+    alchemy_activity_factory,
+    alchemy_fact_factory,
+    alchemy_tag_factory,
+):
+    """Provide Facts that all share the same Activity, Category, and Tag."""
+    activity = alchemy_activity_factory()
+    tag = alchemy_tag_factory()
+    start = datetime.datetime(2020, 1, 1, 9, 0, 0)
+    facts = []
+    for idx in range(3):
+        fact_start = start + datetime.timedelta(hours=idx)
+        fact = alchemy_fact_factory(
+            activity=activity,
+            start=fact_start,
+            end=fact_start + datetime.timedelta(minutes=30),
+        )
+        fact.tags = [tag]
+        facts.append(fact)
+    alchemy_store.session.flush()
+    return facts
+
+
+class TestIdentityCache(object):
+    """Test the Activity, Category, and Tag IdentityCache."""
+
+    def test_hydrated_facts_share_items(self, alchemy_store, facts_sharing_items):
+        """Make sure Facts share their Activity, Category, and Tag instances."""
+        results = alchemy_store.facts.get_all(lazy_tags=True)
+        assert len(results) == 3
+        activities = set(id(fact.activity) for fact in results)
+        categories = set(id(fact.activity.category) for fact in results)
+        tags = set(id(tag) for fact in results for tag in fact.tags)
+        assert len(activities) == len(categories) == len(tags) == 1
+        activity = results[0].activity
+        assert alchemy_store.activities.get(activity.pk) is activity
+        category = alchemy_store.categories.get_by_name(activity.category.name)
+        assert category is activity.category
+
+    def test_get_by_name_cached(self, alchemy_store, alchemy_category, mocker):
+        """Make sure the second lookup by name does not query the database."""
+        first = alchemy_store.categories.get_by_name(alchemy_category.name)
+        query = mocker.spy(alchemy_store.session, "query")
+        second = alchemy_store.categories.get_by_name(alchemy_category.name)
+        assert second is first
+        assert query.call_count == 0
+        raw = alchemy_store.categories.get_by_name(alchemy_category.name, raw=True)
+        assert raw is alchemy_category
+
+    def test_get_by_composite_cached(self, alchemy_store, alchemy_activity, mocker):
+        """Make sure the second lookup by composite key does not query."""
+        name, category = alchemy_activity.name, alchemy_activity.category
+        first = alchemy_store.activities.get_by_composite(name, category)
+        query = mocker.spy(alchemy_store.session, "query")
+        second = alchemy_store.activities.get_by_composite(name, category)
+        assert second is first
+        assert query.call_count == 0
+
+    def test_update_category_forgets_items(self, alchemy_store, alchemy_activity):
+        """Make sure updating a Category evicts it, and its Activities."""
+        activity = alchemy_store.activities.get(alchemy_activity.pk)
+        category = alchemy_store.categories.get_by_name(activity.category.name)
+        old_name = category.name
+        edited = Category("{}-renamed".format(old_name), pk=category.pk)
+        alchemy_store.categories._update(edited)
+        with pytest.raises(KeyError):
+            alchemy_store.categories.get_by_name(old_name)
+        renamed = alchemy_store.activities.get(alchemy_activity.pk)
+        assert renamed is not activity
+        assert renamed.category.name == edited.name
+
+    def test_remove_tag_forgets_item(self, alchemy_store, alchemy_tag):
+        """Make sure removing a Tag evicts it."""
+        tag = alchemy_store.tags.get(alchemy_tag.pk)
+        alchemy_store.tags.remove(tag)
+        with pytest.raises(KeyError):
+            alchemy_store.tags.get(tag.pk)
+        with pytest.raises(KeyError):
+            alchemy_store.tags.get_by_name(tag.name)
+
+    def test_edited_item_not_shared(self, alchemy_store, alchemy_tag):
+        """Make sure an item the caller edits is not returned from the cache."""
+        tag = alchemy_store.tags.get(alchemy_tag.pk)
+        tag.name = "not-{}".format(tag.name)
+        fresh = alchemy_store.tags.get(alchemy_tag.pk)
+        assert fresh is not tag
+        assert fresh.name == alchemy_tag.name
+
+    def test_cache_bounded(self, alchemy_store, alchemy_tag_factory, mocker):
+        """Make sure the cache evicts the least recently used items."""
+        cache = alchemy_store.tags.identity_cache
+        mocker.patch.object(cache, "maxsize", 2)
+        alchemy_tags = [alchemy_tag_factory() for idx in range(3)]
+        for alchemy_tag in alchemy_tags:
+            alchemy_store.tags.get(alchemy_tag.pk)
+        assert len(cache) == 2
+        assert cache.get(alchemy_tags[0].pk) is None
+        assert cache.get(alchemy_tags[2].pk) is not None
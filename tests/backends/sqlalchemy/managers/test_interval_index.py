@@ -0,0 +1,256 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+import datetime
+
+import pytest
+from sqlalchemy import event
+
+from nark.backends.sqlalchemy import objects
+from nark.backends.sqlalchemy.managers.interval_index import IntervalIndex
+from nark.items.activity import Activity
+from nark.items.fact import Fact
+
+
+def at(hours):
+    return datetime.datetime(2020, 1, 1, 9, 0, 0) + datetime.timedelta(hours=hours)
+
+
+@pytest.fixture
+def empty_store_after(alchemy_store):
+    """Empty the store after the test, for tests that commit more than once."""
+    yield
+    # See the same fixture in test_rollup_fact.py.
+    session = alchemy_store.session
+    session.rollback()
+    for table in reversed(objects.metadata.sorted_tables):
+        session.execute(table.delete())
+    session.commit()
+
+
+@pytest.fixture
+def interval_facts(alchemy_store, alchemy_fact_factory):
+    """Provide Facts with a gap, momentaneous, deleted, and active Facts."""
+    spans = [
+        (0, 1, False),
+        (1, 1, False),
+        (1, 1, False),
+        (1, 2, False),
+        (2, 3, True),
+        (3, 4, False),
+        (6, 8, False),
+        (8, 8, False),
+        (9, None, False),
+    ]
+    alchemy_facts = []
+    for start, end, deleted in spans:
+        alchemy_facts.append(
+            alchemy_fact_factory(
+                start=at(start),
+                end=at(end) if end is not None else None,
+                deleted=deleted,
+            )
+        )
+    return alchemy_facts
+
+
+def pk_or_none(fact):
+    return fact.pk if fact is not None else None
+
+
+class TestIntervalIndex(object):
+    """Test that the IntervalIndex answers the same as the FactManager queries."""
+
+    def compare(self, alchemy_store, func):
+        alchemy_store.config["db.interval_index"] = False
+        try:
+            expected = func()
+        except ValueError:
+            expected = ValueError
+        alchemy_store.config["db.interval_index"] = True
+        try:
+            result = func()
+        except ValueError:
+            result = ValueError
+        assert result == expected
+
+    def ref_times(self):
+        return [at(hours / 2.0) for hours in range(-1, 22)]
+
+    def test_antecedent_subsequent_by_time(self, alchemy_store, interval_facts):
+        """Test neighbor lookups by time match the queries."""
+        facts = alchemy_store.facts
+        for ref_time in self.ref_times():
+            self.compare(
+                alchemy_store,
+                lambda: pk_or_none(facts.antecedent(ref_time=ref_time)),
+            )
+            self.compare(
+                alchemy_store,
+                lambda: pk_or_none(facts.subsequent(ref_time=ref_time)),
+            )
+
+    def test_antecedent_subsequent_by_fact(self, alchemy_store, interval_facts):
+        """Test neighbor lookups by Fact, including momentaneous Facts, match."""
+        facts = alchemy_store.facts
+        for alchemy_fact in interval_facts:
+            fact = alchemy_fact.as_hamster(alchemy_store)
+            self.compare(alchemy_store, lambda: pk_or_none(facts.antecedent(fact)))
+            self.compare(alchemy_store, lambda: pk_or_none(facts.subsequent(fact)))
+
+    def test_surrounding(self, alchemy_store, interval_facts):
+        """Test surrounding, which raises if the time frame is broken, matches."""
+        facts = alchemy_store.facts
+        for ref_time in self.ref_times():
+            for inclusive in (False, True):
+                self.compare(
+                    alchemy_store,
+                    lambda: [
+                        fact.pk for fact in facts.surrounding(ref_time, inclusive)
+                    ],
+                )
+
+    def test_timeframe_available(self, alchemy_store, interval_facts):
+        """Test the overlap check matches, for closed and active Facts."""
+        facts = alchemy_store.facts
+        for since in self.ref_times():
+            for hours in (None, 0.5, 1, 3):
+                until = since + datetime.timedelta(hours=hours) if hours else None
+                fact = Fact(activity=None, start=since, end=until)
+                self.compare(
+                    alchemy_store,
+                    lambda: facts._timeframe_available_for_fact(fact),
+                )
+                ignore_pks = [interval_facts[3].pk, interval_facts[-1].pk]
+                self.compare(
+                    alchemy_store,
+                    lambda: facts._timeframe_available_for_fact(fact, ignore_pks),
+                )
+
+    def test_index_skips_queries(self, alchemy_store, interval_facts):
+        """Test that, once loaded, the index answers without querying."""
+        alchemy_store.config["db.interval_index"] = True
+        facts = alchemy_store.facts
+        assert facts.antecedent(ref_time=at(6)).pk == interval_facts[5].pk
+        statements = []
+
+        def count_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = alchemy_store.session.get_bind()
+        event.listen(engine, "before_cursor_execute", count_statement)
+        try:
+            fact = Fact(activity=None, start=at(4), end=at(5))
+            assert facts._timeframe_available_for_fact(fact)
+            assert facts.subsequent(ref_time=at(4)).pk == interval_facts[6].pk
+        finally:
+            event.remove(engine, "before_cursor_execute", count_statement)
+        assert statements == []
+
+    def test_index_maintained_by_writes(
+        self, alchemy_store, interval_facts, empty_store_after
+    ):
+        """Test that saving and removing Facts update the loaded index."""
+        alchemy_store.config["db.interval_index"] = True
+        facts = alchemy_store.facts
+        assert facts.antecedent(ref_time=at(6)).pk == interval_facts[5].pk
+        added = facts.save(Fact(activity=Activity("foo"), start=at(4), end=at(5)))
+        interval_index = facts.interval_index_get()
+        assert added.pk in interval_index
+        assert facts.antecedent(ref_time=at(6)).pk == added.pk
+        with pytest.raises(ValueError):
+            facts.save(Fact(activity=Activity("foo"), start=at(4.5), end=at(5.5)))
+        facts.remove(added)
+        assert added.pk not in interval_index
+        assert facts.antecedent(ref_time=at(6)).pk == interval_facts[5].pk
+
+    def test_index_discarded_on_rollback(self, alchemy_store, interval_facts):
+        """Test that a rollback discards the index, which is then reloaded."""
+        alchemy_store.config["db.interval_index"] = True
+        facts = alchemy_store.facts
+        interval_index = facts.interval_index_get()
+        alchemy_store.session.rollback()
+        assert facts.interval_index_get() is not interval_index
+
+    def test_savepoint_rollback_undoes_index_changes(
+        self, alchemy_store, interval_facts, empty_store_after
+    ):
+        """Test that a savepoint rollback undoes its index changes, not reloads."""
+        alchemy_store.config["db.interval_index"] = True
+        facts = alchemy_store.facts
+        interval_index = facts.interval_index_get()
+        keys = list(interval_index.keys)
+        removed = interval_facts[5].as_hamster(alchemy_store)
+        with alchemy_store.transaction():
+            with pytest.raises(ValueError):
+                with alchemy_store.savepoint():
+                    added = facts.save(
+                        Fact(activity=Activity("foo"), start=at(4), end=at(5))
+                    )
+                    facts.remove(removed)
+                    assert added.pk in interval_index
+                    assert removed.pk not in interval_index
+                    # Fails to save, and rolls back the savepoint.
+                    facts.save(
+                        Fact(activity=Activity("foo"), start=at(4.5), end=at(5.5))
+                    )
+            assert facts.interval_index_get() is interval_index
+            assert interval_index.keys == keys
+            facts.save(Fact(activity=Activity("bar"), start=at(10), end=at(11)))
+        assert facts.interval_index_get() is interval_index
+        assert len(interval_index) == len(keys) + 1
+
+
+class TestIntervalIndexSpans(object):
+    """Test that the IntervalIndex keeps its keys sorted and its max span tight."""
+
+    def test_add_many_sorts_keys(self):
+        """Test that bulk-loading sorts the keys the same as adding each span."""
+        spans = [
+            (1, at(3), at(4)),
+            (2, at(0), at(2)),
+            (3, at(1), None),
+            (4, None, None),
+            (5, at(0), at(1)),
+        ]
+        bulk = IntervalIndex(spans)
+        each = IntervalIndex()
+        for span in spans:
+            each.add(*span)
+        assert bulk.keys == each.keys == sorted(bulk.keys)
+        assert len(bulk) == 4
+        bulk.add_many([(1, at(5), at(6)), (6, at(-1), at(0))])
+        assert bulk.keys == sorted(bulk.keys)
+        assert [key[2] for key in bulk.keys] == [6, 5, 2, 3, 1]
+
+    def test_max_span_shrinks(self):
+        """Test that removing the longest Fact shortens the scan back."""
+        interval_index = IntervalIndex([(1, at(0), at(1)), (2, at(1), at(3))])
+        assert interval_index.max_span == datetime.timedelta(hours=2)
+        interval_index.add(3, at(3), at(100))
+        interval_index.add(4, at(100), at(197))
+        assert interval_index.max_span == datetime.timedelta(hours=97)
+        interval_index.discard(3)
+        assert interval_index.max_span == datetime.timedelta(hours=97)
+        interval_index.add(4, at(100), at(101))
+        assert interval_index.max_span == datetime.timedelta(hours=2)
+        interval_index.discard(2)
+        interval_index.discard(1)
+        assert interval_index.max_span == datetime.timedelta(hours=1)
+        interval_index.discard(4)
+        assert interval_index.max_span == datetime.timedelta(0)
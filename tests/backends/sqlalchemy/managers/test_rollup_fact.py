@@ -0,0 +1,193 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+import datetime
+
+import pytest
+
+from nark.backends.sqlalchemy import objects
+from nark.backends.sqlalchemy.objects import fact_daily_rollups
+from nark.items.activity import Activity
+from nark.items.category import Category
+from nark.items.fact import Fact
+from nark.items.tag import Tag
+
+
+def new_fact(activity_name, start, hours, tag_names=(), category_name="work"):
+    category = Category(category_name) if category_name else None
+    end = start + datetime.timedelta(hours=hours) if hours is not None else None
+    return Fact(
+        activity=Activity(activity_name, category=category),
+        start=start,
+        end=end,
+        tags=[Tag(name) for name in tag_names],
+    )
+
+
+@pytest.fixture(autouse=True)
+def empty_store_after(alchemy_store):
+    """Empty the store after each test, because these tests commit many times."""
+    yield
+    # The alchemy_session fixture rolls back a nested transaction, but each
+    # FactManager call commits, and only the first commit ends the nested
+    # transaction. So delete whatever the other commits committed.
+    session = alchemy_store.session
+    session.rollback()
+    for table in reversed(objects.metadata.sorted_tables):
+        session.execute(table.delete())
+    session.commit()
+
+
+@pytest.fixture
+def rollup_facts(alchemy_store):
+    """Add Facts through the FactManager, including an active and a split Fact."""
+    day1 = datetime.datetime(2020, 1, 1, 9, 0, 0)
+    day2 = datetime.datetime(2020, 1, 2, 9, 0, 0)
+    added = [
+        alchemy_store.facts.save(new_fact("foo", day1, 1, ["abc", "def"])),
+        alchemy_store.facts.save(
+            new_fact("foo", day1 + datetime.timedelta(hours=2), 2)
+        ),
+        alchemy_store.facts.save(
+            new_fact("bar", day1 + datetime.timedelta(hours=5), 1.5, ["abc"])
+        ),
+        alchemy_store.facts.save(new_fact("baz", day2, 3, ["def"], category_name=None)),
+        alchemy_store.facts.save(
+            new_fact("foo", day2 + datetime.timedelta(hours=4), None, ["abc"])
+        ),
+    ]
+    # Edit a Fact, which marks it deleted and adds a new Fact split from it.
+    edited = added[2].copy()
+    edited.description = "edited"
+    edited.tags = [Tag("ghi")]
+    added[2] = alchemy_store.facts.save(edited)
+    return added
+
+
+def fetch_rollups(alchemy_store):
+    query = alchemy_store.session.query(fact_daily_rollups)
+    return sorted(tuple(row) for row in query.all())
+
+
+class TestRollupFactManager(object):
+    """Test the fact_daily_rollups maintenance and usage queries."""
+
+    def test_rollups_maintained_like_rebuild(self, alchemy_store, rollup_facts):
+        """Test that adding, editing, and removing Facts maintain the rollups."""
+
+        def assert_rollups_current():
+            maintained = fetch_rollups(alchemy_store)
+            n_rollups = alchemy_store.facts.rebuild_rollups()
+            assert n_rollups == len(maintained)
+            assert maintained == fetch_rollups(alchemy_store)
+
+        assert_rollups_current()
+        day1 = datetime.date(2020, 1, 1)
+        assert (day1, rollup_facts[0].activity.pk, 0, 3 * 3600, 2) in fetch_rollups(
+            alchemy_store
+        )
+        # Stop the active Fact, which edits it in place.
+        active = rollup_facts[4].copy()
+        active.end = active.start + datetime.timedelta(minutes=30)
+        alchemy_store.facts.save(active)
+        assert_rollups_current()
+        # Remove a Fact, which also removes its rows that no longer count any.
+        alchemy_store.facts.remove(rollup_facts[3])
+        assert_rollups_current()
+        activity_ids = set(row[1] for row in fetch_rollups(alchemy_store))
+        assert rollup_facts[3].activity.pk not in activity_ids
+
+    def test_rollups_add_many(self, alchemy_store):
+        """Test that add_many tallies all its Facts in the rollups."""
+        start = datetime.datetime(2020, 1, 1, 9, 0, 0)
+        facts = [
+            new_fact("foo", start + datetime.timedelta(hours=idx), 1, ["abc"])
+            for idx in range(5)
+        ]
+        alchemy_store.facts.add_many(facts)
+        rollups = fetch_rollups(alchemy_store)
+        assert [row[3:] for row in rollups] == [(5 * 3600, 5), (5 * 3600, 5)]
+        alchemy_store.facts.rebuild_rollups()
+        assert rollups == fetch_rollups(alchemy_store)
+
+    @pytest.mark.parametrize("manager_name", ["activities", "categories", "tags"])
+    def test_usage_from_rollups_matches_facts(
+        self, alchemy_store, rollup_facts, manager_name
+    ):
+        """Test that usage from the rollups matches usage from the Facts."""
+        manager = getattr(alchemy_store, manager_name)
+
+        def get_usage():
+            results = manager.get_all_by_usage(sort_cols=("usage", "name"))
+            return [(item and item.name, uses, span) for item, uses, span in results]
+
+        expected = get_usage()
+        alchemy_store.config["db.rollups"] = True
+        results = get_usage()
+        assert [result[:2] for result in results] == [result[:2] for result in expected]
+        for result, expect in zip(results, expected):
+            assert result[2] == pytest.approx(expect[2])
+
+    def test_usage_from_facts_skips_deleted(self, alchemy_store, rollup_facts):
+        """Test that usage from the Facts does not count an edited Fact twice."""
+        assert not alchemy_store.config["db.rollups"]
+
+        def get_usage(manager, **kwargs):
+            results = manager.get_all_by_usage(**kwargs)
+            return {item.name: uses for item, uses, _span in results}
+
+        assert get_usage(alchemy_store.activities) == {"foo": 3, "bar": 1, "baz": 1}
+        assert get_usage(alchemy_store.tags) == {"abc": 2, "def": 2, "ghi": 1}
+        # The deleted Fact (the edited Fact's original) is still counted when
+        # asking for the deleted Facts.
+        assert get_usage(alchemy_store.activities, deleted=True) == {"bar": 1}
+        assert get_usage(alchemy_store.tags, deleted=True) == {"abc": 1}
+
+    def test_usage_from_rollups_uses_rollups(self, alchemy_store, set_of_alchemy_facts):
+        """Test that usage comes from the rollups, stale or not, if enabled."""
+        alchemy_store.config["db.rollups"] = True
+        # The fixture Facts were not added through the FactManager, so only
+        # the final, active Fact, which is never tallied, is found.
+        results = alchemy_store.activities.get_all_by_usage(raw=True)
+        assert [(activity.pk, uses, span) for activity, uses, span in results] == [
+            (set_of_alchemy_facts[-1].activity.pk, 1, None),
+        ]
+        alchemy_store.facts.rebuild_rollups()
+        results = alchemy_store.activities.get_all_by_usage()
+        assert len(results) == len(set_of_alchemy_facts)
+
+    def test_usage_from_rollups_not_for_time_query(self, alchemy_store, rollup_facts):
+        """Test that queries on time still use the Facts table."""
+        alchemy_store.config["db.rollups"] = True
+        alchemy_store.session.execute(fact_daily_rollups.delete())
+        results = alchemy_store.activities.get_all_by_usage(
+            since=datetime.datetime(2020, 1, 1),
+        )
+        assert len(results) == 3
+
+    def test_rollup_days(self, alchemy_store, rollup_facts, mocker):
+        """Test that rollup_days totals each day, including the active Fact."""
+        now = rollup_facts[4].start + datetime.timedelta(hours=2)
+        mocker.patch.object(type(alchemy_store), "now", now)
+        results = alchemy_store.facts.rollup_days()
+        assert results == [
+            (datetime.date(2020, 1, 1), 4.5 / 24, 3),
+            (datetime.date(2020, 1, 2), 5 / 24, 2),
+        ]
+        results = alchemy_store.facts.rollup_days(since=datetime.date(2020, 1, 2))
+        assert [result[0] for result in results] == [datetime.date(2020, 1, 2)]
@@ -0,0 +1,115 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+
+import pytest
+
+from nark.backends.sqlalchemy.objects import AlchemyActivity, AlchemyTag
+
+
+@pytest.fixture
+def search_facts(
+    alchemy_store,
+    alchemy_fact_factory,
+    alchemy_activity_factory,
+    alchemy_category_factory,
+    alchemy_tag_factory,
+):
+    """Provide Facts with known descriptions, and Activity, Category and Tag names."""
+    search_facts = []
+    descriptions = (
+        "Fixing the parser bug",
+        "Lunch with the team",
+        "Parser review of the parser",
+        None,
+    )
+    for idx, description in enumerate(descriptions):
+        category = alchemy_category_factory(name="category{}".format(idx))
+        activity = alchemy_activity_factory(
+            name="activity{}".format(idx), category=category
+        )
+        alchemy_fact = alchemy_fact_factory(activity=activity, description=description)
+        alchemy_fact.tags = [alchemy_tag_factory(name="tag{}".format(idx))]
+        search_facts.append(alchemy_fact)
+    return search_facts
+
+
+def search(alchemy_store, fts, search_terms, **kwargs):
+    alchemy_store.config["db.fts"] = fts
+    results = alchemy_store.facts.get_all(search_terms=search_terms, **kwargs)
+    return [fact.pk for fact in results]
+
+
+class TestSearchFts(object):
+    """Test searching Facts using the facts_fts full-text search index."""
+
+    @pytest.mark.parametrize(
+        ("search_terms", "expect_idxs"),
+        (
+            (["parser"], [0, 2]),
+            (["PARS"], [0, 2]),
+            (["lunch", "review"], [1, 2]),
+            (["parser", "not", "bug"], [2]),
+            (["not", "parser"], [1, 3]),
+            (["not", "parser", "not", "team"], [3]),
+        ),
+    )
+    def test_search_matches_like(
+        self, alchemy_store, search_facts, search_terms, expect_idxs
+    ):
+        """Make sure word searches match the same Facts, with or without FTS."""
+        expected = sorted(search_facts[idx].pk for idx in expect_idxs)
+        assert sorted(search(alchemy_store, False, search_terms)) == expected
+        assert sorted(search(alchemy_store, True, search_terms)) == expected
+
+    def test_search_broad_match(self, alchemy_store, search_facts):
+        """Make sure broad_match searches the Activity, Category, and Tag names."""
+        fact = search_facts[1]
+        for name in (
+            fact.activity.name,
+            fact.activity.category.name,
+            fact.tags[0].name,
+        ):
+            assert search(alchemy_store, True, [name]) == []
+            assert search(alchemy_store, True, [name], broad_match=True) == [fact.pk]
+            excluded = search(alchemy_store, True, ["not", name], broad_match=True)
+            assert sorted(excluded) == sorted(
+                other.pk for other in search_facts if other is not fact
+            )
+
+    def test_search_sort_rank(self, alchemy_store, search_facts):
+        """Make sure the best matches sort first."""
+        results = search(alchemy_store, True, ["parser"], sort_cols=["rank"])
+        assert results == [search_facts[2].pk, search_facts[0].pk]
+        results = search(
+            alchemy_store, True, ["parser"], sort_cols=["rank"], sort_orders=["desc"]
+        )
+        assert results == [search_facts[0].pk, search_facts[2].pk]
+
+    def test_search_reindexed_on_rename(self, alchemy_store, search_facts):
+        """Make sure renaming an Activity or Tag reindexes its Facts."""
+        fact = search_facts[1]
+        session = alchemy_store.session
+        session.query(AlchemyActivity).filter_by(pk=fact.activity.pk).update(
+            {"name": "Gardening"}
+        )
+        session.query(AlchemyTag).filter_by(pk=fact.tags[0].pk).update(
+            {"name": "outdoors"}
+        )
+        for term in ("gardening", "outdoors"):
+            assert search(alchemy_store, True, [term], broad_match=True) == [fact.pk]
@@ -0,0 +1,166 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+
+import os
+import stat
+import threading
+
+import pytest
+
+from nark.backends.sqlalchemy import objects
+from nark.daemon import NarkClient, NarkDaemon, NarkDaemonError
+from nark.items.activity import Activity
+from nark.items.category import Category
+from nark.managers.query_terms import QueryTerms
+
+
+@pytest.fixture
+def empty_store_after(alchemy_store):
+    """Empty the store after the test, for tests that commit more than once."""
+    yield
+    # See the same fixture in test_rollup_fact.py.
+    session = alchemy_store.session
+    session.rollback()
+    for table in reversed(objects.metadata.sorted_tables):
+        session.execute(table.delete())
+    session.commit()
+
+
+@pytest.fixture
+def serve(controller, alchemy_store, tmpdir):
+    """Provide a function that serves the store while a client function runs."""
+    controller.store = alchemy_store
+    socket_path = os.path.join(str(tmpdir), "nark.sock")
+
+    def _serve(client_func):
+        daemon = NarkDaemon(controller, socket_path)
+        results = []
+
+        def run_client():
+            daemon.listening.wait()
+            try:
+                with NarkClient(socket_path) as client:
+                    results.append(client_func(client))
+            except Exception as err:
+                results.append(err)
+            finally:
+                daemon.shutdown()
+
+        # The daemon runs the calls on this thread, which owns the store.
+        client_thread = threading.Thread(target=run_client)
+        client_thread.start()
+        daemon.serve_forever()
+        client_thread.join()
+        assert not os.path.exists(socket_path)
+        if isinstance(results[0], Exception):
+            raise results[0]
+        return results[0]
+
+    return _serve
+
+
+class TestNarkDaemon(object):
+    """Test serving the managers over the daemon socket."""
+
+    def test_calls_managers(self, serve, set_of_alchemy_facts):
+        """Make sure manager calls return the same items as calling directly."""
+
+        def client_func(client):
+            return client.ping(), client.facts.get_all()
+
+        pid, facts = serve(client_func)
+        assert pid == os.getpid()
+        assert sorted(fact.pk for fact in facts) == sorted(
+            fact.pk for fact in set_of_alchemy_facts
+        )
+
+    def test_calls_release_session(self, serve, alchemy_store, set_of_alchemy_facts):
+        """Make sure the daemon's Session does not keep what each call loaded."""
+        alchemy_store.session.commit()
+
+        def client_func(client):
+            facts = client.facts.get_all()
+            return facts, len(alchemy_store.session.identity_map)
+
+        facts, n_loaded = serve(client_func)
+        assert len(facts) == len(set_of_alchemy_facts)
+        assert n_loaded == 0
+
+    def test_writes_then_reads(self, serve, empty_store_after):
+        """Make sure each call sees the calls before it."""
+
+        def client_func(client):
+            category = client.categories.save(Category("foo"))
+            activity = client.activities.save(Activity("bar", category=category))
+            return activity, client.activities.get_by_composite("bar", category)
+
+        activity, fetched = serve(client_func)
+        assert activity.pk is not None
+        assert fetched == activity
+
+    def test_raises_errors(self, serve):
+        """Make sure a method's error, or an unknown method, raises in the client."""
+
+        def client_func(client):
+            with pytest.raises(KeyError):
+                client.categories.get(123456)
+            with pytest.raises(NarkDaemonError):
+                client.facts.no_such_method()
+            with pytest.raises(NarkDaemonError):
+                client.call("store", "cleanup")
+            with pytest.raises(AttributeError):
+                client.facts._private
+            return client.ping()
+
+        assert serve(client_func)
+
+    def test_replies_with_generator_items(self, serve, set_of_alchemy_facts):
+        """Make sure a method that returns a generator replies with its items."""
+
+        def client_func(client):
+            return client.facts.iter_gather(QueryTerms(), chunk_size=2)
+
+        facts = serve(client_func)
+        assert isinstance(facts, list)
+        assert sorted(fact.pk for fact in facts) == sorted(
+            fact.pk for fact in set_of_alchemy_facts
+        )
+
+    def test_unpicklable_reply_raises(self, serve, controller, mocker):
+        """Make sure a reply that cannot be pickled raises in the client."""
+        mocker.patch.object(controller.facts, "get_all", return_value=threading.Lock())
+
+        def client_func(client):
+            with pytest.raises(NarkDaemonError, match="pickle"):
+                client.facts.get_all()
+            return client.ping()
+
+        assert serve(client_func)
+
+    def test_socket_is_private(self, controller, tmpdir):
+        """Make sure only the daemon's user can connect to its socket."""
+        socket_path = os.path.join(str(tmpdir), "nark.sock")
+        daemon = NarkDaemon(controller, socket_path)
+        daemon.listen()
+        try:
+            mode = stat.S_IMODE(os.stat(socket_path).st_mode)
+            assert mode & 0o077 == 0
+        finally:
+            daemon.server.server_close()
+            daemon.unlink_socket()
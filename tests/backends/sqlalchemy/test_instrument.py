@@ -0,0 +1,105 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+import json
+
+import pytest
+
+from nark.managers.query_terms import QueryTerms
+
+
+@pytest.fixture
+def instrument(alchemy_store):
+    instrument = alchemy_store.instrument
+    instrument.enable()
+    yield instrument
+    instrument.disable()
+
+
+class TestInstrumentation(object):
+    """Test the store's manager instrumentation."""
+
+    def test_disabled_by_default(self, alchemy_store, set_of_alchemy_facts):
+        """Make sure nothing is measured, or wrapped, unless enabled."""
+        assert not alchemy_store.instrument.enabled
+        assert "get" not in vars(alchemy_store.facts)
+        alchemy_store.facts.get_all()
+        assert alchemy_store.instrument.stats() == {}
+
+    def test_measures_calls(self, alchemy_store, set_of_alchemy_facts, instrument):
+        """Make sure each call, its statements, rows, and hydration are recorded."""
+        results = alchemy_store.facts.get_all()
+        alchemy_store.facts.get(results[0].pk)
+        alchemy_store.facts.get(results[1].pk)
+        stats = instrument.stats()
+        assert set(stats) == {"facts.gather", "facts.get", "facts.get_all"}
+        get_all = stats["facts.get_all"]
+        assert get_all["calls"] == 1
+        assert get_all["rows"] == len(set_of_alchemy_facts)
+        assert get_all["statements"] >= 1
+        assert get_all["seconds"] >= get_all["sql_seconds"]
+        assert get_all["seconds"] >= get_all["hydrate_seconds"] > 0
+        assert stats["facts.get"]["calls"] == 2
+        assert stats["facts.get"]["rows"] == 2
+        assert json.loads(instrument.to_json()) == stats
+
+    def test_measures_nested_calls(self, alchemy_store, instrument, alchemy_activity):
+        """Make sure a call that makes another call counts both."""
+        alchemy_store.activities.get_or_create(
+            alchemy_activity.as_hamster(alchemy_store),
+        )
+        stats = instrument.stats()
+        assert stats["activities.get_or_create"]["calls"] == 1
+        assert stats["activities.get_by_composite"]["calls"] == 1
+        assert (
+            stats["activities.get_or_create"]["seconds"]
+            >= stats["activities.get_by_composite"]["seconds"]
+        )
+
+    def test_disable_and_reset(self, alchemy_store, set_of_alchemy_facts, instrument):
+        """Make sure disable stops measuring, and reset forgets."""
+        alchemy_store.facts.get_all()
+        instrument.disable()
+        assert "get_all" not in vars(alchemy_store.facts)
+        alchemy_store.facts.get_all()
+        assert instrument.stats()["facts.get_all"]["calls"] == 1
+        instrument.reset()
+        assert instrument.stats() == {}
+
+    def test_measures_generators(self, alchemy_store, set_of_alchemy_facts, instrument):
+        """Make sure a generator's rows and statements are counted as it runs."""
+        facts = alchemy_store.facts.iter_gather(QueryTerms(), chunk_size=2)
+        assert "facts.iter_gather" not in instrument.stats()
+        assert len(list(facts)) == len(set_of_alchemy_facts)
+        iter_gather = instrument.stats()["facts.iter_gather"]
+        assert iter_gather["calls"] == 1
+        assert iter_gather["rows"] == len(set_of_alchemy_facts)
+        # The statements run as the generator runs, not when it's made.
+        assert iter_gather["statements"] >= 1
+        assert iter_gather["seconds"] >= iter_gather["hydrate_seconds"] > 0
+
+    def test_measures_counts_and_store(
+        self, alchemy_store, set_of_alchemy_facts, instrument
+    ):
+        """Make sure a count is not counted as a row, and store methods are measured."""
+        count = alchemy_store.facts.gather(QueryTerms(count_results=True))
+        assert count == len(set_of_alchemy_facts)
+        alchemy_store.changes_since()
+        stats = instrument.stats()
+        assert stats["facts.gather"]["rows"] == 0
+        assert stats["store.changes_since"]["calls"] == 1
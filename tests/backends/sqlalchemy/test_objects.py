@@ -42,6 +42,14 @@ class TestAlchemyActivity(object):
         activity = alchemy_fact.activity
         assert activity.facts
 
+    def test_repr_skips_facts(self, alchemy_store, alchemy_fact_factory):
+        """Make sure that an activity's repr does not include its Facts."""
+        alchemy_fact = alchemy_fact_factory()
+        activity = alchemy_fact.activity
+        assert activity.facts
+        assert "facts=" not in repr(activity)
+        assert "activities=" not in repr(activity.category)
+
 
 class TestAlchemyTag(object):
     """Make sure our custom methods behave properly."""
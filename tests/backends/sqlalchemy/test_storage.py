@@ -17,11 +17,20 @@
 # You can find the GNU General Public License reprinted in the file titled 'LICENSE',
 # or visit <http://www.gnu.org/licenses/>.
 
+import datetime
+import os
+from contextlib import nullcontext
+
 import pytest
+from sqlalchemy.exc import IntegrityError
 
-from nark.backends.sqlalchemy.objects import AlchemyCategory
+from nark.backends.sqlalchemy import objects
+from nark.backends.sqlalchemy.objects import AlchemyCategory, AlchemyFact
 from nark.backends.sqlalchemy.storage import SQLAlchemyStore
 from nark.config import decorate_config
+from nark.items.activity import Activity
+from nark.items.category import Category
+from nark.items.fact import Fact
 
 # isort: off / Otherwise isort removes one of the following blank lines,
 # but it doesn't if you remove the comment atop the following class.
@@ -97,3 +106,279 @@ class TestStore(object):
         """Test that Instantiating a store with a unicode path works."""
         alchemy_config["db.path"] = db_path_parametrized
         assert SQLAlchemyStore(alchemy_config)
+
+    def test_sqlite_pragmas_preset_overridden(self, alchemy_config):
+        """Make sure a db.sqlite setting overrides the preset's."""
+        alchemy_config["db"]["sqlite"] = {"preset": "safe", "synchronous": "normal"}
+        store = SQLAlchemyStore(alchemy_config)
+        assert store.sqlite_pragmas == [
+            ("busy_timeout", 5000),
+            ("journal_mode", "wal"),
+            ("synchronous", "normal"),
+        ]
+
+    def test_sqlite_pragmas_none_by_default(self, alchemy_config):
+        """Make sure SQLite's defaults are used unless configured."""
+        assert SQLAlchemyStore(alchemy_config).sqlite_pragmas == []
+
+    def test_sqlite_pragmas_applied(self, alchemy_config, tmpdir):
+        """Make sure each new connection gets the db.sqlite settings."""
+        alchemy_config["db"]["path"] = os.path.join(str(tmpdir), "pragmas.sqlite")
+        alchemy_config["db"]["sqlite"] = {"preset": "fast-reads", "cache_size": -4000}
+        store = SQLAlchemyStore(alchemy_config)
+        engine = store.create_storage_engine()
+        try:
+            for _ in range(2):
+                with engine.connect() as conn:
+
+                    def pragma(name):
+                        return conn.exec_driver_sql("PRAGMA {}".format(name)).scalar()
+
+                    assert pragma("journal_mode") == "wal"
+                    # 1 is NORMAL; 2 is MEMORY.
+                    assert pragma("synchronous") == 1
+                    assert pragma("temp_store") == 2
+                    assert pragma("cache_size") == -4000
+                    assert pragma("busy_timeout") == 5000
+        finally:
+            engine.dispose()
+
+    def test_session_scope_releases_items(self, alchemy_store, set_of_alchemy_facts):
+        """Make sure the items loaded in a session scope are released after."""
+        alchemy_store.session.commit()
+        with alchemy_store.session_scope() as session:
+            assert session is alchemy_store.session
+            with alchemy_store.session_scope():
+                facts = alchemy_store.facts.get_all(raw=True)
+            # Not released until the outermost scope exits.
+            assert len(session.identity_map) >= len(facts)
+        assert len(alchemy_store.session.identity_map) == 0
+
+    def test_session_scope_rolls_back(self, alchemy_store, alchemy_category_factory):
+        """Make sure a session scope rolls back if its work raises."""
+        with pytest.raises(RuntimeError):
+            with alchemy_store.session_scope():
+                alchemy_store.session.add(alchemy_category_factory.build())
+                alchemy_store.session.flush()
+                raise RuntimeError
+        assert alchemy_store.session.query(AlchemyCategory).count() == 0
+
+    def test_session_release_keeps_unsaved_changes(
+        self, alchemy_store, alchemy_category_factory
+    ):
+        """Make sure the Session is not released if it has unsaved changes."""
+        alchemy_store.session.add(alchemy_category_factory.build())
+        assert not alchemy_store.session_release()
+        assert len(alchemy_store.session.new) == 1
+
+    @pytest.mark.parametrize(
+        ("identity_map_size", "released"), ((0, False), (2, True), (100, False))
+    )
+    def test_session_release_maybe(
+        self, alchemy_store, set_of_alchemy_facts, identity_map_size, released
+    ):
+        """Make sure the Session is released if it holds too many items."""
+        alchemy_store.session.commit()
+        alchemy_store.config["db.identity_map_size"] = identity_map_size
+        facts = alchemy_store.facts.get_all(raw=True)
+        assert len(alchemy_store.session.identity_map) > 2
+        assert alchemy_store.session_release_maybe() == released
+        # But never while in a session scope.
+        facts = alchemy_store.facts.get_all(raw=True)
+        with alchemy_store.session_scope():
+            assert not alchemy_store.session_release_maybe()
+        assert len(facts) == len(set_of_alchemy_facts)
+
+
+class TestStoreTransaction(object):
+    """Tests for store.transaction() and store.savepoint()."""
+
+    @pytest.fixture
+    def new_fact(self):
+        """Provide a function that makes a new half-hour Fact, hours after 2020."""
+        activity = Activity("foo", category=Category("bar"))
+
+        def _new_fact(hours):
+            start = datetime.datetime(2020, 1, 1) + datetime.timedelta(hours=hours)
+            end = start + datetime.timedelta(minutes=30)
+            return Fact(activity=activity, start=start, end=end, tags=["baz"])
+
+        return _new_fact
+
+    def test_transaction_commits_once(self, alchemy_store, new_fact, mocker):
+        """Make sure saves in a transaction are committed once, at the end."""
+        commit = mocker.spy(alchemy_store.session, "commit")
+        with alchemy_store.transaction():
+            with alchemy_store.transaction():
+                alchemy_store.facts.save(new_fact(0))
+            alchemy_store.facts.save(new_fact(1))
+            assert commit.call_count == 0
+        assert commit.call_count == 1
+        assert alchemy_store.session.query(AlchemyFact).count() == 2
+
+    def test_transaction_validates_uncommitted(self, alchemy_store, new_fact):
+        """Make sure each save sees the uncommitted saves before it."""
+        with alchemy_store.transaction():
+            alchemy_store.facts.save(new_fact(0))
+            with pytest.raises(ValueError):
+                alchemy_store.facts.save(new_fact(0))
+
+    def test_transaction_rolls_back(self, alchemy_store, new_fact):
+        """Make sure a transaction rolls back if its work raises."""
+        with pytest.raises(RuntimeError):
+            with alchemy_store.transaction():
+                alchemy_store.facts.save(new_fact(0))
+                raise RuntimeError
+        assert alchemy_store.session.query(AlchemyFact).count() == 0
+        # And the identity caches forgot the rolled back Activity.
+        assert len(alchemy_store.activities.identity_cache) == 0
+
+    def test_session_scope_error_keeps_transaction(self, alchemy_store, new_fact):
+        """Make sure a session scope's caught error does not cancel the transaction."""
+        with alchemy_store.transaction():
+            alchemy_store.facts.save(new_fact(0))
+            with pytest.raises(RuntimeError):
+                with alchemy_store.session_scope():
+                    raise RuntimeError
+            alchemy_store.facts.save(new_fact(1))
+        starts = [fact.start.hour for fact in alchemy_store.facts.get_all()]
+        assert sorted(starts) == [0, 1]
+
+    def test_add_many_error_keeps_transaction(self, alchemy_store, new_fact, mocker):
+        """Make sure an add_many error does not cancel the transaction's other saves."""
+        error = IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed"))
+        with alchemy_store.transaction():
+            alchemy_store.facts.save(new_fact(0))
+            for hours, scope in ((1, alchemy_store.savepoint), (2, nullcontext)):
+                with pytest.raises(ValueError):
+                    with scope():
+                        with alchemy_store.session_scope():
+                            commit = mocker.patch.object(
+                                alchemy_store, "commit", side_effect=error
+                            )
+                            alchemy_store.facts.add_many([new_fact(hours)])
+                mocker.stop(commit)
+            alchemy_store.facts.save(new_fact(3))
+        starts = [fact.start.hour for fact in alchemy_store.facts.get_all()]
+        # The savepoint rolled back its Fact. (Without a savepoint, the failed
+        # Fact is still pending, and it's up to the caller, who caught the
+        # error, to roll back the transaction, or not.)
+        assert sorted(starts) == [0, 2, 3]
+
+    def test_savepoint_rolls_back_alone(self, alchemy_store, new_fact):
+        """Make sure a savepoint rolls back just its part of the transaction."""
+        with alchemy_store.transaction():
+            for hours in range(3):
+                try:
+                    with alchemy_store.savepoint():
+                        alchemy_store.facts.save(new_fact(hours))
+                        if hours == 1:
+                            raise RuntimeError
+                except RuntimeError:
+                    pass
+            # An overlapping Fact fails alone, too.
+            with pytest.raises(ValueError):
+                with alchemy_store.savepoint():
+                    alchemy_store.facts.save(new_fact(2))
+        starts = [fact.start.hour for fact in alchemy_store.facts.get_all()]
+        assert sorted(starts) == [0, 2]
+
+
+class TestStoreChanges(object):
+    """Tests for the changes table, and store.changes_since()."""
+
+    @pytest.fixture
+    def empty_store_after(self, alchemy_store):
+        """Empty the store after the test, for tests that commit more than once."""
+        yield
+        # See the same fixture in test_rollup_fact.py.
+        session = alchemy_store.session
+        session.rollback()
+        for table in reversed(objects.metadata.sorted_tables):
+            session.execute(table.delete())
+        session.commit()
+
+    @pytest.fixture
+    def new_fact(self):
+        """Provide a function that makes a new half-hour Fact, hours after 2020."""
+        activity = Activity("foo", category=Category("bar"))
+
+        def _new_fact(hours):
+            start = datetime.datetime(2020, 1, 1) + datetime.timedelta(hours=hours)
+            end = start + datetime.timedelta(minutes=30)
+            return Fact(activity=activity, start=start, end=end, tags=["baz"])
+
+        return _new_fact
+
+    def changes(self, alchemy_store, seq=0):
+        return [
+            (change.entity, change.pk, change.op)
+            for change in alchemy_store.changes_since(seq)
+        ]
+
+    def test_changes_add(self, alchemy_store, new_fact):
+        """Make sure adding a Fact records it and the items it adds, too."""
+        fact = alchemy_store.facts.save(new_fact(0))
+        tag = alchemy_store.tags.get_by_name("baz")
+        # (The Tag might be flushed after the Fact, so order doesn't matter.)
+        assert sorted(self.changes(alchemy_store)) == [
+            ("activity", fact.activity.pk, "add"),
+            ("category", fact.category.pk, "add"),
+            ("fact", fact.pk, "add"),
+            ("tag", tag.pk, "add"),
+        ]
+        change = alchemy_store.changes_since()[0]
+        assert change.changed_at is not None
+
+    def test_changes_update_and_remove(
+        self, alchemy_store, new_fact, empty_store_after
+    ):
+        """Make sure an edit and a remove record each Fact's change."""
+        fact = alchemy_store.facts.save(new_fact(0))
+        seq = alchemy_store.changes_since()[-1].seq
+        with alchemy_store.transaction():
+            edited = fact.copy()
+            edited.description = "edited"
+            edited = alchemy_store.facts.save(edited)
+            alchemy_store.activities.save(
+                Activity("qux", pk=fact.activity.pk, category=fact.category)
+            )
+            alchemy_store.facts.remove(edited)
+        assert self.changes(alchemy_store, seq) == [
+            ("fact", edited.pk, "add"),
+            ("fact", fact.pk, "remove"),
+            ("activity", fact.activity.pk, "update"),
+            ("fact", edited.pk, "remove"),
+        ]
+
+    def test_changes_add_then_update(self, alchemy_store, new_fact):
+        """Make sure an item added and then changed before the commit is an add."""
+        with alchemy_store.transaction():
+            fact = alchemy_store.facts.save(new_fact(0))
+            alchemy_store.activities.save(
+                Activity("qux", pk=fact.activity.pk, category=fact.category)
+            )
+        changes = self.changes(alchemy_store)
+        assert ("activity", fact.activity.pk, "add") in changes
+        assert [change for change in changes if change[2] != "add"] == []
+
+    def test_changes_rolled_back(self, alchemy_store, new_fact):
+        """Make sure rolled back saves leave no changes."""
+        with pytest.raises(RuntimeError):
+            with alchemy_store.transaction():
+                alchemy_store.facts.save(new_fact(0))
+                raise RuntimeError
+        assert alchemy_store.changes_since() == []
+
+    def test_changes_since_limit(self, alchemy_store, new_fact):
+        """Make sure changes_since returns the oldest changes first, up to limit."""
+        with alchemy_store.transaction():
+            for hours in range(3):
+                alchemy_store.facts.save(new_fact(hours))
+        changes = alchemy_store.changes_since()
+        assert [change.seq for change in changes] == sorted(
+            change.seq for change in changes
+        )
+        assert alchemy_store.changes_since(limit=2) == changes[:2]
+        assert alchemy_store.changes_since(changes[1].seq, limit=2) == changes[2:4]
+        assert alchemy_store.changes_since(changes[-1].seq) == []
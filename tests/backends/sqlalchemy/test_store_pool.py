@@ -0,0 +1,198 @@
+# This file exists within 'nark':
+#
+#   https://github.com/tallybark/nark
+#
+# Copyright © 2018-2020 Landon Bouma
+# All  rights  reserved.
+#
+# 'nark' is free software: you can redistribute it and/or modify it under the terms
+# of the GNU General Public License  as  published by the Free Software Foundation,
+# either version 3  of the License,  or  (at your option)  any   later    version.
+#
+# 'nark' is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY  or  FITNESS FOR A PARTICULAR
+# PURPOSE.  See  the  GNU General Public License  for  more details.
+#
+# You can find the GNU General Public License reprinted in the file titled 'LICENSE',
+# or visit <http://www.gnu.org/licenses/>.
+
+
+import copy
+import os
+import threading
+
+import pytest
+
+from nark.backends.sqlalchemy.objects import AlchemyCategory
+from nark.backends.sqlalchemy.storage import SQLAlchemyStore
+from nark.backends.sqlalchemy.store_pool import StorePool
+
+
+@pytest.fixture
+def store_pool():
+    store_pool = StorePool(maxsize=2)
+    yield store_pool
+    store_pool.clear()
+
+
+@pytest.fixture
+def checkout(store_pool):
+    """Provide a function that checks out a store, and checks it back in."""
+
+    def _checkout(config):
+        with store_pool.checkout(config) as store:
+            return store, store.db_url
+
+    return _checkout
+
+
+@pytest.fixture
+def tenant_config(alchemy_config, tmpdir):
+    """Provide a function that makes a config for a new file database."""
+
+    def _tenant_config(name):
+        config = copy.deepcopy(alchemy_config)
+        config["db.path"] = os.path.join(str(tmpdir), "{}.sqlite".format(name))
+        return config
+
+    return _tenant_config
+
+
+class TestStorePool(object):
+    """Test that pooled stores are reused, separate, evicted, and lent out."""
+
+    def test_checkout_reuses_store(self, store_pool, checkout, tenant_config):
+        """Make sure the same database gets the same (already stood up) store."""
+        store, db_url = checkout(tenant_config("alice"))
+        assert store.engine is not None
+        assert db_url.endswith("alice.sqlite")
+        assert checkout(tenant_config("alice")) == (store, db_url)
+        assert len(store_pool) == 1
+
+    def test_stores_use_own_databases(self, checkout, tenant_config):
+        """Make sure each store reads and writes only its own database."""
+        alice, _alice_url = checkout(tenant_config("alice"))
+        bob, _bob_url = checkout(tenant_config("bob"))
+        assert alice.engine is not bob.engine
+        alice.session.add(
+            AlchemyCategory(pk=None, name="alice's", deleted=False, hidden=False)
+        )
+        alice.session.commit()
+        assert alice.session.query(AlchemyCategory).count() == 1
+        assert bob.session.query(AlchemyCategory).count() == 0
+        # The migrations of each store use its own Engine, too.
+        assert alice.migrations.engine_or_url is alice.engine
+        assert bob.migrations.version() == alice.migrations.latest_version()
+
+    def test_evicts_least_recently_used(self, store_pool, checkout, tenant_config):
+        """Make sure a full pool closes the least recently used store."""
+        alice, alice_url = checkout(tenant_config("alice"))
+        bob, bob_url = checkout(tenant_config("bob"))
+        checkout(tenant_config("alice"))
+        checkout(tenant_config("carol"))
+        assert len(store_pool) == 2
+        assert alice_url in store_pool
+        assert bob_url not in store_pool
+        assert bob.engine is None and bob.session is None
+        assert store_pool.close(alice_url)
+        assert not store_pool.close(alice_url)
+        assert alice.session is None
+
+    def test_stores_use_own_settings(self, checkout, tenant_config):
+        """Make sure getting one store does not change another store's settings."""
+        alice_config = tenant_config("alice")
+        alice_config["db.fts"] = True
+        bob_config = tenant_config("bob")
+        bob_config["db.fts"] = False
+        alice, alice_url = checkout(alice_config)
+        bob, bob_url = checkout(bob_config)
+        assert alice.config is not bob.config
+        assert alice.db_url == alice_url and bob.db_url == bob_url
+        assert alice.config["db.fts"] and not bob.config["db.fts"]
+        assert checkout(alice_config) == (alice, alice_url)
+        assert not bob.config["db.fts"]
+
+    def test_checkout_reused_store_not_created(self, checkout, tenant_config, mocker):
+        """Make sure checking out an open store does not create another store."""
+        store, _db_url = checkout(tenant_config("alice"))
+        init = mocker.spy(SQLAlchemyStore, "__init__")
+        assert checkout(tenant_config("alice"))[0] is store
+        assert init.call_count == 0
+
+    def test_evicted_store_closed_when_checked_in(self, store_pool, tenant_config):
+        """Make sure a store evicted (or closed) while checked out stays open."""
+        with store_pool.checkout(tenant_config("alice")) as alice:
+            with store_pool.checkout(tenant_config("bob")) as bob:
+                with store_pool.checkout(tenant_config("carol")):
+                    assert alice.db_url not in store_pool
+                    assert store_pool.close(bob.db_url)
+                    assert alice.session is not None and bob.session is not None
+                    assert alice.session.query(AlchemyCategory).count() == 0
+                assert bob.session is not None
+            assert bob.session is None
+            assert alice.session is not None
+        assert alice.engine is None and alice.session is None
+        # The next checkout stands up a new store.
+        with store_pool.checkout(tenant_config("alice")) as store:
+            assert store is not alice
+            assert store.session is not None
+
+    def test_checkout_waits_for_other_thread(self, store_pool, tenant_config):
+        """Make sure two threads are not lent the same store at the same time."""
+        using = []
+
+        def use_store():
+            with store_pool.checkout(tenant_config("alice")) as store:
+                using.append(store)
+
+        with store_pool.checkout(tenant_config("alice")) as store:
+            thread = threading.Thread(target=use_store)
+            thread.start()
+            thread.join(timeout=0.2)
+            assert thread.is_alive()
+            assert using == []
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert using == [store]
+
+    def test_standup_does_not_block_pool(self, tenant_config):
+        """Make sure a store standing up does not hold up other databases."""
+        standing_up = threading.Event()
+        stood_up = threading.Event()
+
+        class SlowStore(SQLAlchemyStore):
+            def standup(self, session=None):
+                if self.db_url.endswith("alice.sqlite"):
+                    standing_up.set()
+                    assert stood_up.wait(timeout=5)
+                return super(SlowStore, self).standup(session)
+
+        store_pool = StorePool(maxsize=2, store_cls=SlowStore)
+        using = []
+
+        def use_store():
+            with store_pool.checkout(tenant_config("alice")) as store:
+                using.append(store)
+
+        thread = threading.Thread(target=use_store)
+        thread.start()
+        try:
+            assert standing_up.wait(timeout=5)
+            with store_pool.checkout(tenant_config("bob")) as bob:
+                assert bob.session is not None
+            assert using == []
+        finally:
+            stood_up.set()
+            thread.join(timeout=5)
+            store_pool.clear()
+        assert len(using) == 1
+
+    def test_failed_standup_not_pooled(self, store_pool, tenant_config, mocker):
+        """Make sure a store that fails to stand up is not pooled."""
+        mocker.patch.object(
+            SQLAlchemyStore, "standup", side_effect=RuntimeError("standup")
+        )
+        with pytest.raises(RuntimeError, match="standup"):
+            with store_pool.checkout(tenant_config("alice")):
+                pass
+        assert len(store_pool) == 0
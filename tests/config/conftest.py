@@ -56,8 +56,20 @@ def configobj_instance(request):
     config["db"]["name"] = "hamster"
     config["db"]["user"] = "hamster"
     config["db"]["password"] = "hamster"
+    config["db"]["rollups"] = False
+    config["db"]["interval_index"] = False
+    config["db"]["archive_deleted"] = False
+    config["db"]["fts"] = False
+    config["db"]["identity_map_size"] = 0
+    config["db"]["sqlite"] = {}
+    config["db"]["sqlite"]["preset"] = "fast-reads"
+    config["db"]["sqlite"]["journal_mode"] = ""
+    config["db"]["sqlite"]["synchronous"] = "full"
+    config["db"]["sqlite"]["cache_size"] = -2000
+    config["db"]["sqlite"]["temp_store"] = ""
     config["dev"] = {}
     config["dev"]["catch_errors"] = False
+    config["dev"]["instrument"] = False
     config["dev"]["lib_log_level"] = "WARNING"
     config["dev"]["sql_log_level"] = "debug"
     config["time"] = {}
@@ -75,10 +87,25 @@ def configobj_instance(request):
             "name": "hamster",
             "user": "hamster",
             "password": "hamster",
+            "rollups": "False",
+            "interval_index": "False",
+            "archive_deleted": "False",
+            "fts": "False",
+            "identity_map_size": "0",
+            "sqlite": {
+                "preset": "fast-reads",
+                "journal_mode": "",
+                "synchronous": "full",
+                "cache_size": "-2000",
+                "mmap_size": None,
+                "temp_store": "",
+                "busy_timeout": None,
+            },
         },
         "dev": {
             # Devmode catch_errors could be deadly under test, as it sets a trace trap.
             "catch_errors": "False",
+            "instrument": "False",
             "lib_log_level": "WARNING",
             "sql_log_level": "debug",
         },
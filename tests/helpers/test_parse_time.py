@@ -24,7 +24,13 @@ from freezegun import freeze_time
 
 from nark.helpers import fact_time
 from nark.helpers.parse_errors import ParserInvalidDatetimeException
-from nark.helpers.parse_time import HamsterTimeSpec, parse_dated, parse_datetime_human
+from nark.helpers.parse_time import (
+    HamsterTimeSpec,
+    parse_dated,
+    parse_datetime_get_parser,
+    parse_datetime_human,
+    parse_datetime_human_memo,
+)
 
 
 class TestGetDayEnd(object):
@@ -147,6 +153,40 @@ class TestParseTimeFunctions(object):
         expected = datetime.datetime(2015, 12, 7, 0, 0, tzinfo=datetime.timezone.utc)
         assert parsed == expected
 
+    def test_parse_datetime_human_reuses_parser(self):
+        time_now = datetime.datetime(2015, 12, 10, 12, 30)
+        parser = parse_datetime_get_parser(time_now, None)
+        assert parse_datetime_get_parser(time_now, None) is parser
+        other_now = time_now + datetime.timedelta(days=1)
+        assert parse_datetime_get_parser(other_now, None) is not parser
+
+    def test_parse_datetime_human_memoized(self, mocker):
+        parse_datetime_human_memo.cache_clear()
+        time_now = datetime.datetime(2015, 12, 10, 12, 30)
+        get_date_data = mocker.spy(
+            parse_datetime_get_parser(time_now, None), "get_date_data"
+        )
+        parsed = parse_datetime_human("yesterday 9am", time_now)
+        assert parsed == datetime.datetime(2015, 12, 9, 9, 0)
+        assert parse_datetime_human("yesterday 9am", time_now) == parsed
+        assert get_date_data.call_count == 1
+        # A different relative base is parsed anew.
+        other_now = time_now + datetime.timedelta(days=1)
+        parsed = parse_datetime_human("yesterday 9am", other_now)
+        assert parsed == datetime.datetime(2015, 12, 10, 9, 0)
+
+    def test_parse_datetime_human_memo_now_bucket(self):
+        parse_datetime_human_memo.cache_clear()
+        with freeze_time("2015-12-10 12:30:00.250") as frozen:
+            assert parse_datetime_human("1 hour ago") == datetime.datetime(
+                2015, 12, 10, 11, 30, 0, 250000
+            )
+            frozen.tick(delta=datetime.timedelta(milliseconds=500))
+            # Within the same second, the result is reused.
+            assert parse_datetime_human("1 hour ago").second == 0
+            frozen.tick(delta=datetime.timedelta(seconds=1))
+            assert parse_datetime_human("1 hour ago").second == 1
+
 
 # ***
 
@@ -26,6 +26,7 @@ from nark.helpers.parsing import (
     ParserMissingDatetimeTwoException,
     ParserMissingSeparatorActivity,
     parse_factoid,
+    parse_factoids,
 )
 from nark.tests.helpers.conftest import factoid_fixture
 
@@ -96,3 +97,70 @@ class TestParser(object):
             assert fact_dict["tags"] == expectation["tags"]
             assert fact_dict["description"] == expectation["description"]
             assert fact_dict["warnings"] == expectation["warnings"]
+
+
+class TestParseFactoids(object):
+    """Test the batch parser, parse_factoids."""
+
+    FACTOIDS = [
+        "2020-01-01 10:00 to 2020-01-01 11:00 foo@bar: #baz hello",
+        "2020-01-02 10:00 to 2020-01-02 11:30 qux@: world",
+        "not a factoid",
+        "2020-01-03 08:00 to 2020-01-03 09:00 foo@bar: #baz #bat again",
+    ]
+
+    def test_parse_factoids_matches_parse_factoid(self):
+        """Make sure each result is the same as parsing each Factoid alone."""
+        expected = [
+            parse_factoid(factoid, time_hint="verify_both", lenient=True)
+            for factoid in self.FACTOIDS
+        ]
+        results = list(
+            parse_factoids(self.FACTOIDS, time_hint="verify_both", lenient=True)
+        )
+        assert [fact_dict for fact_dict, err in results] == [
+            fact_dict for fact_dict, err in expected
+        ]
+        assert [str(err) for fact_dict, err in results] == [
+            str(err) for fact_dict, err in expected
+        ]
+        assert results[0][1] is None
+        assert isinstance(results[2][1], ParserMissingSeparatorActivity)
+
+    def test_parse_factoids_workers_preserve_order(self):
+        """Make sure fanning out across processes yields in input order."""
+        factoids = self.FACTOIDS * 5
+        serial = list(parse_factoids(factoids, time_hint="verify_both", lenient=True))
+        fanned = list(
+            parse_factoids(
+                factoids,
+                time_hint="verify_both",
+                lenient=True,
+                workers=2,
+                chunksize=3,
+            )
+        )
+        assert [fact_dict for fact_dict, err in fanned] == [
+            fact_dict for fact_dict, err in serial
+        ]
+        assert [str(err) for fact_dict, err in fanned] == [
+            str(err) for fact_dict, err in serial
+        ]
+
+    def test_parse_factoids_not_lenient_raises(self):
+        """Make sure a bad Factoid raises, after the good ones before it."""
+        results = parse_factoids(self.FACTOIDS, time_hint="verify_both")
+        assert next(results)[0]["activity"] == "foo"
+        assert next(results)[0]["activity"] == "qux"
+        with pytest.raises(ParserMissingSeparatorActivity):
+            next(results)
+
+    def test_parse_factoids_workers_not_lenient_raises(self):
+        """Make sure a bad Factoid raises at its position, even when fanned out."""
+        results = parse_factoids(
+            self.FACTOIDS, time_hint="verify_both", workers=2, chunksize=4
+        )
+        assert next(results)[0]["activity"] == "foo"
+        assert next(results)[0]["activity"] == "qux"
+        with pytest.raises(ParserMissingSeparatorActivity):
+            next(results)
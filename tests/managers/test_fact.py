@@ -64,6 +64,10 @@ class TestFactManager:
         with pytest.raises(NotImplementedError):
             basestore.facts._add(fact)
 
+    def test_add_many_not_implemented(self, basestore, fact):
+        with pytest.raises(NotImplementedError):
+            basestore.facts.add_many([fact])
+
     def test_update_not_implemented(self, basestore, fact):
         with pytest.raises(NotImplementedError):
             basestore.facts._update(fact)
@@ -92,6 +96,22 @@ class TestFactManager:
         with pytest.raises(NotImplementedError):
             basestore.facts.gather(query_terms=None)
 
+    def test_iter_gather_not_implemented(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.facts.iter_gather(query_terms=None)
+
+    def test_gather_columns_not_implemented(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.facts.gather_columns(query_terms=None)
+
+    def test_rebuild_rollups_not_implemented(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.facts.rebuild_rollups()
+
+    def test_rollup_days_not_implemented(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.facts.rollup_days()
+
     # *** get_all since/until argument tests.
 
     # (lb): I think these were from old hamster-lib where it made more sense
@@ -517,6 +537,22 @@ class TestFactManager:
         with pytest.raises(NotImplementedError):
             basestore.facts.subsequent()
 
+    def test_window_not_implemented(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.facts.window(None)
+
+    def test_history_not_implemented(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.facts.history(None)
+
+    def test_histories_not_implemented(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.facts.histories([])
+
+    def test_archive_not_implemented(self, basestore):
+        with pytest.raises(NotImplementedError):
+            basestore.facts.archive()
+
     def test_strictly_during_not_implemented(self, basestore):
         with pytest.raises(NotImplementedError):
             basestore.facts.strictly_during(start=None, end=None)
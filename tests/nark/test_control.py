@@ -18,10 +18,13 @@
 # or visit <http://www.gnu.org/licenses/>.
 
 import logging
+import subprocess
+import sys
 
 import pytest
 
 from nark import get_version
+from nark.control import NarkControl
 from nark.manager import BaseStore
 
 
@@ -43,6 +46,29 @@ class TestController:
         with pytest.raises(ValueError):
             controller.config["db"]["orm"] = None
 
+    def test_store_loaded_lazily(self, base_config, mocker):
+        """Make sure the store is not created until it's first used."""
+        get_store = mocker.patch.object(NarkControl, "_get_store")
+        controller = NarkControl(base_config)
+        assert not controller.store_loaded
+        assert not get_store.called
+        assert controller.facts is get_store.return_value.facts
+        assert controller.store_loaded
+        controller.store
+        assert get_store.call_count == 1
+
+    def test_import_skips_backend(self):
+        """Make sure importing the controller does not import the backend."""
+        script = (
+            "import sys; import nark.control;"
+            " print('sqlalchemy' in sys.modules or 'nark.backends' in sys.modules)"
+        )
+        output = subprocess.check_output(
+            [sys.executable, "-c", script],
+            universal_newlines=True,
+        )
+        assert output.strip() == "False"
+
     def test_update_config(self, controller, base_config, mocker):
         """Make sure we assign new config and get a new store."""
         mocker.patch.object(controller, "_get_store")
@@ -18,6 +18,7 @@
 # or visit <http://www.gnu.org/licenses/>.
 
 import datetime
+import tracemalloc
 
 import pytest
 
@@ -113,6 +114,48 @@ def list_of_facts(fact_factory):
     return get_list_of_facts
 
 
+@pytest.fixture
+def stream_of_facts(fact):
+    """
+    Provide a factory that returns a generator of given amount of Fact instances.
+
+    Each Fact is made as it's requested, so the stream itself uses no memory
+    to speak of, unlike list_of_facts (and it's much faster to generate).
+    """
+
+    def get_stream_of_facts(number_of_facts):
+        offset = datetime.timedelta(hours=4)
+        for idx in range(number_of_facts):
+            new_fact = fact.copy()
+            new_fact.start = fact.start + (offset * idx)
+            new_fact.end = new_fact.start + (offset / 2)
+            yield new_fact
+
+    return get_stream_of_facts
+
+
+@pytest.fixture
+def measure_peak_memory():
+    """
+    Provide a function that calls a function and returns its result, and also
+    the peak memory that it allocated.
+
+    (It does not time the call, which tracemalloc slows down, and which would
+    flake on a busy machine; see nark.helpers.dev.writer_streaming for that.)
+    """
+
+    def _measure_peak_memory(func, *args, **kwargs):
+        tracemalloc.start()
+        try:
+            result = func(*args, **kwargs)
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return result, peak
+
+    return _measure_peak_memory
+
+
 # ***
 
 FAKER_WORDS_NB = 6
@@ -17,6 +17,8 @@
 
 import json
 
+from nark.reports.json_writer import JSONWriter
+
 
 class TestJSONWriter(object):
     """Make sure the JSON writer works as expected."""
@@ -41,3 +43,58 @@ class TestJSONWriter(object):
             for idx, row in enumerate(table):
                 kvals = {key: value for key, value in zip(headers, row)}
                 assert result[idx] == kvals
+
+    def test_json_writer_write_facts_json_lines(self, path, list_of_facts):
+        json_writer = JSONWriter(json_lines=True)
+        json_writer.output_setup(path)
+        facts = list_of_facts(3)
+        assert json_writer.write_facts(facts) == 3
+        with open(path, "r") as fobj:
+            lines = fobj.read().splitlines()
+        assert len(lines) == 3
+        for line, fact in zip(lines, facts):
+            assert json.loads(line) == json_writer.fact_as_dict(fact)
+
+    def test_json_writer_write_facts_empty(self, json_writer):
+        output_path = json_writer.output_file.name
+        assert json_writer.write_facts([]) == 0
+        with open(output_path, "r") as fobj:
+            assert json.load(fobj) == []
+
+    def test_json_writer_streaming_memory(
+        self,
+        path,
+        stream_of_facts,
+        measure_peak_memory,
+    ):
+        """Compare the streaming writer against buffering all results."""
+        number_of_facts = 2000
+
+        def write_buffered():
+            # This is how JSONWriter used to work: build a list, then dump it.
+            json_writer = JSONWriter()
+            json_writer.output_setup(path)
+            results = [
+                json_writer.fact_as_dict(fact)
+                for fact in stream_of_facts(number_of_facts)
+            ]
+            json.dump(results, json_writer.output_file)
+            json_writer._close()
+
+        def write_streaming():
+            json_writer = JSONWriter()
+            json_writer.output_setup(path)
+            json_writer.write_facts(stream_of_facts(number_of_facts))
+
+        _, buffered_peak = measure_peak_memory(write_buffered)
+        with open(path, "r") as fobj:
+            buffered_output = fobj.read()
+
+        _, streaming_peak = measure_peak_memory(write_streaming)
+        with open(path, "r") as fobj:
+            streaming_output = fobj.read()
+
+        # The output is the same, but the streaming writer uses a fraction of
+        # the memory (which only grows with the size of the buffered export).
+        assert streaming_output == buffered_output
+        assert streaming_peak * 4 < buffered_peak
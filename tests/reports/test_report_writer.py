@@ -104,6 +104,29 @@ class TestReportWriter(object):
         report_writer.write_facts(facts)
         assert report_writer._write_fact.call_count == row_limit
 
+    def test_report_writer_write_facts_row_limit_closes_generator(
+        self,
+        mocker,
+        report_writer,
+        list_of_facts,
+    ):
+        """Ensure that write_facts closes a streaming source at the row_limit."""
+        facts = list_of_facts(10)
+        closed = []
+
+        def stream_facts():
+            try:
+                for fact in facts:
+                    yield fact
+            finally:
+                closed.append(True)
+
+        report_writer.row_limit = 3
+        mocker.patch.object(report_writer, "_write_fact", return_value=None)
+        report_writer.write_facts(stream_facts())
+        assert report_writer._write_fact.call_count == 3
+        assert closed == [True]
+
     def test_report_writer_write_facts_fails_to__close(
         self,
         report_writer,
@@ -19,6 +19,8 @@
 
 import xml
 
+from nark.reports.xml_writer import XMLWriter
+
 
 class TestXMLWriter(object):
     """Make sure the XML writer works as expected."""
@@ -80,3 +82,51 @@ class TestXMLWriter(object):
         with open(output_path, "r") as fobj:
             result = xml.dom.minidom.parse(fobj)
             assert result.toxml()
+
+    def test_xml_writer_write_facts_streaming(self, path, list_of_facts):
+        """Make sure the streaming writer writes the same elements as the DOM."""
+        facts = list_of_facts(3)
+
+        def write_facts(streaming):
+            xml_writer = XMLWriter(streaming=streaming)
+            xml_writer.output_setup(path)
+            xml_writer.write_facts(facts)
+            with open(path, "r", encoding="utf8") as fobj:
+                document = xml.dom.minidom.parse(fobj)
+            return [
+                dict(elem.attributes.items())
+                for elem in document.getElementsByTagName("fact")
+            ]
+
+        assert len(write_facts(streaming=True)) == 3
+        assert write_facts(streaming=True) == write_facts(streaming=False)
+
+    def test_xml_writer_write_report_streaming(self, path, table, headers):
+        xml_writer = XMLWriter(streaming=True)
+        xml_writer.output_setup(path)
+        xml_writer.write_report(table, headers)
+        with open(path, "r", encoding="utf8") as fobj:
+            result = xml.dom.minidom.parse(fobj)
+        assert result.documentElement.tagName == "results"
+        assert len(result.getElementsByTagName("fact")) == len(table)
+
+    def test_xml_writer_streaming_memory(
+        self,
+        path,
+        stream_of_facts,
+        measure_peak_memory,
+    ):
+        """Compare the streaming writer against the DOM writer."""
+        number_of_facts = 2000
+
+        def write_facts(streaming):
+            xml_writer = XMLWriter(streaming=streaming)
+            xml_writer.output_setup(path)
+            xml_writer.write_facts(stream_of_facts(number_of_facts))
+
+        _, dom_peak = measure_peak_memory(write_facts, streaming=False)
+        _, streaming_peak = measure_peak_memory(write_facts, streaming=True)
+
+        # The DOM holds every element until the end, and then the XML string,
+        # whereas the streaming writer holds one element at a time.
+        assert streaming_peak * 4 < dom_peak